@@ -2,20 +2,52 @@
 Email Assistant dashboard. Responsive and deployment-ready.
   Dev:   python app.py  |  Prod:  PORT=8080 python app.py
 """
+import gzip
+import hashlib
 import json
 import os
 import sys
 import threading
+import time
 import webbrowser
+from datetime import datetime, timezone
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-from flask import Flask, jsonify, render_template_string, request
+from flask import Flask, Response, g, jsonify, render_template_string, request, stream_with_context
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always available
+    brotli = None
+
+import config
+from src.triage_runs import TriageRun, TriageRuns, parse_event_id
+from src.triage_snapshot import SnapshotReader, write_snapshot
+from src import telemetry
 
 app = Flask(__name__)
 app.config["JSONIFY_PRETTY_PRINT_REGULAR"] = True
 
+HTTP_REQUESTS = telemetry.counter("http_requests_total", "Dashboard requests by route, method and status.", ("route", "method", "status"))
+HTTP_SECONDS = telemetry.histogram("http_request_seconds", "Dashboard request handling time (streams: until headers).", ("route", "method"))
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_SECONDS.labels(route, request.method).observe(time.perf_counter() - started)
+        HTTP_REQUESTS.labels(route, request.method, response.status_code).inc()
+    return response
+
 HTML = """
 <!DOCTYPE html>
 <html lang="en">
@@ -482,9 +514,95 @@ HTML = """
 """
 
 
+class _ResponseCache:
+    """
+    In-process cache of response bodies keyed on the mtimes/sizes of the files
+    they are built from. Entries carry a strong ETag, Last-Modified and a
+    gzip (and brotli, if installed) copy, so repeat polls are served without
+    re-reading or re-serializing anything, and revalidations get a 304.
+    """
+
+    MIN_COMPRESS_BYTES = 512
+
+    def __init__(self):
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    @staticmethod
+    def _signature(sources: list[Path]) -> tuple:
+        sig = []
+        for p in sources:
+            try:
+                st = p.stat()
+                sig.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def get(self, key: str, sources: list[Path], build, mimetype: str = "application/json") -> dict:
+        sig = self._signature(sources)
+        entry = self._entries.get(key)
+        if entry is not None and entry["sig"] == sig:
+            self._count("hits")
+            return entry
+        self._count("misses")
+        body = build()
+        if not isinstance(body, (bytes, str)):
+            body = json.dumps(body)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        mtimes = [s[0] for s in sig if s]
+        entry = {
+            "sig": sig,
+            "body": body,
+            "mimetype": mimetype,
+            "etag": hashlib.sha1(body).hexdigest(),
+            "last_modified": max(mtimes) / 1e9 if mtimes else time.time(),
+            "gzip": gzip.compress(body, 6) if len(body) >= self.MIN_COMPRESS_BYTES else None,
+            "br": brotli.compress(body) if brotli and len(body) >= self.MIN_COMPRESS_BYTES else None,
+        }
+        self._entries[key] = entry
+        return entry
+
+    def respond(self, key: str, sources: list[Path], build, mimetype: str = "application/json"):
+        entry = self.get(key, sources, build, mimetype)
+        if entry["etag"] in request.if_none_match:
+            self._count("not_modified")
+            resp = Response(status=304)
+        else:
+            body, encoding = entry["body"], None
+            accepted = request.accept_encodings
+            if entry["br"] is not None and accepted["br"]:
+                body, encoding = entry["br"], "br"
+            elif entry["gzip"] is not None and accepted["gzip"]:
+                body, encoding = entry["gzip"], "gzip"
+            resp = Response(body, mimetype=entry["mimetype"])
+            if encoding:
+                resp.headers["Content-Encoding"] = encoding
+        resp.set_etag(entry["etag"])
+        resp.last_modified = entry["last_modified"]
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.vary.add("Accept-Encoding")
+        return resp
+
+
+_cache = _ResponseCache()
+
+
 @app.route("/")
 def index():
-    return render_template_string(HTML)
+    # HTML has no template variables, so it is rendered once and served from memory
+    return _cache.respond("index", [], lambda: render_template_string(HTML), mimetype="text/html")
+
+
+@app.route("/api/cache/stats")
+def api_cache_stats():
+    return jsonify(dict(_cache.stats))
 
 
 # Demo inbox: sample emails with pre-assigned categories (no real account needed).
@@ -517,22 +635,54 @@ DEMO_METRICS = {
 }
 
 
+def _build_metrics() -> dict:
+    import config
+    if not config.METRICS_FILE.exists():
+        return {"message": "No metrics yet. Run: python plugin_cli.py triage --provider gmail"}
+    from src.deliverables.productivity_metrics import ProductivityMetrics
+    pm = ProductivityMetrics()  # one parse of METRICS_FILE serves both totals and the estimate
+    totals = pm.get_totals()
+    if not totals:
+        return {"message": "No metrics yet. Run the CLI to triage inbox."}
+    totals["time_saved_estimate_min"] = round(pm.estimate_time_saved_minutes(), 1)
+    return {"totals": totals}
+
+
 @app.route("/api/metrics")
 def api_metrics():
     if request.args.get("demo") in ("1", "true", "yes"):
-        return jsonify(DEMO_METRICS)
+        return _cache.respond("metrics:demo", [], lambda: DEMO_METRICS)
     try:
         import config
-        if config.METRICS_FILE.exists():
-            data = json.loads(config.METRICS_FILE.read_text(encoding="utf-8"))
-            totals = data.get("totals") or {}
-            if totals:
-                from src.deliverables.productivity_metrics import ProductivityMetrics
-                pm = ProductivityMetrics()
-                totals = dict(totals)
-                totals["time_saved_estimate_min"] = round(pm.estimate_time_saved_minutes(), 1)
-            return jsonify({"totals": totals} if totals else {"message": "No metrics yet. Run the CLI to triage inbox."})
-        return jsonify({"message": "No metrics yet. Run: python plugin_cli.py triage --provider gmail"})
+        return _cache.respond("metrics", [config.METRICS_FILE], _build_metrics)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+_series = None
+_series_lock = threading.Lock()
+
+
+def _metrics_series():
+    """One time-series connection per process (WAL: each query sees other processes' committed writes)."""
+    global _series
+    with _series_lock:
+        if _series is None:
+            from src.deliverables.timeseries import MetricsTimeSeries
+            _series = MetricsTimeSeries()
+        return _series
+
+
+@app.route("/api/metrics/series")
+def api_metrics_series():
+    """Chart data: ?metric=threads_processed&start=<iso|epoch>&end=<iso|epoch>&step=<seconds>."""
+    metric = request.args.get("metric", "threads_processed")
+    try:
+        step = request.args.get("step", type=int)
+        points = _metrics_series().query(metric, request.args.get("start"), request.args.get("end"), step)
+        return jsonify({"metric": metric, "points": points})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -540,7 +690,199 @@ def api_metrics():
 @app.route("/api/demo/inbox")
 def api_demo_inbox():
     """Return demo emails with categories for the demo inbox UI."""
-    return jsonify({"threads": DEMO_INBOX, "demo": True})
+    return _cache.respond("demo_inbox", [], lambda: {"threads": DEMO_INBOX, "demo": True})
+
+
+_follow_ups = None
+_follow_ups_lock = threading.Lock()
+
+
+def _follow_up_tracker():
+    """One tracker per process; each read catches up on the journal instead of replaying it."""
+    global _follow_ups
+    with _follow_ups_lock:
+        if _follow_ups is None:
+            from src.agents.follow_up_tracker import FollowUpTracker
+            _follow_ups = FollowUpTracker()
+        return _follow_ups
+
+
+@app.route("/api/followups/due")
+def api_followups_due():
+    """Follow-ups whose reminder is due now, plus the next upcoming due time."""
+    try:
+        tracker = _follow_up_tracker()
+        now = datetime.now(timezone.utc)
+        due = tracker.due(now)
+        nxt = tracker.next_due(after=now)
+        return jsonify({
+            "due": due,
+            "next_due_at": nxt[0].isoformat() if nxt else None,
+            "next_due_thread_id": nxt[1]["thread_id"] if nxt else None,
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+_triage_runs = TriageRuns()
+telemetry.gauge("triage_jobs_queue_depth", "Triage runs waiting for a worker.").set_function(lambda: _triage_runs.stats()["queue_depth"])
+telemetry.gauge("triage_jobs_running", "Triage runs in progress.").set_function(lambda: _triage_runs.stats()["running"])
+SSE_KEEPALIVE_SEC = 15
+
+
+def _triage_source(provider: str, max_threads: int):
+    def source():
+        from src.assistant import EmailAssistant
+        assistant = EmailAssistant(provider_name=provider)
+        rows = []
+        try:
+            for event, data in assistant.iter_triage(max_threads=max_threads):
+                if event == "thread":
+                    rows.append(data)
+                yield event, data
+        finally:
+            assistant.metrics.flush()
+        write_snapshot(rows)  # only complete runs replace the /api/inbox snapshot
+        yield "snapshot", {"rows": len(rows)}
+    return source
+
+
+def _sse(run: TriageRun, after: int):
+    yield f"retry: 3000\n: run {run.id}\n\n"
+    for item in run.events(after, timeout=SSE_KEEPALIVE_SEC):
+        if item is None:
+            yield ": keep-alive\n\n"
+            continue
+        seq, event, data = item
+        yield f"id: {run.id}:{seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+_stream_slots = threading.BoundedSemaphore(config.TRIAGE_STREAM_MAX_CLIENTS)
+
+
+def _dashboard_provider():
+    """The provider a request asks for, or None unless it is DASHBOARD_PROVIDER (runs replace the /api/inbox snapshot)."""
+    body = request.get_json(silent=True) if request.method == "POST" else None
+    provider = (body or {}).get("provider") or request.args.get("provider") or config.DASHBOARD_PROVIDER
+    return provider if provider == config.DASHBOARD_PROVIDER else None
+
+
+@app.route("/api/triage/stream")
+def api_triage_stream():
+    """
+    Follow a triage run as server-sent events: "thread" (category, priority,
+    folder) per thread as soon as it is triaged, "progress" ({done, total}),
+    then "done". Subscribes to ?job=<id>, else to the provider's unfinished
+    run; runs are started only by POST /api/jobs/triage. Reconnecting with
+    Last-Event-ID (or ?last_event_id=) resumes after that event. Each stream
+    holds a server thread, so at most TRIAGE_STREAM_MAX_CLIENTS are open at once.
+    """
+    provider = _dashboard_provider()
+    if provider is None:
+        return jsonify({"error": f"only {config.DASHBOARD_PROVIDER} runs can be streamed"}), 400
+    run_id, after = parse_event_id(request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    run = _triage_runs.get(run_id) if run_id else None
+    if run is None:
+        job_id = request.args.get("job")
+        run = _triage_runs.get(job_id) if job_id else _triage_runs.active(provider)
+        after = 0
+    if run is None or run.key != provider:
+        return jsonify({"error": "no such triage run; start one with POST /api/jobs/triage"}), 404
+    if not _stream_slots.acquire(blocking=False):
+        return jsonify({"error": "too many open triage streams", "max": config.TRIAGE_STREAM_MAX_CLIENTS}), 503
+    resp = Response(stream_with_context(_sse(run, after)), mimetype="text/event-stream")
+    resp.call_on_close(_stream_slots.release)
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"  # don't let proxies hold events back
+    return resp
+
+
+_snapshots = SnapshotReader()
+
+
+@app.route("/api/inbox")
+def api_inbox():
+    """
+    Page through the latest triage snapshot: ?folder=<smart folder>&sort=priority|date
+    &cursor=<from previous page>&limit=50. Only the rows on the page are decoded.
+    """
+    snap = _snapshots.get()
+    if snap is None:
+        return jsonify({"threads": [], "next_cursor": None, "message": "No triage snapshot yet. Run a triage job."})
+    folder = request.args.get("folder") or None
+    sort = request.args.get("sort", "priority")
+    limit = max(1, min(500, request.args.get("limit", 50, type=int)))
+    cursor = request.args.get("cursor") or ""
+    generation, _, pos = cursor.rpartition(":")
+    if cursor and generation != snap.generation:
+        return jsonify({"error": "snapshot was rebuilt; restart from the first page", "generation": snap.generation}), 409
+    try:
+        rows, nxt = snap.page(folder, sort, int(pos or 0), limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "threads": rows,
+        "next_cursor": f"{snap.generation}:{nxt}" if nxt is not None else None,
+        "total": len(snap.order(folder, sort)),
+        "folders": snap.folder_counts(),
+        "generation": snap.generation,
+        "built_at": snap.header["built_at"],
+    })
+
+
+@app.route("/api/jobs/triage", methods=["POST"])
+def api_jobs_triage():
+    """
+    Queue a background triage run ({"provider", "max"} in the JSON body or query;
+    the provider must be DASHBOARD_PROVIDER).
+    Returns 202 with the job id, 200 with the already queued/running job for
+    the same account, or 409 if that job has a different "max". Poll GET /api/jobs/<id>.
+    """
+    body = request.get_json(silent=True) or {}
+    provider = _dashboard_provider()
+    if provider is None:
+        return jsonify({"error": f"only {config.DASHBOARD_PROVIDER} can be triaged from the dashboard"}), 400
+    try:
+        max_threads = int(body.get("max") or request.args.get("max", config.TRIAGE_STREAM_MAX_THREADS))
+    except (TypeError, ValueError):
+        return jsonify({"error": "max must be an integer"}), 400
+    params = {"max": max_threads}
+    run, created = _triage_runs.start(provider, _triage_source(provider, max_threads), params)
+    if run is None:
+        return jsonify({"error": "triage queue is full", **_triage_runs.stats()}), 503
+    if run.params != params:
+        return jsonify({
+            "error": "a triage run with other parameters is in progress for this account",
+            "job_id": run.id,
+            "params": run.params,
+        }), 409
+    return jsonify({
+        "job_id": run.id,
+        "status": run.status,
+        "deduplicated": not created,
+        "queue_depth": _triage_runs.stats()["queue_depth"],
+    }), 202 if created else 200
+
+
+@app.route("/api/jobs/<job_id>")
+def api_job(job_id: str):
+    """Job status, latest progress and the thread results triaged so far."""
+    run = _triage_runs.get(job_id)
+    if run is None:
+        return jsonify({"error": "unknown or expired job"}), 404
+    return jsonify(run.snapshot(include_results=True))
+
+
+@app.route("/api/jobs/stats")
+def api_jobs_stats():
+    """Worker pool size, queue depth, outcome counts and recent wait/run times."""
+    return jsonify(_triage_runs.stats())
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """Counters, gauges and latency histograms in the Prometheus text format."""
+    return Response(telemetry.render(), content_type=telemetry.CONTENT_TYPE)
 
 
 @app.route("/health")
@@ -4,17 +4,23 @@ follow-up, ScaleDown, rules, smart folders, urgent detection, templates,
 meeting extraction, unsubscribe suggestions, metrics, surveys, inbox zero.
 """
 import logging
-from typing import Any, Optional
+import time
+from typing import Any, Iterator, Optional
 
 from src.agents import DraftGenerator, FollowUpTracker, PriorityScorer, TriageAgent
 from src.deliverables import InboxZeroTracker, ProductivityMetrics, SatisfactionSurveys
+from src.deliverables.inbox_zero import InboxZeroSampler
 from src.engines import RulesEngine
 from src.features import MeetingExtractor, SmartFolders, UnsubscribeSuggestions, UrgentDetector
 from src.models import EmailThread, TriageResult
 from src.providers import get_provider
+from src.telemetry import counter
+from src.tracing import THREAD_SPAN, span
 
 logger = logging.getLogger(__name__)
 
+URGENT_CASCADE = counter("urgent_cascade_threads_total", "Urgent view threads by cascade stage and decision.", ("stage", "decision"))
+
 
 class EmailAssistant:
     """Main email management agent plugin."""
@@ -40,16 +46,62 @@ class EmailAssistant:
         self.metrics = ProductivityMetrics()
         self.surveys = SatisfactionSurveys()
         self.inbox_zero = InboxZeroTracker()
+        self.last_urgent_cascade: Optional[dict] = None
 
-    def run_triage(self, thread: EmailThread) -> TriageResult:
-        """Triage a thread (with ScaleDown for long threads); record metrics."""
+    def run_triage(self, thread: EmailThread, record_metrics: bool = True) -> TriageResult:
+        """Triage a thread (with ScaleDown for long threads); record metrics unless the caller batches them."""
+        started = time.perf_counter()
         result = self.triage_agent.triage(thread)
-        self.metrics.record_triage_count(1)
-        self.metrics.record_threads_processed(1)
-        if result.compressed_context:
-            self.metrics.record_scaledown_used(1000, 150)  # placeholder; real from API
+        self.metrics.record_triage_latency((time.perf_counter() - started) * 1000)
+        if record_metrics:
+            self.record_triage_metrics([result])
         return result
 
+    def record_triage_metrics(self, results: list[TriageResult]) -> None:
+        """Commit the metrics for a batch of triage results in one update."""
+        scaledown_calls = sum(1 for r in results if r.compressed_context)
+        self.metrics.record_many(
+            triage_count=len(results),
+            threads_processed=len(results),
+            scaledown_calls=scaledown_calls,
+            tokens_saved=scaledown_calls * (1000 - 150),  # placeholder; real from API
+        )
+
+    def iter_triage(self, max_threads: int = 50) -> Iterator[tuple[str, dict]]:
+        """
+        Triage inbox threads one at a time, yielding ("thread", result) as each
+        is computed and ("progress", {"done", "total"}) after it. Metrics are
+        recorded as one batch when the generator finishes or is closed.
+        """
+        with span("provider.list_threads"):
+            threads_list = self.provider.list_threads(max_results=max_threads)[:max_threads]
+        total = len(threads_list)
+        results = []
+        yield "progress", {"done": 0, "total": total}
+        try:
+            for i, t in enumerate(threads_list, 1):
+                with span(THREAD_SPAN, thread_id=t["id"]) as s:
+                    with span("provider.get_thread"):
+                        thread = self.provider.get_thread(t["id"])
+                    if thread:
+                        s.set(messages=thread.message_count)
+                        triage = self.run_triage(thread, record_metrics=False)
+                if thread:
+                    results.append(triage)
+                    dates = [m.date for m in thread.messages if m.date]
+                    yield "thread", {
+                        "thread_id": thread.id,
+                        "subject": thread.subject or "",
+                        "category": triage.category.value,
+                        "priority": triage.priority_score,
+                        "urgent": triage.is_urgent,
+                        "folder": triage.suggested_folder,
+                        "last_message_at": max(dates).isoformat() if dates else None,
+                    }
+                yield "progress", {"done": i, "total": total}
+        finally:
+            self.record_triage_metrics(results)
+
     def get_priority(self, thread: EmailThread, triage_result: Optional[TriageResult] = None) -> int:
         if triage_result is None:
             triage_result = self.run_triage(thread)
@@ -71,24 +123,62 @@ class EmailAssistant:
 
     def get_smart_folders_view(self, max_threads: int = 50) -> dict[str, list[dict]]:
         """Fetch inbox threads, triage each, return grouped by smart folder."""
-        threads_list = self.provider.list_threads(max_results=max_threads)
+        with span("provider.list_threads"):
+            threads_list = self.provider.list_threads(max_results=max_threads)
         threads_with_triage = []
-        for t in threads_list:
-            thread = self.provider.get_thread(t["id"])
-            if thread:
-                triage = self.run_triage(thread)
-                threads_with_triage.append((thread, triage))
+        try:
+            for t in threads_list:
+                with span(THREAD_SPAN, thread_id=t["id"]) as s:
+                    with span("provider.get_thread"):
+                        thread = self.provider.get_thread(t["id"])
+                    if thread:
+                        s.set(messages=thread.message_count)
+                        triage = self.run_triage(thread, record_metrics=False)
+                        threads_with_triage.append((thread, triage))
+        finally:
+            self.record_triage_metrics([triage for _, triage in threads_with_triage])
         return self.smart_folders.filter_into_folders(threads_with_triage)
 
     def get_urgent(self, max_threads: int = 50) -> list[dict]:
-        """Return threads detected as urgent."""
-        threads_list = self.provider.list_threads(max_results=max_threads)
+        """
+        Return threads detected as urgent, in two stages: UrgentDetector.prescreen
+        decides from list metadata, and only threads it is unsure about are
+        fetched in full for is_urgent. Stage counts and pass-through rates are
+        kept in self.last_urgent_cascade.
+        """
+        list_summaries = getattr(self.provider, "list_thread_summaries", None)
+        with span("provider.list_threads"):
+            if list_summaries is not None:
+                summaries = list_summaries(max_results=max_threads)
+            else:
+                summaries = self.provider.list_threads(max_results=max_threads)
+        stats = {"listed": len(summaries), "yes": 0, "no": 0, "maybe": 0, "fetched": 0, "urgent_after_fetch": 0}
         out = []
-        for t in threads_list:
-            thread = self.provider.get_thread(t["id"])
-            if thread and self.urgent_detector.is_urgent(thread):
+        for t in summaries:
+            decision, reason = self.urgent_detector.prescreen(t)
+            stats[decision] += 1
+            URGENT_CASCADE.labels("prescreen", decision).inc()
+            if decision == "yes":
+                out.append({"thread_id": t["id"], "subject": t.get("subject") or "", "reason": reason, "stage": "prescreen"})
+                continue
+            if decision == "no":
+                continue
+            with span(THREAD_SPAN, thread_id=t["id"]) as s:
+                with span("provider.get_thread"):
+                    thread = self.provider.get_thread(t["id"])
+                if thread:
+                    s.set(messages=thread.message_count)
+                urgent = bool(thread) and self.urgent_detector.is_urgent(thread)
+            stats["fetched"] += 1
+            URGENT_CASCADE.labels("full", "yes" if urgent else "no").inc()
+            if urgent:
+                stats["urgent_after_fetch"] += 1
                 reason = self.urgent_detector.urgency_reason(thread)
-                out.append({"thread_id": thread.id, "subject": thread.subject, "reason": reason})
+                out.append({"thread_id": thread.id, "subject": thread.subject, "reason": reason, "stage": "full"})
+        listed = stats["listed"]
+        stats["prescreen_pass_rate"] = round(stats["maybe"] / listed, 4) if listed else 0.0
+        stats["full_urgent_rate"] = round(stats["urgent_after_fetch"] / stats["fetched"], 4) if stats["fetched"] else 0.0
+        self.last_urgent_cascade = stats
         return out
 
     def extract_meeting(self, thread: EmailThread) -> Any:
@@ -106,6 +196,14 @@ class EmailAssistant:
     def record_inbox_check(self, unread_count: int, inbox_count: int) -> None:
         self.inbox_zero.record_check(unread_count, inbox_count)
 
+    def sample_inbox(self) -> Optional[dict]:
+        """Read inbox counters from the provider (no message listing) and record a check."""
+        return InboxZeroSampler(self.provider.inbox_stats, self.inbox_zero).sample()
+
+    def start_inbox_sampler(self, interval_sec: Optional[float] = None) -> InboxZeroSampler:
+        """Record inbox checks in the background every interval_sec (default INBOX_ZERO_SAMPLE_INTERVAL_SEC)."""
+        return InboxZeroSampler(self.provider.inbox_stats, self.inbox_zero, interval_sec).start()
+
     def submit_survey(self, rating: int, comment: Optional[str] = None, feature_used: Optional[str] = None) -> None:
         self.surveys.submit(rating=rating, comment=comment, feature_used=feature_used)
 
@@ -13,6 +13,14 @@ class EmailProvider(ABC):
         """List thread IDs and minimal metadata."""
         pass
 
+    def list_thread_summaries(self, max_results: int = 50, query: Optional[str] = None) -> list[dict]:
+        """
+        list_threads entries plus whatever list-level metadata is cheap to get:
+        subject, sender, snippet, labels, message_count, last_message_at (ISO)
+        and snippet_complete (the snippet is the whole body). Used by the urgent prescreen.
+        """
+        return self.list_threads(max_results=max_results, query=query)
+
     @abstractmethod
     def get_thread(self, thread_id: str) -> Optional[EmailThread]:
         """Fetch full thread with all messages."""
@@ -38,6 +46,11 @@ class EmailProvider(ABC):
         """Apply label to message."""
         pass
 
+    @abstractmethod
+    def inbox_stats(self) -> Optional[dict]:
+        """Inbox counters without listing messages: {"inbox_count": int, "unread_count": int}."""
+        pass
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -52,4 +65,13 @@ def get_provider(provider: str, credentials: Optional[dict] = None) -> Optional[
     if provider == "outlook":
         from .outlook_provider import OutlookProvider
         return OutlookProvider(credentials or {})
+    if provider == "replay":
+        from .replay_provider import ReplayProvider
+        return ReplayProvider(credentials or {})
+    if provider == "mbox":
+        from .mbox_provider import MboxProvider
+        return MboxProvider(credentials or {})
+    if provider == "maildir":
+        from .mbox_provider import MaildirProvider
+        return MaildirProvider(credentials or {})
     return None
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the analyzer hot paths and JSON stores over a synthetic mailbox.
+Usage:
+  python benchmark.py                                  # run, compare with the saved baseline
+  python benchmark.py --threads 5000 --save-baseline   # record a new baseline
+  python benchmark.py --only rules --rules 10,100,1000,5000
+  python benchmark.py --memory                         # also measure tracemalloc peaks
+
+Each case reports time per item, items/s and (with --memory) peak allocation.
+Cases more than --tolerance slower than the baseline are flagged and the
+exit status is 1, so the script can gate CI. Baselines are machine-specific.
+The message footprint check (bytes retained per EmailMessage, loaded from a
+JSON cache and from raw RFC 822) fails the same way when the per-message
+overhead beyond the text itself exceeds --message-budget.
+"""
+import argparse
+import email.message
+import gc
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+# Ensure project root on path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import config
+from src.synthetic_mailbox import SyntheticMailbox, synthetic_rules
+
+DEFAULT_BASELINE = config.DATA_DIR / "benchmark_baseline.json"
+RULE_EVAL_BUDGET = 200_000  # rule x thread evaluations per rules case
+MESSAGE_OVERHEAD_BUDGET = 768  # bytes per message beyond body/subject/snippet text
+FOOTPRINT_THREADS = 1000
+
+
+def _cases(threads, rule_counts: list[int], tmp: Path) -> dict[str, tuple[Callable, list]]:
+    """name -> (fn(item), items)."""
+    from src.agents import FollowUpTracker, PriorityScorer, TriageAgent
+    from src.deliverables import InboxZeroTracker, ProductivityMetrics, SatisfactionSurveys
+    from src.deliverables.timeseries import MetricsTimeSeries
+    from src.engines import RulesEngine
+    from src.features import MeetingExtractor, UnsubscribeSuggestions, UrgentDetector
+    from src.models import EmailThread
+
+    agent = TriageAgent(use_scaledown=False)
+    scorer = PriorityScorer()
+    urgent = UrgentDetector()
+    meetings = MeetingExtractor()
+    unsubscribe = UnsubscribeSuggestions()
+    cases = {
+        "triage": (agent.triage, threads),
+        "priority": (scorer.score, threads),
+        "urgent": (urgent.is_urgent, threads),
+        "meeting": (meetings.extract, threads),
+        "unsubscribe": (unsubscribe.suggest, threads),
+        "to_context_string": (EmailThread.to_context_string, threads),
+        "to_budgeted_context": (EmailThread.to_budgeted_context, threads),
+        "thread_json_roundtrip": (lambda t: EmailThread.from_dict(json.loads(json.dumps(t.to_dict()))), threads),
+    }
+    for n in rule_counts:
+        engine = RulesEngine(synthetic_rules(n))
+        cases[f"rules[{n}]"] = (engine.evaluate_thread, threads[: max(20, RULE_EVAL_BUDGET // n)])
+
+    stores = threads[:2000]
+    follow_ups = FollowUpTracker(store_path=tmp / "follow_ups.json")
+    metrics = ProductivityMetrics(path=tmp / "metrics.json", series=MetricsTimeSeries(tmp / "series.db"))
+    surveys = SatisfactionSurveys(path=tmp / "surveys.json")
+    inbox_zero = InboxZeroTracker(path=tmp / "inbox_zero.json")
+
+    def metrics_record(t):
+        metrics.record_many(threads_processed=1, triage_count=1)
+        metrics.record_triage_latency(1.0)
+
+    cases.update({
+        "store:follow_up_add": (follow_ups.add, stores),
+        "store:metrics_record": (metrics_record, stores),
+        "store:metrics_flush": (lambda t: (metrics.record_threads_processed(1), metrics.flush()), stores[:500]),
+        "store:survey_submit": (lambda t: surveys.submit(4, feature_used="triage"), stores),
+        "store:inbox_zero_check": (lambda t: inbox_zero.record_check(len(t.messages) % 3, len(t.messages) % 5), stores[:500]),
+    })
+    return cases
+
+
+def _measure(fn: Callable, items: list, repeat: int, memory: bool) -> dict:
+    runs = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        for item in items:
+            fn(item)
+        runs.append(time.perf_counter() - started)
+    best = min(runs)
+    result = {
+        "items": len(items),
+        "us_per_item": round(best / len(items) * 1e6, 3),
+        "items_per_sec": round(len(items) / best, 1),
+        "median_us_per_item": round(statistics.median(runs) / len(items) * 1e6, 3),
+    }
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        for item in items:
+            fn(item)
+        result["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    return result
+
+
+def _rfc822(m) -> bytes:
+    msg = email.message.EmailMessage()
+    msg["Message-ID"] = f"<{m.id}@synthetic>"
+    msg["From"] = m.sender
+    msg["To"] = ", ".join(m.to)
+    msg["Subject"] = m.subject
+    msg["Date"] = m.date.strftime("%a, %d %b %Y %H:%M:%S +0000")
+    msg.set_content(m.body_plain or " ")
+    if m.body_html:
+        msg.add_alternative(m.body_html, subtype="html")
+    return msg.as_bytes()
+
+
+def _message_footprint(threads) -> dict[str, dict]:
+    """Bytes retained per message when threads are loaded from a JSON cache and parsed from RFC 822."""
+    from src.rfc822 import parse_rfc822
+    from src.models import EmailThread
+
+    threads = threads[:FOOTPRINT_THREADS]
+    messages = [m for t in threads for m in t.messages]
+    text = sum(len(m.body_plain) + len(m.body_html or "") + len(m.subject) + len(m.snippet or "") for m in messages)
+    dicts = json.loads(json.dumps([t.to_dict() for t in threads]))
+    raws = [(t.id, [_rfc822(m) for m in t.messages]) for t in threads]
+    loaders = {
+        "cache": lambda: [EmailThread.from_dict(d) for d in dicts],  # strings are shared with `dicts`
+        "rfc822": lambda: [[parse_rfc822(raw, tid) for raw in msgs] for tid, msgs in raws],
+    }
+    out = {}
+    for name, load in loaders.items():
+        gc.collect()
+        tracemalloc.start()
+        kept = load()
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del kept
+        payload = text if name == "rfc822" else 0
+        out[f"footprint:{name}"] = {
+            "messages": len(messages),
+            "bytes_per_message": round(retained / len(messages)),
+            "overhead_bytes_per_message": round(max(0, retained - payload) / len(messages)),
+        }
+    return out
+
+
+def _compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "us_per_item" not in r:
+            r["vs_baseline"] = None
+            continue
+        ratio = r["us_per_item"] / base["us_per_item"] if base["us_per_item"] else 1.0
+        r["vs_baseline"] = round(ratio, 3)
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: {base['us_per_item']} -> {r['us_per_item']} us/item ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark analyzers and stores on a synthetic mailbox")
+    p.add_argument("--threads", type=int, default=2000, help="Synthetic threads to generate")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--rules", default="10,100,1000,5000", help="Comma-separated rule-set sizes")
+    p.add_argument("--repeat", type=int, default=3, help="Timed runs per case (best is reported)")
+    p.add_argument("--only", default=None, help="Run cases whose name contains this text")
+    p.add_argument("--memory", action="store_true", help="Extra pass per case with tracemalloc peak")
+    p.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    p.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    p.add_argument("--tolerance", type=float, default=0.2, help="Flag cases slower than baseline by more than this fraction")
+    p.add_argument("--json", action="store_true", help="Print results as JSON")
+    p.add_argument("--message-budget", type=int, default=MESSAGE_OVERHEAD_BUDGET,
+                   help="Max bytes per message beyond its text (0 skips the footprint check)")
+    args = p.parse_args()
+
+    started = time.perf_counter()
+    threads = list(SyntheticMailbox(seed=args.seed).threads(args.threads))
+    gen_sec = time.perf_counter() - started
+    messages = sum(len(t.messages) for t in threads)
+    print(f"Generated {len(threads)} threads / {messages} messages in {gen_sec:.1f}s", file=sys.stderr)
+
+    rule_counts = [int(n) for n in args.rules.split(",") if n.strip()]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (fn, items) in _cases(threads, rule_counts, Path(tmp)).items():
+            if args.only and args.only not in name:
+                continue
+            results[name] = _measure(fn, items, args.repeat, args.memory)
+            print(f"  {name}: {results[name]['us_per_item']} us/item", file=sys.stderr)
+
+    footprint = {}
+    if args.message_budget and (not args.only or "footprint" in args.only):
+        footprint = _message_footprint(threads)
+
+    baseline_path = Path(args.baseline)
+    regressions = []
+    if baseline_path.exists() and not args.save_baseline:
+        regressions = _compare(results, json.loads(baseline_path.read_text(encoding="utf-8")), args.tolerance)
+    for name, f in footprint.items():
+        if f["overhead_bytes_per_message"] > args.message_budget:
+            regressions.append(f"{name}: {f['overhead_bytes_per_message']} bytes/message over budget {args.message_budget}")
+    results.update(footprint)
+
+    if args.json:
+        print(json.dumps({"results": results, "regressions": regressions}, indent=2))
+    else:
+        cols = ["items", "us_per_item", "items_per_sec"] + (["peak_kb"] if args.memory else []) + ["vs_baseline"]
+        width = max([len(n) for n in results] + [4])
+        print("case".ljust(width) + "".join(c.rjust(15) for c in cols))
+        for name, r in results.items():
+            if name not in footprint:
+                print(name.ljust(width) + "".join(str(r.get(c, "")).rjust(15) for c in cols))
+        for name, f in footprint.items():
+            print(f"{name}: {f['bytes_per_message']} bytes/message, {f['overhead_bytes_per_message']} beyond text"
+                  f" (budget {args.message_budget}, {f['messages']} messages)")
+        for line in regressions:
+            print(f"REGRESSION {line}")
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "threads": args.threads,
+            "seed": args.seed,
+            "results": results,
+        }, indent=2), encoding="utf-8")
+        print(f"Baseline written to {baseline_path}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,13 @@
 """Configuration for the email management agent."""
+import logging
 import os
 from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Paths
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
@@ -18,12 +21,76 @@ SCALEDOWN_RATE = os.getenv("SCALEDOWN_RATE", "auto")
 # Thread compression threshold (messages) - use ScaleDown above this
 THREAD_SCALEDOWN_THRESHOLD = int(os.getenv("THREAD_SCALEDOWN_THRESHOLD", "10"))
 
+# Follow-up reminders: "min_priority:hours" tiers, checked highest first.
+# Due time = last message (or when tracked) + hours of the first tier the priority reaches.
+DEFAULT_FOLLOW_UP_DUE_HOURS = "80:4,60:24,0:72"
+
+
+def parse_due_hours(raw: str) -> list[tuple[int, float]]:
+    """Parse "min_priority:hours,..." tiers, highest priority first; a malformed value falls back to the default."""
+    try:
+        tiers = []
+        for tier in raw.split(","):
+            priority, hours = tier.split(":")
+            tiers.append((int(priority), float(hours)))
+            if tiers[-1][1] < 0:
+                raise ValueError(f"negative hours in {tier.strip()!r}")
+        return sorted(tiers, reverse=True)
+    except ValueError as e:
+        logger.warning("FOLLOW_UP_DUE_HOURS=%r is invalid (%s); using %s", raw, e, DEFAULT_FOLLOW_UP_DUE_HOURS)
+        return parse_due_hours(DEFAULT_FOLLOW_UP_DUE_HOURS)
+
+
+FOLLOW_UP_DUE_HOURS = parse_due_hours(os.getenv("FOLLOW_UP_DUE_HOURS", DEFAULT_FOLLOW_UP_DUE_HOURS))
+
+# Dashboard triage runs (POST /api/jobs/triage, followed live on /api/triage/stream): the only
+# provider accepted, default threads per run, and how many streams may hold a server thread at once
+DASHBOARD_PROVIDER = os.getenv("DASHBOARD_PROVIDER", "gmail")
+TRIAGE_STREAM_MAX_THREADS = int(os.getenv("TRIAGE_STREAM_MAX_THREADS", "50"))
+TRIAGE_STREAM_MAX_CLIENTS = int(os.getenv("TRIAGE_STREAM_MAX_CLIENTS", "2"))
+# Background triage runs (streams and /api/jobs) share this many worker threads,
+# separate from the web server's; further runs wait in a queue of at most TRIAGE_JOB_QUEUE_MAX
+TRIAGE_JOB_WORKERS = int(os.getenv("TRIAGE_JOB_WORKERS", "2"))
+TRIAGE_JOB_QUEUE_MAX = int(os.getenv("TRIAGE_JOB_QUEUE_MAX", "16"))
+
+# Replay provider (--provider replay): recorded responses from REPLAY_DIR, or
+# REPLAY_SYNTHETIC_THREADS synthetic threads when no recording exists there.
+# Latency is "call=median_ms:p99_ms,..." ("*" = every call); faults are per-call probabilities.
+REPLAY_DIR = Path(os.getenv("REPLAY_DIR", str(DATA_DIR / "replay")))
+REPLAY_SYNTHETIC_THREADS = int(os.getenv("REPLAY_SYNTHETIC_THREADS", "500"))
+REPLAY_SEED = int(os.getenv("REPLAY_SEED", "0"))
+REPLAY_LATENCY_MS = os.getenv("REPLAY_LATENCY_MS", "")
+REPLAY_429_RATE = float(os.getenv("REPLAY_429_RATE", "0"))
+REPLAY_429_BURST = int(os.getenv("REPLAY_429_BURST", "3"))
+REPLAY_TIMEOUT_RATE = float(os.getenv("REPLAY_TIMEOUT_RATE", "0"))
+REPLAY_TIMEOUT_SEC = float(os.getenv("REPLAY_TIMEOUT_SEC", "30"))
+
+# Local archives (--provider mbox / maildir); message indexes are kept in MAIL_INDEX_DIR
+MBOX_PATH = os.getenv("MBOX_PATH", "")
+MAILDIR_PATH = os.getenv("MAILDIR_PATH", "")
+MAIL_INDEX_DIR = DATA_DIR / "mail_index"
+
+# Gmail message bodies: bytes decoded per part at most (0 = no limit); Outlook bodies are capped at 50,000 chars
+GMAIL_BODY_MAX_BYTES = int(os.getenv("GMAIL_BODY_MAX_BYTES", "100000"))
+# HTML-only bodies are converted to text (styles/scripts dropped, links set aside) up to this many chars
+HTML_TEXT_MAX_CHARS = int(os.getenv("HTML_TEXT_MAX_CHARS", "50000"))
+
+# Triage context: newest messages first, up to this many chars in total and per message body
+# (also what ScaleDown compresses and what draft suggestions are inferred from)
+TRIAGE_CONTEXT_MAX_CHARS = int(os.getenv("TRIAGE_CONTEXT_MAX_CHARS", "20000"))
+TRIAGE_CONTEXT_MESSAGE_MAX_CHARS = int(os.getenv("TRIAGE_CONTEXT_MESSAGE_MAX_CHARS", "4000"))
+
 # Urgent detection
 URGENT_KEYWORDS = [
     "urgent", "asap", "as soon as possible", "critical", "emergency",
     "deadline", "immediate", "time-sensitive", "action required"
 ]
 URGENT_SENDER_DOMAINS = []  # e.g. ["boss@company.com"]
+# Urgent view prescreen opt-ins (both change results: a keyword only in a skipped thread's body is missed).
+# Threads idle for more than MAX_AGE_DAYS (0 = off) and, with SKIP_BULK=1, bulk mail (promotions/updates
+# tabs, no-reply senders, "unsubscribe" snippets) are reported only if their list metadata is urgent.
+URGENT_PRESCREEN_MAX_AGE_DAYS = int(os.getenv("URGENT_PRESCREEN_MAX_AGE_DAYS", "0"))
+URGENT_PRESCREEN_SKIP_BULK = bool(int(os.getenv("URGENT_PRESCREEN_SKIP_BULK", "0")))
 
 # Smart folder names
 FOLDER_URGENT = "Urgent"
@@ -35,5 +102,16 @@ FOLDER_OTHER = "Other"
 
 # Metrics storage
 METRICS_FILE = DATA_DIR / "productivity_metrics.json"
+METRICS_DAILY_RETENTION_DAYS = int(os.getenv("METRICS_DAILY_RETENTION_DAYS", "90"))
+# Time-series metrics (SQLite): per-minute buckets, rolled up to hourly and daily
+TIMESERIES_DB = DATA_DIR / "metrics_timeseries.db"
+TIMESERIES_MINUTE_RETENTION_DAYS = int(os.getenv("TIMESERIES_MINUTE_RETENTION_DAYS", "7"))
+TIMESERIES_HOUR_RETENTION_DAYS = int(os.getenv("TIMESERIES_HOUR_RETENTION_DAYS", "180"))
+# Latest triage output as a memory-mapped columnar file (dashboard /api/inbox paging)
+TRIAGE_SNAPSHOT_FILE = DATA_DIR / "triage_snapshot.bin"
 SURVEYS_FILE = DATA_DIR / "satisfaction_surveys.json"
 INBOX_ZERO_FILE = DATA_DIR / "inbox_zero_history.json"
+# Raw inbox checks are kept this long; older ones survive only as per-day rollups
+INBOX_ZERO_RAW_RETENTION_DAYS = int(os.getenv("INBOX_ZERO_RAW_RETENTION_DAYS", "7"))
+# Background inbox-zero sampler: seconds between provider inbox_stats() probes
+INBOX_ZERO_SAMPLE_INTERVAL_SEC = int(os.getenv("INBOX_ZERO_SAMPLE_INTERVAL_SEC", "300"))
@@ -3,6 +3,7 @@ import re
 from typing import Optional
 
 from src.models import DraftSuggestion, EmailThread
+from src.reply_text import new_content
 
 
 class DraftGenerator:
@@ -35,7 +36,7 @@ class DraftGenerator:
         body = ""
         tid = template_id
         if not tid and context_summary:
-            tid = self._infer_template(context_summary, last.body_plain or "")
+            tid = self._infer_template(context_summary, new_content(last))
         if tid and tid in self.templates:
             body = self.templates[tid]
         else:
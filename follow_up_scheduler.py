@@ -0,0 +1,169 @@
+"""Follow-up reminders: min-heap of due times over tracked follow-ups."""
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+DueRule = Callable[[dict], Optional[datetime]]
+
+
+def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def default_due_rule(entry: dict) -> Optional[datetime]:
+    """
+    Due = last message time (or added_at) + hours for the entry's priority tier,
+    taken from config.FOLLOW_UP_DUE_HOURS (e.g. "80:4,60:24,0:72").
+    """
+    anchor = _parse_iso(entry.get("last_message_at")) or _parse_iso(entry.get("added_at"))
+    if anchor is None:
+        return None
+    priority = entry.get("priority", 0)
+    for min_priority, hours in config.FOLLOW_UP_DUE_HOURS:
+        if priority >= min_priority:
+            return anchor + timedelta(hours=hours)
+    return None
+
+
+class FollowUpScheduler:
+    """
+    Due-time index over follow-up entries.
+
+    schedule/cancel/next_due/pop_due are O(log n) (cancel is lazy: stale heap
+    items are skipped when they surface). due(now) walks only the part of the
+    heap that is due, O(k log k) for k due entries.
+    """
+
+    def __init__(self, due_rule: Optional[DueRule] = None):
+        self.due_rule = due_rule or default_due_rule
+        self._heap: list[tuple[float, str]] = []
+        self._due_ts: dict[str, float] = {}
+        self._entries: dict[str, dict] = {}
+        self._cond = threading.Condition(threading.RLock())
+        self._stopped = False
+
+    def schedule(self, entry: dict) -> Optional[datetime]:
+        """
+        (Re)schedule an entry by its due rule; returns the due time (None = never
+        due, or the reminder for this due time was already sent: "reminded_due_at").
+        """
+        tid = entry["thread_id"]
+        due = self.due_rule(entry)
+        reminded = _parse_iso(entry.get("reminded_due_at"))
+        if due is not None and reminded is not None and reminded.timestamp() == due.timestamp():
+            due = None
+        with self._cond:
+            old_ts = self._due_ts.pop(tid, None)
+            self._entries.pop(tid, None)
+            if due is None:
+                return None
+            ts = due.timestamp()
+            self._due_ts[tid] = ts
+            self._entries[tid] = entry
+            if old_ts == ts:
+                return due  # its heap item is still live
+            heapq.heappush(self._heap, (ts, tid))
+            if self._heap[0] == (ts, tid):
+                self._cond.notify_all()  # watch loop may need to wake earlier
+        return due
+
+    def cancel(self, thread_id: str) -> None:
+        with self._cond:
+            self._due_ts.pop(thread_id, None)
+            self._entries.pop(thread_id, None)
+            if len(self._heap) > 2 * len(self._due_ts) + 64:
+                self._heap = [(ts, tid) for ts, tid in self._heap if self._due_ts.get(tid) == ts]
+                heapq.heapify(self._heap)
+
+    def clear(self) -> None:
+        with self._cond:
+            self._heap.clear()
+            self._due_ts.clear()
+            self._entries.clear()
+
+    def _prune_top(self) -> None:
+        while self._heap and self._due_ts.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_due(self, after: Optional[datetime] = None) -> Optional[tuple[datetime, dict]]:
+        """Earliest (due_at, entry), or the earliest due strictly after `after`; None if there is none."""
+        with self._cond:
+            self._prune_top()
+            if not self._heap:
+                return None
+            limit = after.timestamp() if after is not None else float("-inf")
+            heap = self._heap
+            frontier = [(heap[0][0], 0)]
+            while frontier:
+                ts, i = heapq.heappop(frontier)
+                tid = heap[i][1]
+                if ts > limit and self._due_ts.get(tid) == ts:
+                    return datetime.fromtimestamp(ts, timezone.utc), self._entries[tid]
+                for child in (2 * i + 1, 2 * i + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child][0], child))
+            return None
+
+    def due(self, now: Optional[datetime] = None) -> list[dict]:
+        """Entries due at or before `now`, earliest first; does not remove them."""
+        limit = (now or datetime.now(timezone.utc)).timestamp()
+        out = []
+        seen = set()  # cancel + reschedule at the same time leaves two live-looking heap items
+        with self._cond:
+            heap = self._heap
+            frontier = [(heap[0][0], 0)] if heap else []
+            while frontier and frontier[0][0] <= limit:
+                ts, i = heapq.heappop(frontier)
+                tid = heap[i][1]
+                if self._due_ts.get(tid) == ts and tid not in seen:
+                    seen.add(tid)
+                    out.append({**self._entries[tid], "due_at": datetime.fromtimestamp(ts, timezone.utc).isoformat()})
+                for child in (2 * i + 1, 2 * i + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child][0], child))
+        return out
+
+    def pop_due(self, now: Optional[datetime] = None) -> list[dict]:
+        """Remove and return due entries (they stay tracked, but will not be reminded again)."""
+        limit = (now or datetime.now(timezone.utc)).timestamp()
+        out = []
+        with self._cond:
+            self._prune_top()
+            while self._heap and self._heap[0][0] <= limit:
+                ts, tid = heapq.heappop(self._heap)
+                entry = self._entries.pop(tid)
+                del self._due_ts[tid]
+                out.append({**entry, "due_at": datetime.fromtimestamp(ts, timezone.utc).isoformat()})
+                self._prune_top()
+        return out
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """Sleep up to `timeout` seconds or until an earlier due time is scheduled; False once stop() was called."""
+        with self._cond:
+            if not self._stopped:
+                self._cond.wait(timeout)
+            return not self._stopped
+
+    def start(self) -> None:
+        with self._cond:
+            self._stopped = False
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._due_ts)
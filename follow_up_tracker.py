@@ -1,43 +1,167 @@
 """Follow-up tracker: track threads that need a reply and remind."""
-import json
+import bisect
 import logging
+import threading
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 import config
+from src.agents.follow_up_scheduler import DueRule, FollowUpScheduler
 from src.models import EmailThread, TriageResult
+from src.storage import append_jsonl, atomic_write_json, file_lock, read_json, read_jsonl_from
 
 logger = logging.getLogger(__name__)
 
 FOLLOW_UPS_FILE = config.DATA_DIR / "follow_ups.json"
+COMPACT_EVERY = 1000  # journal records before the snapshot is rewritten
+WATCH_POLL_SEC = 30.0  # how often watch() catches up on follow-ups added by other processes
 
 
 class FollowUpTracker:
-    """Track threads needing reply; persist and query."""
+    """
+    Track threads needing reply; persist and query.
 
-    def __init__(self, store_path: Optional[Path] = None):
+    Entries are indexed by thread_id, with a (-priority, seq, thread_id) sorted
+    index for list_pending. Mutations append one line to a journal next to the
+    snapshot; every `compact_every` records the snapshot is rewritten atomically
+    and the journal truncated. Replaying the journal is idempotent, so a crash
+    between the two steps loses nothing. A FollowUpScheduler keeps entries
+    ordered by due time for reminders; sent reminders are journaled too
+    ("reminded_due_at" on the entry), so they are not repeated after a restart.
+
+    Several processes may share the files: mutations run under a file lock
+    after catching up on the journal, and reads replay any new journal lines
+    (or reload after another process compacted).
+    """
+
+    def __init__(
+        self,
+        store_path: Optional[Path] = None,
+        journal_path: Optional[Path] = None,
+        compact_every: int = COMPACT_EVERY,
+        due_rule: Optional[DueRule] = None,
+    ):
         self._path = store_path or FOLLOW_UPS_FILE
+        self._journal_path = journal_path or self._path.with_suffix(".journal.jsonl")
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        self._store: list[dict] = []
+        self._compact_every = compact_every
+        self._entries: dict[str, dict] = {}
+        self._keys: dict[str, tuple[int, int, str]] = {}
+        self._by_priority: list[tuple[int, int, str]] = []
+        self._seq = 0
+        self._journal_len = 0
+        self._journal_offset = 0
+        self._snapshot: Optional[tuple] = None
+        self._lock = threading.RLock()
+        self.scheduler = FollowUpScheduler(due_rule)
         self._load()
 
+    def _snapshot_signature(self) -> Optional[tuple]:
+        try:
+            st = self._path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
     def _load(self) -> None:
-        if self._path.exists():
+        self._entries.clear()
+        self._keys.clear()
+        self._by_priority.clear()
+        self.scheduler.clear()
+        self._snapshot = self._snapshot_signature()
+        if self._snapshot is not None:
+            for entry in read_json(self._path, []):
+                self._put(entry)
+        self._journal_offset = 0
+        self._journal_len = 0
+        self._replay()
+
+    def _replay(self) -> None:
+        records, self._journal_offset = read_jsonl_from(self._journal_path, self._journal_offset)
+        for rec in records:
+            if rec.get("op") == "add":
+                self._put(rec["entry"])
+            elif rec.get("op") == "remove":
+                self._drop(rec.get("thread_id", ""))
+            elif rec.get("op") == "reminded":
+                self._reminded(rec.get("thread_id", ""), rec.get("due_at"))
+        self._journal_len += len(records)
+
+    def _refresh(self) -> None:
+        """Pick up writes from other processes: replay new journal lines, or reload after a compaction."""
+        with self._lock:
+            if self._snapshot_signature() != self._snapshot:
+                self._load()
+                return
             try:
-                self._store = json.loads(self._path.read_text(encoding="utf-8"))
-            except Exception as e:
-                logger.warning("follow_up load: %s", e)
-                self._store = []
+                size = self._journal_path.stat().st_size
+            except FileNotFoundError:
+                size = 0
+            if size < self._journal_offset:
+                self._load()
+            elif size > self._journal_offset:
+                self._replay()
+
+    def _put(self, entry: dict) -> None:
+        tid = entry.get("thread_id")
+        if not tid:
+            return
+        self._drop(tid)
+        self._seq += 1
+        key = (-int(entry.get("priority", 0)), self._seq, tid)
+        bisect.insort(self._by_priority, key)
+        self._keys[tid] = key
+        self._entries[tid] = entry
+        self.scheduler.schedule(entry)
+
+    def _drop(self, thread_id: str) -> bool:
+        key = self._keys.pop(thread_id, None)
+        if key is None:
+            return False
+        i = bisect.bisect_left(self._by_priority, key)
+        del self._by_priority[i]
+        del self._entries[thread_id]
+        self.scheduler.cancel(thread_id)
+        return True
 
-    def _save(self) -> None:
+    def _reminded(self, thread_id: str, due_at: Optional[str]) -> bool:
+        entry = self._entries.get(thread_id)
+        if entry is None:
+            return False
+        entry = {**entry, "reminded_due_at": due_at}
+        self._entries[thread_id] = entry
+        self.scheduler.schedule(entry)
+        return True
+
+    def _journal(self, record: dict) -> None:
+        """Append a record; caller holds the file lock and has just refreshed."""
         try:
-            self._path.write_text(json.dumps(self._store, indent=2), encoding="utf-8")
+            append_jsonl(self._journal_path, [record])
+            self._journal_offset = self._journal_path.stat().st_size
+            self._journal_len += 1
+            if self._journal_len >= self._compact_every:
+                self._compact()
         except Exception as e:
             logger.exception("follow_up save: %s", e)
 
+    def _compact(self) -> None:
+        entries = sorted(self._entries.values(), key=lambda e: self._keys[e["thread_id"]][1])
+        atomic_write_json(self._path, entries)
+        self._journal_path.write_text("", encoding="utf-8")
+        self._snapshot = self._snapshot_signature()
+        self._journal_offset = 0
+        self._journal_len = 0
+
+    def compact(self) -> None:
+        """Rewrite the snapshot (atomic rename) and truncate the journal."""
+        with self._lock, file_lock(self._path):
+            self._refresh()
+            self._compact()
+
     def add(self, thread: EmailThread, triage_result: Optional[TriageResult] = None) -> None:
-        """Mark thread as needing follow-up."""
+        """Mark thread as needing follow-up (replaces any existing entry for the thread)."""
         entry = {
             "thread_id": thread.id,
             "provider": thread.provider,
@@ -46,23 +170,79 @@ class FollowUpTracker:
             "added_at": datetime.now(timezone.utc).isoformat(),
             "priority": triage_result.priority_score if triage_result else 50,
         }
-        # Dedupe by thread_id
-        self._store = [e for e in self._store if e.get("thread_id") != thread.id]
-        self._store.append(entry)
-        self._save()
+        with self._lock, file_lock(self._path):
+            self._refresh()
+            self._put(entry)
+            self._journal({"op": "add", "entry": entry})
 
     def remove(self, thread_id: str) -> bool:
         """Remove thread from follow-ups (e.g. after reply)."""
-        before = len(self._store)
-        self._store = [e for e in self._store if e.get("thread_id") != thread_id]
-        if len(self._store) < before:
-            self._save()
+        with self._lock, file_lock(self._path):
+            self._refresh()
+            if not self._drop(thread_id):
+                return False
+            self._journal({"op": "remove", "thread_id": thread_id})
             return True
-        return False
 
     def list_pending(self, min_priority: int = 0) -> list[dict]:
-        """Return pending follow-ups, optionally above min_priority."""
-        return [e for e in self._store if e.get("priority", 0) >= min_priority]
+        """Return pending follow-ups with priority >= min_priority, highest priority first."""
+        with self._lock:
+            self._refresh()
+            end = bisect.bisect_right(self._by_priority, (-min_priority, float("inf")))
+            return [self._entries[tid] for _, _, tid in self._by_priority[:end]]
+
+    def due(self, now: Optional[datetime] = None) -> list[dict]:
+        """Follow-ups whose reminder is due at `now` (default: current time), earliest first."""
+        self._refresh()
+        return self.scheduler.due(now)
+
+    def next_due(self, after: Optional[datetime] = None) -> Optional[tuple[datetime, dict]]:
+        self._refresh()
+        return self.scheduler.next_due(after)
+
+    def mark_reminded(self, entry: dict) -> bool:
+        """Record that the reminder for a due() entry was sent; it is due again only if the thread is re-added."""
+        with self._lock, file_lock(self._path):
+            self._refresh()
+            if not self._reminded(entry["thread_id"], entry["due_at"]):
+                return False
+            self._journal({"op": "reminded", "thread_id": entry["thread_id"], "due_at": entry["due_at"]})
+            return True
+
+    def watch(self, on_due: Callable[[dict], bool], poll_sec: float = WATCH_POLL_SEC) -> None:
+        """
+        Block, calling on_due(entry) as follow-ups come due. Entries for which
+        on_due returns True are marked reminded; declined ones (False, or on_due
+        raised) are offered again on the next poll. Wakes at the next due time,
+        or after `poll_sec` to pick up follow-ups other processes added. Ends on stop().
+        """
+        self.scheduler.start()
+        while True:
+            now = datetime.now(timezone.utc)
+            for entry in self.due(now):
+                try:
+                    accepted = on_due(entry)
+                except Exception as e:
+                    logger.exception("follow-up reminder %s: %s", entry.get("thread_id"), e)
+                    continue
+                if accepted:
+                    self.mark_reminded(entry)
+            nxt = self.next_due(after=now)
+            timeout = poll_sec if nxt is None else min(poll_sec, max(0.0, nxt[0].timestamp() - time.time()))
+            if not self.scheduler.wait(timeout):
+                return
+
+    def stop(self) -> None:
+        self.scheduler.stop()
+
+    def get(self, thread_id: str) -> Optional[dict]:
+        self._refresh()
+        return self._entries.get(thread_id)
 
     def is_follow_up(self, thread_id: str) -> bool:
-        return any(e.get("thread_id") == thread_id for e in self._store)
+        self._refresh()
+        return thread_id in self._entries
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._entries)
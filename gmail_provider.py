@@ -1,9 +1,10 @@
 """Gmail API integration."""
 import base64
 import logging
+import re
 from datetime import datetime
 from email.utils import parsedate_to_datetime
-from typing import Optional
+from typing import Iterator, Optional
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
@@ -11,32 +12,98 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 
 import config
+from src.html_text import html_to_text
 from src.models import EmailMessage, EmailThread
+from src.telemetry import provider_call
+from src.tracing import span
 
 logger = logging.getLogger(__name__)
 
+_CHARSET_RE = re.compile(r'charset="?([\w.:-]+)', re.I)
+
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly", "https://www.googleapis.com/auth/gmail.compose", "https://www.googleapis.com/auth/gmail.modify"]
+LIST_PAGE_SIZE = 500  # threads.list maximum
+METADATA_BATCH_SIZE = 50  # threads.get calls per batch request (Gmail recommends <= 50)
+METADATA_HEADERS = ["Subject", "From", "Date"]
+SNIPPET_BODY_MAX_BYTES = 150  # well under the ~200-char snippet cut: a body this small is shown whole
+
+
+def _b64_prefix(data: str, cap: int) -> bytes:
+    """Decode a base64url body, or only enough of it to yield `cap` bytes (cap <= 0: no limit)."""
+    if cap > 0 and len(data) > (cap + 2) // 3 * 4:
+        data = data[: (cap + 2) // 3 * 4]
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))[: cap if cap > 0 else None]
+
+
+def _charset(part: dict) -> str:
+    for h in part.get("headers", []):
+        if h.get("name", "").lower() == "content-type":
+            m = _CHARSET_RE.search(h.get("value", ""))
+            if m:
+                return m.group(1).lower()
+    return "utf-8"
+
+
+class PartRef:
+    """An undecoded body part from a Gmail response; EmailMessage decodes it (up to `cap` bytes) on first read."""
+
+    __slots__ = ("data", "charset", "cap")
+
+    def __init__(self, data: str, charset: str, cap: int):
+        self.data = data
+        self.charset = charset
+        self.cap = cap
+
+    def text(self) -> str:
+        raw = _b64_prefix(self.data, self.cap)
+        try:
+            return raw.decode(self.charset, errors="replace")
+        except LookupError:
+            return raw.decode("utf-8", errors="replace")
 
 
-def _decode_body(payload: dict) -> tuple[Optional[str], Optional[str]]:
-    plain, html = None, None
-    if "body" in payload and payload["body"].get("data"):
-        data = base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8", errors="replace")
-        if payload.get("mimeType", "").lower() == "text/html":
-            html = data
-        else:
-            plain = data
-    for part in payload.get("parts", []):
-        if plain and html:
-            break
+def _walk(part: dict) -> Iterator[dict]:
+    """Leaf parts depth-first, descending through nested multipart/* containers."""
+    children = part.get("parts")
+    if children:
+        for child in children:
+            yield from _walk(child)
+    else:
+        yield part
+
+
+def _decode_body(payload: dict, cap: int = config.GMAIL_BODY_MAX_BYTES):
+    """
+    Walk the MIME tree once without decoding anything but the first text/plain
+    part (at most `cap` bytes). The first text/html part is kept as a PartRef.
+    Without a text/plain part, the HTML is decoded and converted to text instead.
+    Returns (plain, html ref or None, plain charset, has_attachments, part sizes, links).
+    """
+    plain, html, charset, has_attachments = b"", None, "utf-8", False
+    sizes = []
+    found_plain = False
+    for part in _walk(payload):
         mime = part.get("mimeType", "").lower()
-        if part.get("body", {}).get("data"):
-            data = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8", errors="replace")
-            if mime == "text/plain":
-                plain = data
-            elif mime == "text/html":
-                html = data
-    return plain or "", html
+        body = part.get("body", {})
+        sizes.append((mime, body.get("size", 0)))
+        if part.get("filename") or body.get("attachmentId"):
+            has_attachments = True
+            continue
+        data = body.get("data")
+        if not data:
+            continue
+        if mime == "text/plain" and not found_plain:
+            with span("gmail.decode_body"):
+                plain = _b64_prefix(data, cap)
+            charset = _charset(part)
+            found_plain = True
+        elif mime == "text/html" and html is None:
+            html = PartRef(data, _charset(part), cap)
+    links = []
+    if not found_plain and html is not None:
+        with span("gmail.html_to_text"):
+            plain, links = html_to_text(html.text())
+    return plain, html, charset, has_attachments, sizes, links
 
 
 def _parse_date(header: Optional[str]) -> Optional[datetime]:
@@ -48,6 +115,105 @@ def _parse_date(header: Optional[str]) -> Optional[datetime]:
         return None
 
 
+def parse_thread(thread_id: str, t: dict) -> EmailThread:
+    """Build an EmailThread from a users.threads.get (format=full) response."""
+    msgs = []
+    subject = ""
+    for m in t.get("messages", []):
+        payload = m.get("payload", {})
+        headers = {h["name"].lower(): h["value"] for h in payload.get("headers", [])}
+        plain, html, charset, has_attachments, sizes, links = _decode_body(payload)
+        subject = headers.get("subject", "")
+        date = _parse_date(headers.get("date"))
+        label_ids = m.get("labelIds", [])
+        msgs.append(EmailMessage(
+            id=m["id"],
+            thread_id=thread_id,
+            sender=headers.get("from", ""),
+            to=[h for k, h in [("to", headers.get("to"))] if h] + (headers.get("to", "").split(",") if headers.get("to") else []),
+            subject=subject,
+            body_plain=plain,
+            body_html=html,
+            date=date,
+            labels=label_ids,
+            is_read="UNREAD" not in label_ids,
+            has_attachments=has_attachments,
+            snippet=m.get("snippet"),
+            charset=charset,
+            part_sizes=sizes,
+            links=links,
+        ))
+    msgs.sort(key=lambda x: x.date or datetime.min)
+    return EmailThread(id=thread_id, messages=msgs, subject=subject, provider="gmail")
+
+
+def _snippet_complete(m: dict) -> bool:
+    """
+    Whether a format=metadata message's snippet is its whole body: only for a
+    text/plain message whose body is known to fit in SNIPPET_BODY_MAX_BYTES. The
+    body size is the payload's when given, else sizeEstimate minus the returned
+    headers (an upper bound: unrequested headers count too). Anything else is
+    False, so the urgent prescreen fetches the thread.
+    """
+    payload = m.get("payload", {})
+    if payload.get("mimeType") != "text/plain":
+        return False
+    size = payload.get("body", {}).get("size")
+    if not size:
+        estimate = m.get("sizeEstimate")
+        if estimate is None:
+            return False
+        head = sum(len(f"{h['name']}: {h['value']}\r\n".encode("utf-8")) for h in payload.get("headers", []))
+        size = estimate - head - 2
+    return size <= SNIPPET_BODY_MAX_BYTES
+
+
+def parse_thread_summary(thread_id: str, t: dict) -> dict:
+    """List-level metadata from a users.threads.get (format=metadata) response."""
+    msgs = t.get("messages", [])
+    if not msgs:
+        return {"id": thread_id, "provider": "gmail"}
+    last = msgs[-1]
+    headers = {h["name"].lower(): h["value"] for h in last.get("payload", {}).get("headers", [])}
+    date = _parse_date(headers.get("date"))
+    snippet = last.get("snippet") or ""
+    return {
+        "id": thread_id,
+        "provider": "gmail",
+        "subject": headers.get("subject", ""),
+        "sender": headers.get("from", ""),
+        "snippet": snippet,
+        "labels": sorted({label for m in msgs for label in m.get("labelIds", [])}),
+        "message_count": len(msgs),
+        "last_message_at": date.isoformat() if date else None,
+        "snippet_complete": _snippet_complete(last),
+    }
+
+
+def parse_message(m: dict) -> EmailMessage:
+    """Build an EmailMessage from a users.messages.get (format=full) response."""
+    payload = m.get("payload", {})
+    headers = {h["name"].lower(): h["value"] for h in payload.get("headers", [])}
+    plain, html, charset, has_attachments, sizes, links = _decode_body(payload)
+    return EmailMessage(
+        id=m["id"],
+        thread_id=m.get("threadId", ""),
+        sender=headers.get("from", ""),
+        to=(headers.get("to") or "").split(","),
+        subject=headers.get("subject", ""),
+        body_plain=plain,
+        body_html=html,
+        date=_parse_date(headers.get("date")),
+        labels=m.get("labelIds", []),
+        is_read="UNREAD" not in m.get("labelIds", []),
+        has_attachments=has_attachments,
+        snippet=m.get("snippet"),
+        charset=charset,
+        part_sizes=sizes,
+        links=links,
+    )
+
+
 class GmailProvider:
     """Gmail API provider."""
 
@@ -58,6 +224,8 @@ class GmailProvider:
         self._token_path = token_path
         self._credentials_path = credentials_path
         self._service = None
+        # Optional callable(call, key, response) given each raw API response (ReplayRecorder)
+        self.recorder = None
         config.DATA_DIR.mkdir(parents=True, exist_ok=True)
 
     def _get_service(self):
@@ -102,69 +270,77 @@ class GmailProvider:
 
     def list_threads(self, max_results: int = 50, query: Optional[str] = None) -> list[dict]:
         service = self._get_service()
-        params = {"userId": "me", "maxResults": max_results}
+        params = {"userId": "me", "maxResults": min(max_results, LIST_PAGE_SIZE)}
         if query:
             params["q"] = query
-        resp = service.users().threads().list(**params).execute()
-        threads = resp.get("threads", [])
-        return [{"id": t["id"], "provider": "gmail"} for t in threads]
+        out = []
+        while True:
+            with provider_call("gmail", "threads.list"):
+                resp = service.users().threads().list(**params).execute()
+            out.extend({"id": t["id"], "provider": "gmail"} for t in resp.get("threads", []))
+            if len(out) >= max_results or not resp.get("nextPageToken"):
+                break
+            params["pageToken"] = resp["nextPageToken"]
+        out = out[:max_results]
+        if self.recorder:
+            self.recorder("list_threads", query or "", out)
+        return out
+
+    def list_thread_summaries(self, max_results: int = 50, query: Optional[str] = None) -> list[dict]:
+        """
+        list_threads plus subject, sender, snippet, labels and dates, from
+        threads.get(format=metadata) sent METADATA_BATCH_SIZE per batch request.
+        A thread whose metadata call fails is returned as a bare {"id", "provider"}.
+        """
+        listed = self.list_threads(max_results, query)
+        service = self._get_service()
+        summaries = {}
+
+        def collect(request_id, response, exception):
+            if exception is not None:
+                logger.warning("threads.get metadata %s: %s", request_id, exception)
+            else:
+                summaries[request_id] = parse_thread_summary(request_id, response)
+
+        for i in range(0, len(listed), METADATA_BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=collect)
+            for t in listed[i:i + METADATA_BATCH_SIZE]:
+                batch.add(
+                    service.users().threads().get(userId="me", id=t["id"], format="metadata", metadataHeaders=METADATA_HEADERS),
+                    request_id=t["id"],
+                )
+            try:
+                with provider_call("gmail", "threads.get_metadata_batch"):
+                    batch.execute()
+            except Exception as e:
+                logger.exception("list_thread_summaries batch: %s", e)
+        out = [summaries.get(t["id"], t) for t in listed]
+        if self.recorder:
+            self.recorder("list_thread_summaries", query or "", out)
+        return out
 
     def get_thread(self, thread_id: str) -> Optional[EmailThread]:
         service = self._get_service()
         try:
-            t = service.users().threads().get(userId="me", id=thread_id, format="full").execute()
+            with provider_call("gmail", "threads.get"):
+                t = service.users().threads().get(userId="me", id=thread_id, format="full").execute()
         except Exception as e:
             logger.exception("get_thread %s: %s", thread_id, e)
             return None
-        msgs = []
-        subject = ""
-        for m in t.get("messages", []):
-            payload = m.get("payload", {})
-            headers = {h["name"].lower(): h["value"] for h in payload.get("headers", [])}
-            plain, html = _decode_body(payload)
-            subject = headers.get("subject", "")
-            date = _parse_date(headers.get("date"))
-            label_ids = m.get("labelIds", [])
-            msgs.append(EmailMessage(
-                id=m["id"],
-                thread_id=thread_id,
-                sender=headers.get("from", ""),
-                to=[h for k, h in [("to", headers.get("to"))] if h] + (headers.get("to", "").split(",") if headers.get("to") else []),
-                subject=subject,
-                body_plain=plain or "",
-                body_html=html,
-                date=date,
-                labels=label_ids,
-                is_read="UNREAD" not in label_ids,
-                has_attachments=any(p.get("filename") for p in payload.get("parts", [])),
-                snippet=m.get("snippet"),
-            ))
-        msgs.sort(key=lambda x: x.date or datetime.min)
-        return EmailThread(id=thread_id, messages=msgs, subject=subject, provider="gmail")
+        if self.recorder:
+            self.recorder("get_thread", thread_id, t)
+        return parse_thread(thread_id, t)
 
     def get_message(self, message_id: str) -> Optional[EmailMessage]:
         service = self._get_service()
         try:
-            m = service.users().messages().get(userId="me", id=message_id, format="full").execute()
+            with provider_call("gmail", "messages.get"):
+                m = service.users().messages().get(userId="me", id=message_id, format="full").execute()
         except Exception:
             return None
-        payload = m.get("payload", {})
-        headers = {h["name"].lower(): h["value"] for h in payload.get("headers", [])}
-        plain, html = _decode_body(payload)
-        return EmailMessage(
-            id=m["id"],
-            thread_id=m.get("threadId", ""),
-            sender=headers.get("from", ""),
-            to=(headers.get("to") or "").split(","),
-            subject=headers.get("subject", ""),
-            body_plain=plain or "",
-            body_html=html,
-            date=_parse_date(headers.get("date")),
-            labels=m.get("labelIds", []),
-            is_read="UNREAD" not in m.get("labelIds", []),
-            has_attachments=any(p.get("filename") for p in payload.get("parts", [])),
-            snippet=m.get("snippet"),
-        )
+        if self.recorder:
+            self.recorder("get_message", message_id, m)
+        return parse_message(m)
 
     def create_draft(self, to: list[str], subject: str, body: str, thread_id: Optional[str] = None) -> Optional[str]:
         from email.mime.text import MIMEText
@@ -176,7 +352,8 @@ class GmailProvider:
         draft = {"message": {"raw": raw, "threadId": thread_id} if thread_id else {"raw": raw}}
         try:
             service = self._get_service()
-            r = service.users().drafts().create(userId="me", body=draft).execute()
+            with provider_call("gmail", "drafts.create"):
+                r = service.users().drafts().create(userId="me", body=draft).execute()
             return r.get("id")
         except Exception as e:
             logger.exception("create_draft: %s", e)
@@ -185,16 +362,32 @@ class GmailProvider:
     def list_labels(self) -> list[dict]:
         try:
             service = self._get_service()
-            r = service.users().labels().list(userId="me").execute()
+            with provider_call("gmail", "labels.list"):
+                r = service.users().labels().list(userId="me").execute()
             return [{"id": l["id"], "name": l["name"], "type": l.get("type", "user")} for l in r.get("labels", [])]
         except Exception as e:
             logger.exception("list_labels: %s", e)
             return []
 
+    def inbox_stats(self) -> Optional[dict]:
+        """INBOX label counters (one small request; no messages listed)."""
+        try:
+            service = self._get_service()
+            with provider_call("gmail", "labels.get"):
+                r = service.users().labels().get(userId="me", id="INBOX").execute()
+            stats = {"inbox_count": r.get("threadsTotal", 0), "unread_count": r.get("threadsUnread", 0)}
+            if self.recorder:
+                self.recorder("inbox_stats", "", stats)
+            return stats
+        except Exception as e:
+            logger.exception("inbox_stats: %s", e)
+            return None
+
     def apply_label(self, message_id: str, label_id: str) -> bool:
         try:
             service = self._get_service()
-            service.users().messages().modify(userId="me", id=message_id, body={"addLabelIds": [label_id]}).execute()
+            with provider_call("gmail", "messages.modify"):
+                service.users().messages().modify(userId="me", id=message_id, body={"addLabelIds": [label_id]}).execute()
             return True
         except Exception as e:
             logger.exception("apply_label: %s", e)
@@ -1,74 +1,161 @@
 """Inbox zero achievement rate: track when inbox reaches zero."""
-import json
+import bisect
 import logging
-from datetime import datetime, timezone
+import threading
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 import config
+from src.storage import read_json, update_json
 
 logger = logging.getLogger(__name__)
 
 
 class InboxZeroTracker:
-    """Track inbox zero events and compute achievement rate."""
+    """
+    Track inbox zero events and compute achievement rate.
 
-    def __init__(self, path: Optional[Path] = None):
+    Every check is folded into a per-day rollup ({"checks": n, "zero_checks": n})
+    and a running event total; raw checks and events are only kept for
+    config.INBOX_ZERO_RAW_RETENTION_DAYS. Rates are computed from the rollups.
+    """
+
+    def __init__(self, path: Optional[Path] = None, raw_retention_days: Optional[int] = None):
         self._path = path or config.INBOX_ZERO_FILE
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        self._data: dict = {"events": [], "checks": []}
+        self._retention_days = raw_retention_days if raw_retention_days is not None else config.INBOX_ZERO_RAW_RETENTION_DAYS
+        self._data: dict = self._empty()
         self._load()
 
+    @staticmethod
+    def _empty() -> dict:
+        return {"days": {}, "events_total": 0, "events": [], "checks": []}
+
     def _load(self) -> None:
-        if self._path.exists():
-            try:
-                self._data = json.loads(self._path.read_text(encoding="utf-8"))
-            except Exception as e:
-                logger.warning("inbox_zero load: %s", e)
+        self._data = read_json(self._path, None) or self._empty()
+        if "days" not in self._data:
+            self._migrate(self._data)
 
-    def _save(self) -> None:
-        try:
-            self._path.write_text(json.dumps(self._data, indent=2), encoding="utf-8")
-        except Exception as e:
-            logger.exception("inbox_zero save: %s", e)
+    def _migrate(self, data: dict) -> None:
+        """Build rollups from a file written before rollups existed (raw checks only)."""
+        days: dict[str, dict] = {}
+        for c in data.get("checks", []):
+            day = days.setdefault(c.get("at", "")[:10], {"checks": 0, "zero_checks": 0})
+            day["checks"] += 1
+            day["zero_checks"] += 1 if c.get("inbox_zero") else 0
+        data["days"] = days
+        data["events_total"] = len(data.get("events", []))
+        self._compact(data)
+
+    def _compact(self, data: dict) -> None:
+        """Drop raw checks/events older than the retention window (lists are in time order)."""
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=self._retention_days)).isoformat()
+        for key in ("checks", "events"):
+            items = data.setdefault(key, [])
+            if items and items[0].get("at", "") < cutoff:
+                i = bisect.bisect_left([it.get("at", "") for it in items], cutoff)
+                data[key] = items[i:]
 
     def record_check(self, unread_count: int, inbox_count: int) -> None:
         """Record an inbox check (unread and total in inbox)."""
-        self._data.setdefault("checks", []).append({
-            "at": datetime.now(timezone.utc).isoformat(),
-            "unread_count": unread_count,
-            "inbox_count": inbox_count,
-            "inbox_zero": inbox_count == 0,
-        })
-        if inbox_count == 0:
-            self._data.setdefault("events", []).append({
-                "at": datetime.now(timezone.utc).isoformat(),
-                "inbox_zero": True,
+        at = datetime.now(timezone.utc).isoformat()
+        is_zero = inbox_count == 0
+
+        def apply(data: dict) -> None:
+            if "days" not in data:
+                self._migrate(data)
+            day = data["days"].setdefault(at[:10], {"checks": 0, "zero_checks": 0})
+            day["checks"] += 1
+            data.setdefault("checks", []).append({
+                "at": at,
+                "unread_count": unread_count,
+                "inbox_count": inbox_count,
+                "inbox_zero": is_zero,
             })
-        self._save()
+            if is_zero:
+                day["zero_checks"] += 1
+                data["events_total"] = data.get("events_total", 0) + 1
+                data.setdefault("events", []).append({
+                    "at": at,
+                    "inbox_zero": True,
+                })
+            self._compact(data)
+
+        try:
+            # Applied to the latest file contents under a lock, so concurrent recorders don't lose checks
+            self._data = update_json(self._path, apply, self._empty)
+        except Exception as e:
+            logger.exception("inbox_zero save: %s", e)
 
     def achievement_rate(self, last_n_days: Optional[int] = 30) -> Optional[float]:
         """
         Fraction of check days where inbox zero was achieved at least once.
-        If last_n_days given, only consider checks in that window.
+        If last_n_days given, only consider days in that window (None = all days).
         """
-        checks = self._data.get("checks", [])
-        if not checks:
-            return None
-        from datetime import timedelta
-        cutoff = (datetime.now(timezone.utc) - timedelta(days=last_n_days)).isoformat()
-        day_hits = set()
-        for c in checks:
-            at = c.get("at", "")
-            if at < cutoff:
-                continue
-            day = at[:10]
-            if c.get("inbox_zero"):
-                day_hits.add(day)
-        days_checked = set(c.get("at", "")[:10] for c in checks if c.get("at", "") >= cutoff)
+        days = self._data.get("days", {})
+        if last_n_days is None:
+            window = list(days.values())
+        else:
+            today = datetime.now(timezone.utc).date()
+            keys = ((today - timedelta(days=i)).isoformat() for i in range(last_n_days + 1))
+            window = [days[k] for k in keys if k in days]
+        days_checked = sum(1 for d in window if d.get("checks"))
         if not days_checked:
             return None
-        return len(day_hits) / len(days_checked) if days_checked else 0.0
+        return sum(1 for d in window if d.get("zero_checks")) / days_checked
+
+    def daily_rollups(self, last_n_days: int = 30) -> dict[str, dict]:
+        """Per-day {"checks", "zero_checks"} for the last N days (days without checks omitted)."""
+        days = self._data.get("days", {})
+        today = datetime.now(timezone.utc).date()
+        keys = [(today - timedelta(days=i)).isoformat() for i in range(last_n_days, -1, -1)]
+        return {k: dict(days[k]) for k in keys if k in days}
 
     def total_inbox_zero_events(self) -> int:
-        return len(self._data.get("events", []))
+        return self._data.get("events_total", 0)
+
+
+class InboxZeroSampler:
+    """Record inbox checks on a schedule from a cheap counter probe (e.g. provider.inbox_stats)."""
+
+    def __init__(
+        self,
+        probe: Callable[[], Optional[dict]],
+        tracker: InboxZeroTracker,
+        interval_sec: Optional[float] = None,
+    ):
+        self.probe = probe
+        self.tracker = tracker
+        self.interval_sec = interval_sec or config.INBOX_ZERO_SAMPLE_INTERVAL_SEC
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> Optional[dict]:
+        """Probe once and record the check; returns the stats, or None if the probe failed."""
+        stats = self.probe()
+        if stats is not None:
+            self.tracker.record_check(stats["unread_count"], stats["inbox_count"])
+        return stats
+
+    def run(self, on_sample: Optional[Callable[[Optional[dict]], None]] = None) -> None:
+        """Sample until stop() is called (blocking)."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            try:
+                stats = self.sample()
+                if on_sample:
+                    on_sample(stats)
+            except Exception as e:
+                logger.exception("inbox_zero sample: %s", e)
+            self._stop.wait(self.interval_sec)
+
+    def start(self) -> "InboxZeroSampler":
+        """Run in a daemon thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.run, name="inbox-zero-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
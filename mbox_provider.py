@@ -0,0 +1,303 @@
+"""
+Local archive providers: mbox files and Maildir directories.
+
+Both keep a persistent index under MAIL_INDEX_DIR with one row per message
+(locator, Message-ID, thread key, date, subject, unread), built from headers
+only and grouped into threads with the same X-GM-THRID / References /
+In-Reply-To rules as the rules backtest (src.rfc822.thread_key). get_thread
+parses just that thread's messages: mbox bytes are sliced out of an mmap,
+Maildir messages read from their files. Reopening an indexed archive only loads the index;
+an mbox that has grown since is scanned from where the index stopped.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+import config
+from src.models import EmailMessage, EmailThread
+from src.rfc822 import header_block, header_str, iter_mbox_spans, parse_date, parse_headers, parse_rfc822, thread_key
+from src.storage import atomic_write_json, read_json
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+_TAIL_BYTES = 4096  # bytes before the indexed end, hashed to detect a rewritten (not appended) mbox
+_EPOCH = datetime.min.replace(tzinfo=timezone.utc)
+
+# Index row fields
+LOC, MSG_ID, KEY, DATE, SUBJECT, UNREAD = range(6)
+
+
+def _index_path(path: Path) -> Path:
+    digest = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:16]
+    return config.MAIL_INDEX_DIR / f"{path.name}-{digest}.json"
+
+
+def _row(headers, loc, thread_of: dict[str, str], fallback: str, unread: bool) -> list:
+    msg_id, key = thread_key(headers, thread_of, fallback)
+    date = parse_date(headers.get("Date"))
+    return [loc, msg_id, key, date.timestamp() if date else None, header_str(headers.get("Subject")), unread]
+
+
+class _LocalArchiveProvider(ABC):
+    """Index bookkeeping and the read-only EmailProvider surface shared by mbox and Maildir."""
+
+    provider_name = ""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.rows: list[list] = []
+        self._threads: dict[str, list[int]] = {}  # thread key -> row numbers
+        self._order: list[str] = []  # thread keys, newest first
+        self._by_id: dict[str, int] = {}
+
+    @property
+    def name(self) -> str:
+        return self.provider_name
+
+    def _group(self) -> None:
+        threads: dict[str, list[int]] = {}
+        by_id = {}
+        for i, row in enumerate(self.rows):
+            threads.setdefault(row[KEY], []).append(i)
+            by_id[row[MSG_ID] or self._fallback_id(row)] = i
+        newest = {k: max((self.rows[i][DATE] or 0) for i in idx) for k, idx in threads.items()}
+        self._threads, self._by_id = threads, by_id
+        self._order = sorted(threads, key=newest.__getitem__, reverse=True)
+
+    def _save_index(self, extra: dict) -> None:
+        atomic_write_json(_index_path(self.path), {"version": INDEX_VERSION, **extra, "rows": self.rows})
+
+    def _load_index(self) -> Optional[dict]:
+        data = read_json(_index_path(self.path), None)
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return None
+        return data
+
+    @abstractmethod
+    def _fallback_id(self, row: list) -> str:
+        """EmailMessage.id for a message without a Message-ID header."""
+        pass
+
+    @abstractmethod
+    def _parse(self, row: list, thread_id: str) -> Optional[EmailMessage]:
+        """Read and parse one indexed message."""
+        pass
+
+    def _thread(self, thread_id: str) -> Optional[EmailThread]:
+        idx = self._threads.get(thread_id)
+        if not idx:
+            return None
+        msgs = [m for m in (self._parse(self.rows[i], thread_id) for i in idx) if m is not None]
+        msgs.sort(key=lambda m: m.date or _EPOCH)
+        return EmailThread(id=thread_id, messages=msgs, subject=msgs[0].subject if msgs else "", provider=self.provider_name)
+
+    def list_threads(self, max_results: int = 50, query: Optional[str] = None) -> list[dict]:
+        """Newest threads first; `query` is a case-insensitive subject substring."""
+        needle = (query or "").lower()
+        out = []
+        for key in self._order:
+            if needle and not any(needle in (self.rows[i][SUBJECT] or "").lower() for i in self._threads[key]):
+                continue
+            out.append({"id": key, "provider": self.provider_name})
+            if len(out) >= max_results:
+                break
+        return out
+
+    def list_thread_summaries(self, max_results: int = 50, query: Optional[str] = None) -> list[dict]:
+        """list_threads plus the subject, unread flag, size and newest date from the index (no sender or snippet)."""
+        out = []
+        for t in self.list_threads(max_results, query):
+            idx = self._threads[t["id"]]
+            newest = max(idx, key=lambda i: self.rows[i][DATE] or 0)
+            date = self.rows[newest][DATE]
+            out.append({
+                **t,
+                "subject": self.rows[newest][SUBJECT] or "",
+                "labels": ["UNREAD"] if any(self.rows[i][UNREAD] for i in idx) else [],
+                "message_count": len(idx),
+                "last_message_at": datetime.fromtimestamp(date, timezone.utc).isoformat() if date is not None else None,
+            })
+        return out
+
+    def get_thread(self, thread_id: str) -> Optional[EmailThread]:
+        try:
+            return self._thread(thread_id)
+        except Exception as e:
+            logger.exception("get_thread %s: %s", thread_id, e)
+            return None
+
+    def get_message(self, message_id: str) -> Optional[EmailMessage]:
+        i = self._by_id.get(message_id)
+        if i is None:
+            return None
+        try:
+            return self._parse(self.rows[i], self.rows[i][KEY])
+        except Exception as e:
+            logger.exception("get_message %s: %s", message_id, e)
+            return None
+
+    def create_draft(self, to: list[str], subject: str, body: str, thread_id: Optional[str] = None) -> Optional[str]:
+        logger.warning("%s archives are read-only; draft not created", self.provider_name)
+        return None
+
+    def list_labels(self) -> list[dict]:
+        return []
+
+    def apply_label(self, message_id: str, label_id: str) -> bool:
+        return False
+
+    def inbox_stats(self) -> Optional[dict]:
+        unread = sum(1 for idx in self._threads.values() if any(self.rows[i][UNREAD] for i in idx))
+        return {"inbox_count": len(self._threads), "unread_count": unread}
+
+
+class MboxProvider(_LocalArchiveProvider):
+    """Read-only provider over an mbox file (credentials: {"path": ...}, default MBOX_PATH)."""
+
+    provider_name = "mbox"
+
+    def __init__(self, credentials: Optional[dict] = None):
+        path = (credentials or {}).get("path") or config.MBOX_PATH
+        if not path:
+            raise ValueError("mbox provider needs a path (credentials['path'] or MBOX_PATH)")
+        super().__init__(Path(path))
+        self._file = None
+        self._mm = None
+        self._open_index()
+
+    def _map(self) -> Optional[mmap.mmap]:
+        if self._mm is None and os.path.getsize(self.path):
+            self._file = open(self.path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = self._file = None
+
+    def _tail_hash(self, mm, end: int) -> str:
+        return hashlib.sha1(mm[max(0, end - _TAIL_BYTES):end]).hexdigest()
+
+    def _open_index(self) -> None:
+        """Load the saved index; scan only bytes appended since, or everything if the file was rewritten."""
+        st = os.stat(self.path)
+        data = self._load_index()
+        mm = self._map()
+        scanned_to = 0
+        if data and data.get("size") == st.st_size and data.get("mtime_ns") == st.st_mtime_ns:
+            self.rows = data["rows"]
+            self._group()
+            return
+        if data and mm is not None and data.get("size", 0) <= st.st_size and data.get("tail") == self._tail_hash(mm, data.get("size", 0)):
+            self.rows = data["rows"]
+            # The last message may have been mid-append when indexed: rescan from its "From " line
+            scanned_to = mm.rfind(b"\nFrom ", 0, self.rows.pop()[LOC][0]) + 1 if self.rows else 0
+        else:
+            self.rows = []
+        if mm is not None and scanned_to < st.st_size:
+            thread_of = {r[MSG_ID]: r[KEY] for r in self.rows if r[MSG_ID]}
+            for start, end in iter_mbox_spans(mm, scanned_to):
+                headers = parse_headers(header_block(mm, start, end))
+                unread = "Unread" in str(headers.get("X-Gmail-Labels") or "")
+                self.rows.append(_row(headers, [start, end], thread_of, f"offset-{start}", unread))
+            logger.info("Indexed %s: %d messages (from byte %d)", self.path, len(self.rows), scanned_to)
+        self._save_index({
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "tail": self._tail_hash(mm, st.st_size) if mm is not None else "",
+        })
+        self._group()
+
+    def _fallback_id(self, row: list) -> str:
+        return f"{row[KEY]}:{row[LOC][0]}"
+
+    def _parse(self, row: list, thread_id: str) -> Optional[EmailMessage]:
+        start, end = row[LOC]
+        with self._lock:
+            raw = self._map()[start:end]
+        return parse_rfc822(raw, thread_id, self._fallback_id(row))
+
+    def thread_spans(self) -> Iterator[tuple[str, Optional[float], list[tuple[int, int]]]]:
+        """(thread key, newest message timestamp, message byte spans) per thread, for the rules backtest."""
+        for key, idx in self._threads.items():
+            dates = [self.rows[i][DATE] for i in idx if self.rows[i][DATE] is not None]
+            yield key, max(dates) if dates else None, [tuple(self.rows[i][LOC]) for i in idx]
+
+
+class MaildirProvider(_LocalArchiveProvider):
+    """
+    Read-only provider over a Maildir (credentials: {"path": ...}, default MAILDIR_PATH).
+    Rows are keyed by the file's unique name (before ":2,"), so flag changes and
+    moves between new/ and cur/ reuse the index; only unseen files are read.
+    """
+
+    provider_name = "maildir"
+
+    def __init__(self, credentials: Optional[dict] = None):
+        path = (credentials or {}).get("path") or config.MAILDIR_PATH
+        if not path:
+            raise ValueError("maildir provider needs a path (credentials['path'] or MAILDIR_PATH)")
+        super().__init__(Path(path))
+        self._files: dict[str, Path] = {}
+        self._open_index()
+
+    def _scan_dir(self) -> dict[str, Path]:
+        files = {}
+        for sub in ("cur", "new"):
+            d = self.path / sub
+            if not d.is_dir():
+                continue
+            with os.scandir(d) as it:
+                for entry in it:
+                    if entry.is_file() and not entry.name.startswith("."):
+                        files[entry.name.split(":", 1)[0]] = Path(entry.path)
+        return files
+
+    @staticmethod
+    def _unread(path: Path) -> bool:
+        _, _, flags = path.name.partition(":2,")
+        return "S" not in flags
+
+    def _open_index(self) -> None:
+        self._files = self._scan_dir()
+        data = self._load_index()
+        known = {r[LOC]: r for r in (data or {}).get("rows", []) if r[LOC] in self._files}
+        self.rows = list(known.values())
+        thread_of = {r[MSG_ID]: r[KEY] for r in self.rows if r[MSG_ID]}
+        added = 0
+        for name in sorted(set(self._files) - set(known)):
+            with open(self._files[name], "rb") as f:
+                head = f.read(64 * 1024)
+            headers = parse_headers(head)
+            self.rows.append(_row(headers, name, thread_of, name, False))
+            added += 1
+        for row in self.rows:
+            row[UNREAD] = self._unread(self._files[row[LOC]])
+        if added or data is None or len(known) != len(data.get("rows", [])):
+            logger.info("Indexed %s: %d messages (%d new)", self.path, len(self.rows), added)
+            self._save_index({})
+        self._group()
+
+    def _fallback_id(self, row: list) -> str:
+        return row[LOC]
+
+    def _parse(self, row: list, thread_id: str) -> Optional[EmailMessage]:
+        path = self._files.get(row[LOC])
+        if path is None or not path.exists():
+            path = self._scan_dir().get(row[LOC])  # flags changed since the index was loaded
+            if path is None:
+                return None
+            self._files[row[LOC]] = path
+        msg = parse_rfc822(path.read_bytes(), thread_id, self._fallback_id(row))
+        msg.is_read = not self._unread(path)
+        return msg
@@ -4,6 +4,7 @@ from datetime import datetime
 from typing import Optional
 
 from src.models import EmailMessage, EmailThread, MeetingInfo
+from src.reply_text import new_content
 
 
 class MeetingExtractor:
@@ -35,7 +36,9 @@ class MeetingExtractor:
         info = MeetingInfo()
         text = (thread.subject or "") + "\n"
         for m in thread.messages:
-            text += (m.body_plain or "") + "\n" + (m.snippet or "") + "\n"
+            text += new_content(m) + "\n" + (m.snippet or "") + "\n"
+            if m.links:  # hrefs of HTML bodies converted to text
+                text += "\n".join(m.links) + "\n"
         # Links
         links = self.ZOOM_TEAMS.findall(text)
         if links:
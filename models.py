@@ -1,8 +1,10 @@
 """Data models for emails, threads, and agent outputs."""
+import io
+import sys
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Any, Iterable, Optional, Union
 
 
 class Category(str, Enum):
@@ -14,24 +16,151 @@ class Category(str, Enum):
     OTHER = "other"
 
 
-@dataclass
+CHARS_PER_TOKEN = 4  # rough English average, for token budgets
+
+
+def _intern_all(values) -> tuple[str, ...]:
+    return tuple(sys.intern(v) for v in values or ())
+
+
 class EmailMessage:
-    """Single email message."""
-    id: str
-    thread_id: str
-    sender: str
-    to: list[str]
-    subject: str
-    body_plain: str
-    body_html: Optional[str] = None
-    date: Optional[datetime] = None
-    labels: list[str] = field(default_factory=list)
-    is_read: bool = False
-    has_attachments: bool = False
-    snippet: Optional[str] = None
+    """
+    Single email message.
 
+    Slotted and compact, since caches hold hundreds of thousands of these:
+    sender, recipients, labels and thread_id are interned (they repeat across
+    a mailbox), `to` and `labels` are tuples, and bodies may be given as raw
+    encoded bytes (with `charset`) or as any object with a `text()` method (a
+    provider's reference to an undecoded part). Either is decoded on first
+    access and the text replaces it, so an HTML part nobody reads stays raw.
+    `part_sizes` lists (mime type, bytes) for every MIME leaf part, when the
+    provider knows them, so analyzers can skip huge parts without reading them.
+    `links` holds the link targets of an HTML body that was converted to text.
+    """
 
-@dataclass
+    __slots__ = (
+        "id", "thread_id", "sender", "to", "subject", "_body_plain", "_body_html",
+        "charset", "date", "labels", "is_read", "has_attachments", "snippet", "part_sizes", "links",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        thread_id: str,
+        sender: str,
+        to: Iterable[str],
+        subject: str,
+        body_plain: Union[str, bytes, Any],
+        body_html: Union[str, bytes, Any, None] = None,
+        date: Optional[datetime] = None,
+        labels: Iterable[str] = (),
+        is_read: bool = False,
+        has_attachments: bool = False,
+        snippet: Optional[str] = None,
+        charset: str = "utf-8",
+        part_sizes: Iterable[tuple[str, int]] = (),
+        links: Iterable[str] = (),
+    ):
+        self.id = id
+        self.thread_id = sys.intern(thread_id)
+        self.sender = sys.intern(sender)
+        self.to = _intern_all(to)
+        self.subject = subject
+        self._body_plain = body_plain
+        self._body_html = body_html
+        self.charset = sys.intern(charset)
+        self.date = date
+        self.labels = _intern_all(labels)
+        self.is_read = is_read
+        self.has_attachments = has_attachments
+        self.snippet = snippet
+        self.part_sizes = tuple((sys.intern(mime), size) for mime, size in part_sizes)
+        self.links = tuple(links)
+
+    def _decode(self, raw) -> str:
+        if not isinstance(raw, bytes):
+            return raw.text()
+        try:
+            return raw.decode(self.charset, errors="replace")
+        except LookupError:  # unknown charset name from a MIME header
+            return raw.decode("utf-8", errors="replace")
+
+    @property
+    def body_plain(self) -> str:
+        body = self._body_plain
+        if not isinstance(body, str):
+            body = self._body_plain = self._decode(body)
+        return body
+
+    @body_plain.setter
+    def body_plain(self, value: Union[str, bytes]) -> None:
+        self._body_plain = value
+
+    @property
+    def body_html(self) -> Optional[str]:
+        body = self._body_html
+        if body is not None and not isinstance(body, str):
+            body = self._body_html = self._decode(body)
+        return body
+
+    @body_html.setter
+    def body_html(self, value: Union[str, bytes, None]) -> None:
+        self._body_html = value
+
+    def __repr__(self) -> str:
+        return (
+            f"EmailMessage(id={self.id!r}, thread_id={self.thread_id!r}, sender={self.sender!r}, "
+            f"subject={self.subject!r}, date={self.date!r}, labels={self.labels!r})"
+        )
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def to_dict(self) -> dict:
+        """JSON-serializable form (local caches, fixtures)."""
+        return {
+            "id": self.id,
+            "thread_id": self.thread_id,
+            "sender": self.sender,
+            "to": list(self.to),
+            "subject": self.subject,
+            "body_plain": self.body_plain,
+            "body_html": self.body_html,
+            "date": self.date.isoformat() if self.date else None,
+            "labels": list(self.labels),
+            "is_read": self.is_read,
+            "has_attachments": self.has_attachments,
+            "snippet": self.snippet,
+            "part_sizes": [list(p) for p in self.part_sizes],
+            "links": list(self.links),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EmailMessage":
+        date = data.get("date")
+        return cls(
+            id=data["id"],
+            thread_id=data.get("thread_id", ""),
+            sender=data.get("sender", ""),
+            to=data.get("to") or (),
+            subject=data.get("subject", ""),
+            body_plain=data.get("body_plain") or "",
+            body_html=data.get("body_html"),
+            date=datetime.fromisoformat(date) if date else None,
+            labels=data.get("labels") or (),
+            is_read=data.get("is_read", False),
+            has_attachments=data.get("has_attachments", False),
+            snippet=data.get("snippet"),
+            part_sizes=data.get("part_sizes") or (),
+            links=data.get("links") or (),
+        )
+
+
+@dataclass(slots=True)
 class EmailThread:
     """Thread of messages (can be 50+). Use ScaleDown for long threads."""
     id: str
@@ -44,15 +173,87 @@ class EmailThread:
         return len(self.messages)
 
     def to_context_string(self, max_messages: Optional[int] = None) -> str:
-        """Serialize thread for compression or LLM context."""
+        """Serialize thread for compression or LLM context (each message's new content, without quoted history)."""
+        from src.reply_text import new_content
         msgs = self.messages[:max_messages] if max_messages else self.messages
         parts = []
         for m in msgs:
             parts.append(
-                f"From: {m.sender}\nDate: {m.date}\nSubject: {m.subject}\n\n{m.body_plain or m.snippet or ''}"
+                f"From: {m.sender}\nDate: {m.date}\nSubject: {m.subject}\n\n{new_content(m) or m.snippet or ''}"
             )
         return "\n---\n".join(parts)
 
+    def to_budgeted_context(
+        self,
+        max_chars: int = 20_000,
+        per_message_chars: int = 4_000,
+        max_tokens: Optional[int] = None,
+    ) -> "ThreadContext":
+        """
+        Serialize the newest messages that fit in `max_chars` (or `max_tokens`),
+        each body cut to `per_message_chars`, oldest-first in the output. Walks
+        newest-first and stops at the budget, so older messages are never read;
+        the newest message is always included, trimmed if needed.
+        """
+        from src.reply_text import new_content
+        if max_tokens is not None:
+            max_chars = max_tokens * CHARS_PER_TOKEN
+        sep = "\n---\n"
+        selected: list[tuple[str, str, str]] = []  # (id, header, body), newest first
+        used = truncated = 0
+        for m in reversed(self.messages):
+            header = f"From: {m.sender}\nDate: {m.date}\nSubject: {m.subject}\n\n"
+            body = new_content(m) or m.snippet or ""
+            fixed = len(header) + (len(sep) if selected else 0)
+            cap = per_message_chars
+            if used + fixed + min(len(body), cap) > max_chars:
+                if selected:
+                    break
+                cap = min(cap, max(0, max_chars - fixed))
+            if len(body) > cap:
+                body = body[:cap]
+                truncated += 1
+            selected.append((m.id, header, body))
+            used += fixed + len(body)
+        buf = io.StringIO()
+        for i, (_, header, body) in enumerate(reversed(selected)):
+            if i:
+                buf.write(sep)
+            buf.write(header)
+            buf.write(body)
+        return ThreadContext(
+            text=buf.getvalue(),
+            message_ids=[mid for mid, _, _ in reversed(selected)],
+            omitted=len(self.messages) - len(selected),
+            truncated=truncated,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "subject": self.subject,
+            "provider": self.provider,
+            "messages": [m.to_dict() for m in self.messages],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EmailThread":
+        return cls(
+            id=data["id"],
+            messages=[EmailMessage.from_dict(m) for m in data.get("messages", [])],
+            subject=data.get("subject", ""),
+            provider=data.get("provider", "cache"),
+        )
+
+
+@dataclass(slots=True)
+class ThreadContext:
+    """A thread serialized under a size budget (EmailThread.to_budgeted_context)."""
+    text: str
+    message_ids: list[str]  # messages included, oldest first
+    omitted: int  # older messages left out
+    truncated: int  # included messages whose body was cut
+
 
 @dataclass
 class TriageResult:
@@ -5,11 +5,88 @@ from typing import Optional
 
 import requests
 
+from src.html_text import html_to_text
 from src.models import EmailMessage, EmailThread
+from src.telemetry import provider_call
 
 logger = logging.getLogger(__name__)
 
 GRAPH_BASE = "https://graph.microsoft.com/v1.0"
+BODY_MAX_CHARS = 50000
+# Only the properties EmailMessage uses; bodies come back as text (Prefer header), not HTML
+MESSAGE_SELECT = "id,conversationId,subject,from,toRecipients,receivedDateTime,isRead,hasAttachments,bodyPreview,body"
+TEXT_BODY_PREFER = 'outlook.body-content-type="text"'
+CONVERSATION_PAGE_SIZE = 50
+CONVERSATION_MAX_PAGES = 20  # stop following @odata.nextLink after this many pages
+# Inbox listing for the urgent prescreen: metadata and the 255-char preview, no bodies
+SUMMARY_SELECT = "id,conversationId,subject,from,receivedDateTime,isRead,bodyPreview,categories,inferenceClassification"
+
+
+def _parse_received(received: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(received.replace("Z", "+00:00")) if received else None
+    except Exception:
+        return None
+
+
+def _body(body: dict) -> tuple[str, Optional[str], list[str]]:
+    """(plain text, original HTML or None, link targets) for a Graph itemBody."""
+    content = body.get("content") or ""
+    if (body.get("contentType") or "").lower() == "html":
+        text, links = html_to_text(content, BODY_MAX_CHARS)
+        return text, content, links
+    return content[:BODY_MAX_CHARS], None, []
+
+
+def parse_conversation(thread_id: str, data: dict) -> EmailThread:
+    """Build an EmailThread from a Graph messages response filtered to one conversationId."""
+    msgs = []
+    subject = ""
+    for m in data.get("value", []):
+        plain, html, links = _body(m.get("body", {}))
+        sender = (m.get("from", {}).get("emailAddress", {}) or {})
+        sender_str = sender.get("address", "")
+        to_recips = [e.get("emailAddress", {}).get("address") for e in m.get("toRecipients", [])]
+        to_list = [a for a in to_recips if a]
+        subject = m.get("subject", "")
+        msgs.append(EmailMessage(
+            id=m["id"],
+            thread_id=thread_id,
+            sender=sender_str,
+            to=to_list,
+            subject=subject,
+            body_plain=plain,
+            body_html=html,
+            date=_parse_received(m.get("receivedDateTime")),
+            labels=[],  # Graph uses categories; could map
+            is_read=m.get("isRead", False),
+            has_attachments=m.get("hasAttachments", False),
+            snippet=m.get("bodyPreview", ""),
+            links=links,
+        ))
+    return EmailThread(id=thread_id, messages=msgs, subject=subject, provider="outlook")
+
+
+def parse_message(m: dict) -> EmailMessage:
+    """Build an EmailMessage from a Graph message resource."""
+    plain, html, links = _body(m.get("body", {}))
+    sender = (m.get("from", {}).get("emailAddress", {}) or {}).get("address", "")
+    to_list = [e.get("emailAddress", {}).get("address") for e in m.get("toRecipients", []) if e.get("emailAddress", {}).get("address")]
+    return EmailMessage(
+        id=m["id"],
+        thread_id=m.get("conversationId", ""),
+        sender=sender,
+        to=to_list,
+        subject=m.get("subject", ""),
+        body_plain=plain,
+        body_html=html,
+        date=_parse_received(m.get("receivedDateTime")),
+        labels=[],
+        is_read=m.get("isRead", False),
+        has_attachments=m.get("hasAttachments", False),
+        snippet=m.get("bodyPreview", ""),
+        links=links,
+    )
 
 
 class OutlookProvider:
@@ -21,6 +98,8 @@ class OutlookProvider:
         self._tenant_id = credentials.get("tenant_id") or credentials.get("AZURE_TENANT_ID")
         self._access_token = credentials.get("access_token")
         self._refresh_token = credentials.get("refresh_token")
+        # Optional callable(call, key, response) given each raw API response (ReplayRecorder)
+        self.recorder = None
 
     def _get_token(self) -> Optional[str]:
         if self._access_token:
@@ -39,8 +118,9 @@ class OutlookProvider:
             data["grant_type"] = "refresh_token"
             data["refresh_token"] = self._refresh_token
         try:
-            r = requests.post(url, data=data, timeout=10)
-            r.raise_for_status()
+            with provider_call("outlook", "token"):
+                r = requests.post(url, data=data, timeout=10)
+                r.raise_for_status()
             j = r.json()
             self._access_token = j.get("access_token")
             self._refresh_token = j.get("refresh_token") or self._refresh_token
@@ -49,110 +129,127 @@ class OutlookProvider:
             logger.exception("Outlook token: %s", e)
             return None
 
-    def _headers(self) -> dict:
+    def _headers(self, text_body: bool = False) -> dict:
         token = self._get_token()
-        return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"} if token else {}
+        if not token:
+            return {}
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        if text_body:
+            headers["Prefer"] = TEXT_BODY_PREFER
+        return headers
 
     @property
     def name(self) -> str:
         return "outlook"
 
-    def list_threads(self, max_results: int = 50, query: Optional[str] = None) -> list[dict]:
-        # Graph uses conversations; we map each message's conversationId to a "thread"
-        url = f"{GRAPH_BASE}/me/mailFolders/inbox/messages?$top={max_results}&$orderby=receivedDateTime desc"
+    def _inbox_messages(self, max_results: int, query: Optional[str], select: str) -> list[dict]:
+        """Newest inbox messages, one per conversation (the newest), with the `select`ed properties."""
+        url = f"{GRAPH_BASE}/me/mailFolders/inbox/messages?$top={max_results}&$orderby=receivedDateTime desc&$select={select}"
         if query:
             escaped = query.replace("'", "''")
             url += f"&$filter=contains(subject,'{escaped}')"
-        try:
+        with provider_call("outlook", "messages.list"):
             r = requests.get(url, headers=self._headers(), timeout=15)
             r.raise_for_status()
-            data = r.json()
-            seen = set()
-            threads = []
-            for m in data.get("value", []):
-                cid = m.get("conversationId") or m.get("id")
-                if cid not in seen:
-                    seen.add(cid)
-                    threads.append({"id": cid, "provider": "outlook"})
-            return threads[:max_results]
+        seen = set()
+        out = []
+        for m in r.json().get("value", []):
+            cid = m.get("conversationId") or m.get("id")
+            if cid not in seen:
+                seen.add(cid)
+                out.append(m)
+        return out[:max_results]
+
+    def list_threads(self, max_results: int = 50, query: Optional[str] = None) -> list[dict]:
+        # Graph uses conversations; we map each message's conversationId to a "thread"
+        try:
+            threads = [
+                {"id": m.get("conversationId") or m.get("id"), "provider": "outlook"}
+                for m in self._inbox_messages(max_results, query, "id,conversationId")
+            ]
+            if self.recorder:
+                self.recorder("list_threads", query or "", threads)
+            return threads
         except Exception as e:
             logger.exception("list_threads: %s", e)
             return []
 
+    def list_thread_summaries(self, max_results: int = 50, query: Optional[str] = None) -> list[dict]:
+        """
+        list_threads plus the newest inbox message's subject, sender, preview and
+        categories, from the same single listing call. Focused Inbox "Other"
+        mail gets the FOCUSED_OTHER label.
+        """
+        try:
+            summaries = []
+            for m in self._inbox_messages(max_results, query, SUMMARY_SELECT):
+                labels = list(m.get("categories") or [])
+                if not m.get("isRead", True):
+                    labels.append("UNREAD")
+                if m.get("inferenceClassification") == "other":
+                    labels.append("FOCUSED_OTHER")
+                received = _parse_received(m.get("receivedDateTime"))
+                summaries.append({
+                    "id": m.get("conversationId") or m.get("id"),
+                    "provider": "outlook",
+                    "subject": m.get("subject") or "",
+                    "sender": ((m.get("from") or {}).get("emailAddress") or {}).get("address", ""),
+                    "snippet": m.get("bodyPreview") or "",
+                    "labels": labels,
+                    "message_count": None,  # the conversation may continue outside the inbox
+                    "last_message_at": received.isoformat() if received else None,
+                })
+            if self.recorder:
+                self.recorder("list_thread_summaries", query or "", summaries)
+            return summaries
+        except Exception as e:
+            logger.exception("list_thread_summaries: %s", e)
+            return []
+
     def get_thread(self, thread_id: str) -> Optional[EmailThread]:
-        # Fetch messages in conversation
-        url = f"{GRAPH_BASE}/me/messages?$filter=conversationId eq '{thread_id}'&$orderby=receivedDateTime asc"
+        # Fetch messages in conversation newest first, following @odata.nextLink for long threads,
+        # so the page cap drops the oldest history rather than the latest replies
+        url = f"{GRAPH_BASE}/me/messages"
+        params = {
+            "$filter": f"conversationId eq '{thread_id}'",
+            "$orderby": "receivedDateTime desc",
+            "$select": MESSAGE_SELECT,
+            "$top": CONVERSATION_PAGE_SIZE,
+        }
+        data = {"value": []}
         try:
-            r = requests.get(url, headers=self._headers(), timeout=15)
-            r.raise_for_status()
-            data = r.json()
+            headers = self._headers(text_body=True)
+            for _ in range(CONVERSATION_MAX_PAGES):
+                with provider_call("outlook", "conversation.get"):
+                    r = requests.get(url, headers=headers, params=params, timeout=15)
+                    r.raise_for_status()
+                page = r.json()
+                data["value"].extend(page.get("value", []))
+                url, params = page.get("@odata.nextLink"), None  # nextLink carries the query
+                if not url:
+                    break
+            else:
+                logger.warning("get_thread %s: stopped after %d pages, older messages omitted", thread_id, CONVERSATION_MAX_PAGES)
         except Exception as e:
             logger.exception("get_thread %s: %s", thread_id, e)
             return None
-        msgs = []
-        subject = ""
-        for m in data.get("value", []):
-            body = m.get("body", {})
-            content = (body.get("content") or "") if body.get("contentType") == "text" else ""
-            if body.get("contentType") == "html":
-                content = (body.get("content") or "").replace("<br>", "\n")  # crude plain fallback
-            sender = (m.get("from", {}).get("emailAddress", {}) or {})
-            sender_str = sender.get("address", "")
-            to_recips = [e.get("emailAddress", {}).get("address") for e in m.get("toRecipients", [])]
-            to_list = [a for a in to_recips if a]
-            received = m.get("receivedDateTime")
-            try:
-                date = datetime.fromisoformat(received.replace("Z", "+00:00")) if received else None
-            except Exception:
-                date = None
-            subject = m.get("subject", "")
-            msgs.append(EmailMessage(
-                id=m["id"],
-                thread_id=thread_id,
-                sender=sender_str,
-                to=to_list,
-                subject=subject,
-                body_plain=content[:50000],
-                body_html=body.get("content") if body.get("contentType") == "html" else None,
-                date=date,
-                labels=[],  # Graph uses categories; could map
-                is_read=m.get("isRead", False),
-                has_attachments=m.get("hasAttachments", False),
-                snippet=m.get("bodyPreview", ""),
-            ))
-        return EmailThread(id=thread_id, messages=msgs, subject=subject, provider="outlook")
+        data["value"].reverse()  # oldest first, like the other providers
+        if self.recorder:
+            self.recorder("get_thread", thread_id, data)
+        return parse_conversation(thread_id, data)
 
     def get_message(self, message_id: str) -> Optional[EmailMessage]:
-        url = f"{GRAPH_BASE}/me/messages/{message_id}"
+        url = f"{GRAPH_BASE}/me/messages/{message_id}?$select={MESSAGE_SELECT}"
         try:
-            r = requests.get(url, headers=self._headers(), timeout=15)
-            r.raise_for_status()
+            with provider_call("outlook", "messages.get"):
+                r = requests.get(url, headers=self._headers(text_body=True), timeout=15)
+                r.raise_for_status()
             m = r.json()
         except Exception:
             return None
-        body = m.get("body", {})
-        content = body.get("content") or ""
-        sender = (m.get("from", {}).get("emailAddress", {}) or {}).get("address", "")
-        to_list = [e.get("emailAddress", {}).get("address") for e in m.get("toRecipients", []) if e.get("emailAddress", {}).get("address")]
-        received = m.get("receivedDateTime")
-        try:
-            date = datetime.fromisoformat(received.replace("Z", "+00:00")) if received else None
-        except Exception:
-            date = None
-        return EmailMessage(
-            id=m["id"],
-            thread_id=m.get("conversationId", ""),
-            sender=sender,
-            to=to_list,
-            subject=m.get("subject", ""),
-            body_plain=content[:50000],
-            body_html=content if (body.get("contentType") == "html") else None,
-            date=date,
-            labels=[],
-            is_read=m.get("isRead", False),
-            has_attachments=m.get("hasAttachments", False),
-            snippet=m.get("bodyPreview", ""),
-        )
+        if self.recorder:
+            self.recorder("get_message", message_id, m)
+        return parse_message(m)
 
     def create_draft(self, to: list[str], subject: str, body: str, thread_id: Optional[str] = None) -> Optional[str]:
         payload = {
@@ -163,8 +260,9 @@ class OutlookProvider:
         if thread_id:
             payload["conversationId"] = thread_id
         try:
-            r = requests.post(f"{GRAPH_BASE}/me/messages", headers=self._headers(), json=payload, timeout=15)
-            r.raise_for_status()
+            with provider_call("outlook", "drafts.create"):
+                r = requests.post(f"{GRAPH_BASE}/me/messages", headers=self._headers(), json=payload, timeout=15)
+                r.raise_for_status()
             return r.json().get("id")
         except Exception as e:
             logger.exception("create_draft: %s", e)
@@ -172,24 +270,45 @@ class OutlookProvider:
 
     def list_labels(self) -> list[dict]:
         try:
-            r = requests.get(f"{GRAPH_BASE}/me/mailFolders", headers=self._headers(), timeout=15)
-            r.raise_for_status()
+            with provider_call("outlook", "folders.list"):
+                r = requests.get(f"{GRAPH_BASE}/me/mailFolders", headers=self._headers(), timeout=15)
+                r.raise_for_status()
             data = r.json()
             return [{"id": f["id"], "name": f["displayName"], "type": "folder"} for f in data.get("value", [])]
         except Exception as e:
             logger.exception("list_labels: %s", e)
             return []
 
+    def inbox_stats(self) -> Optional[dict]:
+        """Inbox folder counters (one small request; no messages listed)."""
+        try:
+            with provider_call("outlook", "folders.get"):
+                r = requests.get(
+                    f"{GRAPH_BASE}/me/mailFolders/inbox?$select=totalItemCount,unreadItemCount",
+                    headers=self._headers(),
+                    timeout=15,
+                )
+                r.raise_for_status()
+            data = r.json()
+            stats = {"inbox_count": data.get("totalItemCount", 0), "unread_count": data.get("unreadItemCount", 0)}
+            if self.recorder:
+                self.recorder("inbox_stats", "", stats)
+            return stats
+        except Exception as e:
+            logger.exception("inbox_stats: %s", e)
+            return None
+
     def apply_label(self, message_id: str, label_id: str) -> bool:
         # Graph: move to folder
         try:
-            r = requests.post(
-                f"{GRAPH_BASE}/me/messages/{message_id}/move",
-                headers=self._headers(),
-                json={"destinationId": label_id},
-                timeout=15,
-            )
-            r.raise_for_status()
+            with provider_call("outlook", "messages.move"):
+                r = requests.post(
+                    f"{GRAPH_BASE}/me/messages/{message_id}/move",
+                    headers=self._headers(),
+                    json={"destinationId": label_id},
+                    timeout=15,
+                )
+                r.raise_for_status()
             return True
         except Exception as e:
             logger.exception("apply_label: %s", e)
@@ -3,23 +3,32 @@
 Email assistant plugin CLI: triage, smart folders, drafts, follow-ups, metrics.
 Usage:
   python plugin_cli.py triage --provider gmail
+  python plugin_cli.py triage --profile [--profile-out trace.json] [--memprofile]
   python plugin_cli.py folders --provider gmail --max 20
   python plugin_cli.py urgent --provider gmail
   python plugin_cli.py draft <thread_id> [--template acknowledge]
   python plugin_cli.py metrics
   python plugin_cli.py survey --rating 5 --comment "Great"
   python plugin_cli.py inbox-zero --unread 0 --inbox 0
+  python plugin_cli.py inbox-zero [--watch --interval 300]
+  python plugin_cli.py followups due [--watch]
+  python plugin_cli.py rules backtest --rules rules.json --mbox archive.mbox --since-days 180
+  python plugin_cli.py record --provider gmail --max 200 --out data/replay
+  python plugin_cli.py triage --provider replay
 """
 import argparse
 import json
 import logging
 import sys
+from datetime import datetime, timezone
 from pathlib import Path
 
 # Ensure project root on path
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
+import config
 from src.assistant import EmailAssistant
+from src.deliverables.inbox_zero import InboxZeroSampler
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
@@ -30,20 +39,26 @@ def cmd_triage(args):
     except Exception as e:
         print(f"Provider init failed: {e}", file=sys.stderr)
         return 1
-    threads = assistant.provider.list_threads(max_results=args.max)
-    for t in threads[: args.max]:
-        thread = assistant.provider.get_thread(t["id"])
-        if not thread:
-            continue
-        triage = assistant.run_triage(thread)
-        print(json.dumps({
-            "thread_id": thread.id,
-            "subject": (thread.subject or "")[:60],
-            "category": triage.category.value,
-            "priority": triage.priority_score,
-            "urgent": triage.is_urgent,
-            "folder": triage.suggested_folder,
-        }, indent=2))
+    from src.triage_snapshot import write_snapshot
+    rows = []
+    events = assistant.iter_triage(max_threads=args.max)
+    try:
+        for event, row in events:
+            if event != "thread":
+                continue
+            rows.append(row)
+            print(json.dumps({
+                "thread_id": row["thread_id"],
+                "subject": row["subject"][:60],
+                "category": row["category"],
+                "priority": row["priority"],
+                "urgent": row["urgent"],
+                "folder": row["folder"],
+            }, indent=2))
+    finally:
+        events.close()  # records the batch's metrics
+        assistant.metrics.flush()
+    write_snapshot(rows)  # dashboard /api/inbox pages over the latest run
     return 0
 
 
@@ -59,6 +74,7 @@ def cmd_urgent(args):
     assistant = EmailAssistant(provider_name=args.provider)
     items = assistant.get_urgent(max_threads=args.max)
     print(json.dumps(items, indent=2))
+    print(json.dumps({"cascade": assistant.last_urgent_cascade}), file=sys.stderr)
     return 0
 
 
@@ -93,9 +109,97 @@ def cmd_survey(args):
 
 def cmd_inbox_zero(args):
     assistant = EmailAssistant(provider_name=args.provider or "gmail")
-    assistant.record_inbox_check(unread_count=args.unread, inbox_count=args.inbox)
+    if args.watch:
+        sampler = InboxZeroSampler(assistant.provider.inbox_stats, assistant.inbox_zero, args.interval)
+
+        def _report(stats):
+            rate = assistant.inbox_zero.achievement_rate()
+            print(json.dumps({"inbox_zero_recorded": stats is not None, "stats": stats, "achievement_rate_30d": rate}), flush=True)
+        try:
+            sampler.run(on_sample=_report)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if args.unread is None and args.inbox is None:
+        stats = assistant.sample_inbox()
+        if stats is None:
+            print("Could not read inbox counters from provider.", file=sys.stderr)
+            return 1
+    elif args.unread is None or args.inbox is None:
+        print("Pass both --unread and --inbox, or neither to read them from the provider.", file=sys.stderr)
+        return 1
+    else:
+        stats = {"unread_count": args.unread, "inbox_count": args.inbox}
+        assistant.record_inbox_check(unread_count=args.unread, inbox_count=args.inbox)
     rate = assistant.inbox_zero.achievement_rate()
-    print(json.dumps({"inbox_zero_recorded": True, "achievement_rate_30d": rate}))
+    print(json.dumps({"inbox_zero_recorded": True, "stats": stats, "achievement_rate_30d": rate}))
+    return 0
+
+
+def cmd_followups_due(args):
+    from src.agents import FollowUpTracker
+    tracker = FollowUpTracker()
+    if args.watch:
+        def _remind(entry):
+            # Below --min-priority: not reminded, so a run without the filter still reports it
+            if entry.get("priority", 0) < args.min_priority:
+                return False
+            print(json.dumps(entry), flush=True)
+            return True
+        try:
+            tracker.watch(_remind)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    now = datetime.now(timezone.utc)
+    due = [e for e in tracker.due(now) if e.get("priority", 0) >= args.min_priority]
+    nxt = tracker.next_due(after=now)
+    print(json.dumps({
+        "due": due,
+        "next_due_at": nxt[0].isoformat() if nxt else None,
+        "next_due_thread_id": nxt[1]["thread_id"] if nxt else None,
+    }, indent=2))
+    return 0
+
+
+def cmd_rules_backtest(args):
+    from src.engines.rules_backtest import run_backtest
+    from src.engines.rules_engine import load_rules
+    try:
+        rules = load_rules(Path(args.rules))
+    except Exception as e:
+        print(f"Could not load rules from {args.rules}: {e}", file=sys.stderr)
+        return 1
+    if not rules:
+        print("No rules to backtest.", file=sys.stderr)
+        return 1
+    events = run_backtest(
+        rules,
+        mbox=Path(args.mbox) if args.mbox else None,
+        cache_dir=Path(args.cache_dir) if args.cache_dir else None,
+        workers=args.workers,
+        since_days=args.since_days,
+        samples=args.samples,
+    )
+    for event in events:
+        print(json.dumps(event), flush=True)
+    return 0
+
+
+def cmd_record(args):
+    """Fetch threads from a live provider and save the raw responses for --provider replay."""
+    from src.providers.replay_provider import ReplayRecorder
+    provider = get_provider(args.provider, {})
+    if provider is None or not hasattr(provider, "recorder"):
+        print(f"Provider {args.provider} cannot be recorded.", file=sys.stderr)
+        return 1
+    out = Path(args.out) if args.out else config.REPLAY_DIR
+    provider.recorder = ReplayRecorder(out, args.provider)
+    threads = provider.list_threads(max_results=args.max, query=args.query)
+    saved = sum(1 for t in threads if provider.get_thread(t["id"]) is not None)
+    provider.list_thread_summaries(max_results=args.max, query=args.query)
+    provider.inbox_stats()
+    print(f"Recorded {saved}/{len(threads)} threads to {out}", file=sys.stderr)
     return 0
 
 
@@ -106,11 +210,31 @@ def get_provider(name: str, creds: dict):
 
 def _add_common_args(parser):
     """Add --provider, --max, --scaledown so they work after the subcommand."""
-    parser.add_argument("--provider", default="gmail", choices=["gmail", "outlook"])
+    parser.add_argument("--provider", default="gmail", choices=["gmail", "outlook", "replay", "mbox", "maildir"])
     parser.add_argument("--max", type=int, default=20)
     parser.add_argument("--scaledown", type=int, default=1, help="1=use ScaleDown for long threads")
 
 
+def _add_profile_args(parser):
+    parser.add_argument("--profile", action="store_true", help="Print per-stage timings and the slowest threads (stderr)")
+    parser.add_argument("--profile-out", default=None, help="Also write spans: *.json = Chrome trace, else collapsed stacks")
+    parser.add_argument("--memprofile", action="store_true", help="Report tracemalloc peak allocations per stage")
+
+
+def _run_profiled(args):
+    """Run the command with tracing enabled and report afterwards."""
+    from src import tracing
+    tracing.enable(memory=args.memprofile)
+    try:
+        return args.func(args)
+    finally:
+        tracer = tracing.disable()
+        print(tracer.format_report(), file=sys.stderr)
+        if args.profile_out:
+            tracer.write(Path(args.profile_out))
+            print(f"Spans written to {args.profile_out}", file=sys.stderr)
+
+
 def main():
     p = argparse.ArgumentParser(description="Email assistant plugin CLI")
     _add_common_args(p)  # so "plugin_cli.py --provider gmail --max 20 triage" works
@@ -118,14 +242,17 @@ def main():
 
     t = sub.add_parser("triage")
     _add_common_args(t)
+    _add_profile_args(t)
     t.set_defaults(func=cmd_triage)
 
     f = sub.add_parser("folders")
     _add_common_args(f)
+    _add_profile_args(f)
     f.set_defaults(func=cmd_folders)
 
     u = sub.add_parser("urgent")
     _add_common_args(u)
+    _add_profile_args(u)
     u.set_defaults(func=cmd_urgent)
 
     d = sub.add_parser("draft")
@@ -147,12 +274,41 @@ def main():
     s.set_defaults(func=cmd_survey)
 
     iz = sub.add_parser("inbox-zero")
-    iz.add_argument("--unread", type=int, required=True)
-    iz.add_argument("--inbox", type=int, required=True)
+    iz.add_argument("--unread", type=int, default=None, help="Omit with --inbox to read counters from the provider")
+    iz.add_argument("--inbox", type=int, default=None)
+    iz.add_argument("--watch", action="store_true", help="Keep sampling provider counters on a schedule")
+    iz.add_argument("--interval", type=float, default=None, help="Seconds between samples (default INBOX_ZERO_SAMPLE_INTERVAL_SEC)")
     _add_common_args(iz)
     iz.set_defaults(func=cmd_inbox_zero)
 
+    fu = sub.add_parser("followups")
+    fusub = fu.add_subparsers(dest="followups_command", required=True)
+    fd = fusub.add_parser("due", help="List follow-ups whose reminder is due")
+    fd.add_argument("--watch", action="store_true", help="Keep running and print reminders as they come due")
+    fd.add_argument("--min-priority", type=int, default=0)
+    fd.set_defaults(func=cmd_followups_due)
+
+    r = sub.add_parser("rules")
+    rsub = r.add_subparsers(dest="rules_command", required=True)
+    rb = rsub.add_parser("backtest", help="Run rules over a local mbox/cache without hitting the provider")
+    rb.add_argument("--rules", required=True, help="JSON file with a list of rules")
+    src = rb.add_mutually_exclusive_group(required=True)
+    src.add_argument("--mbox", help="mbox file to backtest against")
+    src.add_argument("--cache-dir", help="Directory of cached threads (*.json / *.jsonl)")
+    rb.add_argument("--since-days", type=int, default=None, help="Only threads active in the last N days")
+    rb.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    rb.add_argument("--samples", type=int, default=5, help="Sample thread ids per rule")
+    rb.set_defaults(func=cmd_rules_backtest)
+
+    rec = sub.add_parser("record", help="Save raw provider responses for offline replay (--provider replay)")
+    _add_common_args(rec)
+    rec.add_argument("--out", default=None, help="Recording directory (default REPLAY_DIR)")
+    rec.add_argument("--query", default=None, help="Provider search query for list_threads")
+    rec.set_defaults(func=cmd_record)
+
     args = p.parse_args()
+    if getattr(args, "profile", False) or getattr(args, "memprofile", False) or getattr(args, "profile_out", None):
+        return _run_profiled(args)
     return args.func(args)
 
 
@@ -1,73 +1,213 @@
 """Productivity metrics: time saved, threads processed, drafts created, etc."""
-import json
+import atexit
 import logging
-from datetime import datetime, timezone
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Optional
 
 import config
+from src.deliverables.timeseries import RESOLUTIONS, MetricsTimeSeries
+from src.storage import read_json, update_json
+from src.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Counters that are also kept per day (the rest are totals only)
+DAILY_KEYS = ("threads_processed", "drafts_created")
+FLUSH_EVERY_RECORDS = 200
+FLUSH_INTERVAL_SEC = 5.0
+
+_instances: "weakref.WeakSet[ProductivityMetrics]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all() -> None:
+    for metrics in list(_instances):
+        metrics.flush()
+
 
 class ProductivityMetrics:
-    """Track and persist productivity metrics for the email assistant."""
+    """
+    Track and persist productivity metrics for the email assistant.
+
+    Recorders only bump in-memory deltas; the deltas are merged into the
+    latest file contents under a file lock and written back (temp file +
+    atomic rename) once `flush_every` records or `flush_interval` seconds have
+    accumulated, on flush(), when the instance is collected and at interpreter exit.
+    Each flush also writes the counters and latency observations to the
+    time-series store for range queries, stamped with when they were recorded.
+    """
 
-    def __init__(self, path: Optional[Path] = None):
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        flush_every: int = FLUSH_EVERY_RECORDS,
+        flush_interval: float = FLUSH_INTERVAL_SEC,
+        series: Optional[MetricsTimeSeries] = None,
+    ):
         self._path = path or config.METRICS_FILE
         self._path.parent.mkdir(parents=True, exist_ok=True)
         self._data: dict[str, Any] = {"daily": {}, "totals": {}}
+        self._pending_totals: dict[str, int] = {}
+        self._pending_daily: dict[str, dict[str, int]] = {}
+        self._pending_samples: list[tuple[str, float, float]] = []  # (metric, value, epoch recorded at)
+        self._pending_records = 0
+        self._series = series
+        self._flush_every = flush_every
+        self._flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
         self._load()
+        _instances.add(self)
+
+    def __del__(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            pass
 
     def _load(self) -> None:
-        if self._path.exists():
-            try:
-                self._data = json.loads(self._path.read_text(encoding="utf-8"))
-            except Exception as e:
-                logger.warning("metrics load: %s", e)
+        self._data = read_json(self._path, None) or {"daily": {}, "totals": {}}
 
-    def _save(self) -> None:
+    def _merge_pending(self, data: dict) -> None:
+        """Add buffered deltas onto `data` (the latest file contents) and prune old days."""
+        totals = data.setdefault("totals", {})
+        for key, n in self._pending_totals.items():
+            totals[key] = totals.get(key, 0) + n
+        daily = data.setdefault("daily", {})
+        for date, counts in self._pending_daily.items():
+            day = daily.setdefault(date, {})
+            for key, n in counts.items():
+                day[key] = day.get(key, 0) + n
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=config.METRICS_DAILY_RETENTION_DAYS)).strftime("%Y-%m-%d")
+        for date in [d for d in daily if d < cutoff]:
+            del daily[date]
+
+    def _save(self) -> bool:
+        """Merge deltas into the file under a lock, so concurrent writers never drop each other's counts."""
         try:
-            self._path.write_text(json.dumps(self._data, indent=2), encoding="utf-8")
+            with span("metrics.save"):
+                self._data = update_json(self._path, self._merge_pending, lambda: {"daily": {}, "totals": {}})
+            return True
         except Exception as e:
             logger.exception("metrics save: %s", e)
+            return False
 
     def _today(self) -> str:
         return datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
+    def _add(self, counts: dict[str, int]) -> None:
+        today = self._today()
+        now = time.time()
+        with self._lock:
+            for key, n in counts.items():
+                if not n:
+                    continue
+                self._pending_totals[key] = self._pending_totals.get(key, 0) + n
+                self._pending_samples.append((key, n, now))
+                if key in DAILY_KEYS:
+                    day = self._pending_daily.setdefault(today, {})
+                    day[key] = day.get(key, 0) + n
+            self._pending_records += 1
+            self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if (
+            self._pending_records >= self._flush_every
+            or time.monotonic() - self._last_flush >= self._flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Merge buffered counts into the stored data and write it out."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending_records:
+                return
+            if not self._save():
+                return  # keep the deltas for the next attempt
+            samples = self._pending_samples
+            self._pending_totals.clear()
+            self._pending_daily.clear()
+            self._pending_samples = []
+            self._pending_records = 0
+            self._write_series(samples)
+
+    @property
+    def series(self) -> MetricsTimeSeries:
+        """Time-series store (opened on first use)."""
+        if self._series is None:
+            self._series = MetricsTimeSeries()
+        return self._series
+
+    def _write_series(self, samples: list[tuple[str, float, float]]) -> None:
+        """Write samples at their record times, one transaction per finest bucket they fall in."""
+        secs = RESOLUTIONS[0][1]
+        by_bucket: dict[int, list[tuple[str, float]]] = {}
+        for metric, value, ts in samples:
+            by_bucket.setdefault(int(ts // secs), []).append((metric, value))
+        try:
+            for bucket, group in by_bucket.items():
+                self.series.record_many(group, at=bucket * secs)
+        except Exception as e:
+            logger.exception("metrics timeseries: %s", e)
+
+    def record_many(
+        self,
+        threads_processed: int = 0,
+        drafts_created: int = 0,
+        triage_count: int = 0,
+        scaledown_calls: int = 0,
+        tokens_saved: int = 0,
+    ) -> None:
+        """Record a whole run's counts as one buffered update."""
+        self._add({
+            "threads_processed": threads_processed,
+            "drafts_created": drafts_created,
+            "triage_count": triage_count,
+            "scaledown_calls": scaledown_calls,
+            "tokens_saved": tokens_saved,
+        })
+
     def record_threads_processed(self, count: int = 1) -> None:
-        key = "threads_processed"
-        self._data.setdefault("totals", {})[key] = self._data["totals"].get(key, 0) + count
-        day = self._data.setdefault("daily", {}).setdefault(self._today(), {})
-        day[key] = day.get(key, 0) + count
-        self._save()
+        self._add({"threads_processed": count})
 
     def record_drafts_created(self, count: int = 1) -> None:
-        key = "drafts_created"
-        self._data.setdefault("totals", {})[key] = self._data["totals"].get(key, 0) + count
-        day = self._data.setdefault("daily", {}).setdefault(self._today(), {})
-        day[key] = day.get(key, 0) + count
-        self._save()
+        self._add({"drafts_created": count})
 
     def record_scaledown_used(self, original_tokens: int, compressed_tokens: int) -> None:
-        self._data.setdefault("totals", {})["scaledown_calls"] = self._data["totals"].get("scaledown_calls", 0) + 1
-        self._data.setdefault("totals", {})["tokens_saved"] = self._data["totals"].get("tokens_saved", 0) + max(0, original_tokens - compressed_tokens)
-        self._save()
+        self._add({"scaledown_calls": 1, "tokens_saved": max(0, original_tokens - compressed_tokens)})
 
     def record_triage_count(self, count: int = 1) -> None:
-        key = "triage_count"
-        self._data.setdefault("totals", {})[key] = self._data["totals"].get(key, 0) + count
-        self._save()
+        self._add({"triage_count": count})
+
+    def record_triage_latency(self, ms: float) -> None:
+        """One triage duration observation (kept as count/sum/min/max per time bucket)."""
+        with self._lock:
+            self._pending_samples.append(("triage_latency_ms", ms, time.time()))
+            self._pending_records += 1
+            self._maybe_flush()
 
     def get_totals(self) -> dict[str, Any]:
-        return dict(self._data.get("totals", {}))
+        with self._lock:
+            totals = dict(self._data.get("totals", {}))
+            for key, n in self._pending_totals.items():
+                totals[key] = totals.get(key, 0) + n
+        return totals
 
     def get_daily(self, date: Optional[str] = None) -> dict[str, Any]:
         date = date or self._today()
-        return dict(self._data.get("daily", {}).get(date, {}))
+        with self._lock:
+            day = dict(self._data.get("daily", {}).get(date, {}))
+            for key, n in self._pending_daily.get(date, {}).items():
+                day[key] = day.get(key, 0) + n
+        return day
 
     def estimate_time_saved_minutes(self) -> float:
         """Rough estimate: 60% reduction in email time (per spec). Assume 2 min/thread baseline."""
-        threads = self._data.get("totals", {}).get("threads_processed", 0)
+        threads = self.get_totals().get("threads_processed", 0)
         baseline_min = threads * 2.0
         return baseline_min * 0.6  # 60% reduction
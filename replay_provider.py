@@ -0,0 +1,274 @@
+"""
+Offline provider: replays recorded Gmail/Graph responses or serves a
+synthetic mailbox, with injectable latency, 429 bursts and timeouts.
+
+Record a real account once:
+    python plugin_cli.py record --provider gmail --max 200 --out data/replay
+then run anything against it with --provider replay (REPLAY_DIR=data/replay).
+Recorded responses go through the real providers' parse functions, so the
+replay exercises the same parsing code. Without a recording (or with
+credentials {"synthetic": N}) threads come from src.synthetic_mailbox.
+Fault injection is seeded, so a load test replays the same sequence of
+delays and errors every run.
+"""
+import json
+import logging
+import math
+import random
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Optional
+from urllib.parse import quote
+
+import config
+from src.models import EmailMessage, EmailThread
+from src.telemetry import provider_call
+
+logger = logging.getLogger(__name__)
+
+_Z99 = 2.326  # standard normal 99th percentile
+
+
+class ReplayHTTPError(Exception):
+    """Injected HTTP error; `response.status_code` mirrors requests.HTTPError."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"{status_code} (injected by replay provider)")
+        self.response = SimpleNamespace(status_code=status_code, headers={"Retry-After": str(retry_after or 1)})
+
+
+class ReplayTimeout(TimeoutError):
+    """Injected timeout (raised after the configured timeout has elapsed)."""
+
+
+def _key_file(directory: Path, call: str, key: str) -> Path:
+    return directory / call / f"{quote(key, safe='')}.json"
+
+
+def parse_latency_spec(spec: str) -> dict[str, tuple[float, float]]:
+    """ "get_thread=120:900,list_threads=200" -> {call: (median_ms, p99_ms)}; "*" sets the default."""
+    out = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        call, _, value = part.partition("=")
+        median, _, p99 = value.partition(":")
+        out[call.strip()] = (float(median), float(p99 or median))
+    return out
+
+
+class ReplayRecorder:
+    """Provider `recorder` hook that saves each raw response under `directory/<call>/<key>.json`."""
+
+    def __init__(self, directory: Path, provider_name: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / "meta.json").write_text(json.dumps({"provider": provider_name, "recorded_at": time.time()}), encoding="utf-8")
+
+    def __call__(self, call: str, key: str, response: Any) -> None:
+        path = _key_file(self.directory, call, key)
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(json.dumps(response), encoding="utf-8")
+
+
+def _summary(thread: EmailThread) -> dict:
+    """What a real provider's list_thread_summaries reports for a (synthetic) thread."""
+    last = thread.messages[-1] if thread.messages else None
+    if last is None:
+        return {"id": thread.id, "provider": "replay"}
+    snippet = last.snippet or ""
+    return {
+        "id": thread.id,
+        "provider": "replay",
+        "subject": last.subject or "",
+        "sender": last.sender or "",
+        "snippet": snippet,
+        "labels": sorted({label for m in thread.messages for label in m.labels}),
+        "message_count": thread.message_count,
+        "last_message_at": last.date.isoformat() if last.date else None,
+        "snippet_complete": len(last.body_plain or "") <= len(snippet),
+    }
+
+
+class ReplayProvider:
+    """
+    Serves list/get calls from a recording directory or a synthetic mailbox.
+
+    credentials (each falls back to the REPLAY_* settings in config):
+      path           recording directory
+      synthetic      serve N synthetic threads instead of a recording
+      seed           RNG seed for synthetic threads and fault injection
+      latency_ms     {call: (median, p99)} or "call=median:p99,..." ("*" = any call); log-normal
+      rate_429       probability that a call starts a burst of 429s
+      burst_429      calls per 429 burst
+      timeout_rate   probability that a call times out
+      timeout_sec    how long a timed-out call blocks before raising
+    """
+
+    def __init__(self, credentials: Optional[dict] = None):
+        c = credentials or {}
+        self.path = Path(c.get("path") or config.REPLAY_DIR)
+        self.seed = int(c.get("seed", config.REPLAY_SEED))
+        latency = c.get("latency_ms", config.REPLAY_LATENCY_MS)
+        self.latency_ms = parse_latency_spec(latency) if isinstance(latency, str) else dict(latency)
+        self.rate_429 = float(c.get("rate_429", config.REPLAY_429_RATE))
+        self.burst_429 = int(c.get("burst_429", config.REPLAY_429_BURST))
+        self.timeout_rate = float(c.get("timeout_rate", config.REPLAY_TIMEOUT_RATE))
+        self.timeout_sec = float(c.get("timeout_sec", config.REPLAY_TIMEOUT_SEC))
+        self._rngs: dict[str, random.Random] = {}  # one stream per call type, so call mix doesn't shift faults
+        self._lock = threading.Lock()
+        self._burst_left = 0
+        self._drafts = 0
+        self._synthetic = None
+        self._source = "synthetic"
+        meta_file = self.path / "meta.json"
+        if not c.get("synthetic") and meta_file.exists():
+            self._source = json.loads(meta_file.read_text(encoding="utf-8")).get("provider", "gmail")
+        else:
+            from src.synthetic_mailbox import SyntheticMailbox
+            self._synthetic = SyntheticMailbox(seed=self.seed)
+            self._synthetic_count = int(c.get("synthetic") or config.REPLAY_SYNTHETIC_THREADS)
+
+    @property
+    def name(self) -> str:
+        return "replay"
+
+    def _inject(self, call: str) -> None:
+        """Sleep for a sampled latency, then maybe raise an injected 429 or timeout."""
+        with self._lock:
+            rng = self._rngs.get(call)
+            if rng is None:
+                rng = self._rngs[call] = random.Random(f"{self.seed}:{call}")
+            median, p99 = self.latency_ms.get(call) or self.latency_ms.get("*") or (0.0, 0.0)
+            delay = 0.0
+            if median > 0:
+                sigma = math.log(max(p99, median) / median) / _Z99
+                delay = median * math.exp(rng.gauss(0, sigma)) / 1000
+            status = None
+            if self._burst_left > 0:
+                self._burst_left -= 1
+                status = 429
+            elif self.rate_429 and rng.random() < self.rate_429:
+                self._burst_left = self.burst_429 - 1
+                status = 429
+            elif self.timeout_rate and rng.random() < self.timeout_rate:
+                status = "timeout"
+        if status == "timeout":
+            time.sleep(self.timeout_sec)
+            raise ReplayTimeout(f"{call} timed out after {self.timeout_sec}s (injected)")
+        if delay:
+            time.sleep(delay)
+        if status == 429:
+            raise ReplayHTTPError(429)
+
+    def _recorded(self, call: str, key: str) -> Optional[Any]:
+        path = _key_file(self.path, call, key)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _parse_thread(self, thread_id: str, raw: dict) -> EmailThread:
+        if self._source == "outlook":
+            from src.providers.outlook_provider import parse_conversation
+            return parse_conversation(thread_id, raw)
+        from src.providers.gmail_provider import parse_thread
+        return parse_thread(thread_id, raw)
+
+    def list_threads(self, max_results: int = 50, query: Optional[str] = None) -> list[dict]:
+        try:
+            with provider_call("replay", "list_threads"):
+                self._inject("list_threads")
+        except Exception as e:
+            logger.exception("list_threads: %s", e)
+            return []
+        if self._synthetic is not None:
+            n = min(max_results, self._synthetic_count)
+            return [{"id": f"syn{self.seed}-{i}", "provider": "replay"} for i in range(n)]
+        threads = self._recorded("list_threads", query or "") or []
+        return [{**t, "provider": "replay"} for t in threads[:max_results]]
+
+    def list_thread_summaries(self, max_results: int = 50, query: Optional[str] = None) -> list[dict]:
+        """Recorded summaries, or metadata of synthetic threads; a recording without them lists bare ids."""
+        try:
+            with provider_call("replay", "list_thread_summaries"):
+                self._inject("list_thread_summaries")
+        except Exception as e:
+            logger.exception("list_thread_summaries: %s", e)
+            return []
+        if self._synthetic is not None:
+            n = min(max_results, self._synthetic_count)
+            return [_summary(self._synthetic.thread(i)) for i in range(n)]
+        summaries = self._recorded("list_thread_summaries", query or "")
+        if summaries is None:
+            summaries = self._recorded("list_threads", query or "") or []
+        return [{**t, "provider": "replay"} for t in summaries[:max_results]]
+
+    def get_thread(self, thread_id: str) -> Optional[EmailThread]:
+        try:
+            with provider_call("replay", "get_thread"):
+                self._inject("get_thread")
+        except Exception as e:
+            logger.exception("get_thread %s: %s", thread_id, e)
+            return None
+        if self._synthetic is not None:
+            prefix, _, index = thread_id.rpartition("-")
+            if prefix != f"syn{self.seed}" or not index.isdigit():
+                return None
+            return self._synthetic.thread(int(index))
+        raw = self._recorded("get_thread", thread_id)
+        return self._parse_thread(thread_id, raw) if raw is not None else None
+
+    def get_message(self, message_id: str) -> Optional[EmailMessage]:
+        try:
+            with provider_call("replay", "get_message"):
+                self._inject("get_message")
+        except Exception as e:
+            logger.exception("get_message %s: %s", message_id, e)
+            return None
+        if self._synthetic is not None:
+            prefix, _, index = message_id.rpartition("-m")[0].rpartition("-")
+            if prefix != f"syn{self.seed}" or not index.isdigit():
+                return None
+            return next((m for m in self._synthetic.thread(int(index)).messages if m.id == message_id), None)
+        raw = self._recorded("get_message", message_id)
+        if raw is None:
+            return None
+        if self._source == "outlook":
+            from src.providers.outlook_provider import parse_message
+        else:
+            from src.providers.gmail_provider import parse_message
+        return parse_message(raw)
+
+    def create_draft(self, to: list[str], subject: str, body: str, thread_id: Optional[str] = None) -> Optional[str]:
+        try:
+            with provider_call("replay", "create_draft"):
+                self._inject("create_draft")
+        except Exception as e:
+            logger.exception("create_draft: %s", e)
+            return None
+        with self._lock:
+            self._drafts += 1
+            return f"replay-draft-{self._drafts}"
+
+    def list_labels(self) -> list[dict]:
+        return [{"id": "INBOX", "name": "INBOX", "type": "system"}]
+
+    def apply_label(self, message_id: str, label_id: str) -> bool:
+        try:
+            with provider_call("replay", "apply_label"):
+                self._inject("apply_label")
+            return True
+        except Exception as e:
+            logger.exception("apply_label: %s", e)
+            return False
+
+    def inbox_stats(self) -> Optional[dict]:
+        try:
+            with provider_call("replay", "inbox_stats"):
+                self._inject("inbox_stats")
+        except Exception as e:
+            logger.exception("inbox_stats: %s", e)
+            return None
+        if self._synthetic is not None:
+            return {"inbox_count": self._synthetic_count, "unread_count": self._synthetic_count // 3}
+        return self._recorded("inbox_stats", "")
@@ -0,0 +1,78 @@
+"""
+New content of a reply: message bodies without quoted history or signatures.
+
+Replies usually carry the whole conversation below them, so concatenating
+raw bodies makes a long thread quadratic in size. strip_quotes() cuts at the
+first reply header ("On ... wrote:", "-----Original Message-----", Outlook's
+From:/Sent: block), drops ">"-quoted lines and trims a trailing signature
+("-- ", "Sent from my ..."). new_content() applies it to a message and
+caches the result per message id, since triage, urgency and meeting
+analysis all read the same bodies.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+CACHE_SIZE = 20_000
+SIGNATURE_LINES = 12  # a signature delimiter further up than this is treated as content
+
+_ON_WROTE = re.compile(r"^\s*On\b.{0,300}\bwrote:\s*$", re.I)
+_WROTE_TAIL = re.compile(r"\bwrote:\s*$", re.I)
+_ORIGINAL = re.compile(r"^\s*-{2,}\s*(?:Original Message|Ursprüngliche Nachricht|Message d'origine)\s*-{2,}\s*$", re.I)
+_OUTLOOK_RULE = re.compile(r"^\s*_{10,}\s*$")
+_HEADER_FIELD = re.compile(r"^\s*\*?(From|Sent|Date|To|Cc|Subject)\*?:", re.I)
+_SIGNATURE = re.compile(r"^(?:--\s*|Sent from my \S.*|Get Outlook for \S.*)$", re.I)
+
+
+def _is_header_block(lines: list[str], i: int) -> bool:
+    """An Outlook-style "From: / Sent: / To: / Subject:" block starting at line i."""
+    if not _HEADER_FIELD.match(lines[i]) or not lines[i].lstrip(" *").lower().startswith("from"):
+        return False
+    fields = {m.group(1).lower() for line in lines[i + 1:i + 6] if (m := _HEADER_FIELD.match(line))}
+    return bool(fields & {"sent", "date"}) and bool(fields & {"subject", "to"})
+
+
+def strip_quotes(text: str) -> str:
+    """The text a message added: everything above its quoted history, minus quoted lines and signature."""
+    if not text:
+        return ""
+    lines = text.splitlines()
+    kept = []
+    for i, line in enumerate(lines):
+        if (
+            _ON_WROTE.match(line)
+            or (line.lstrip().startswith("On ") and i + 1 < len(lines) and _WROTE_TAIL.search(lines[i + 1]) and len(line) < 300)
+            or _ORIGINAL.match(line)
+            or _OUTLOOK_RULE.match(line)
+            or _is_header_block(lines, i)
+        ):
+            break
+        if line.lstrip().startswith(">"):
+            continue
+        kept.append(line)
+    for i in range(len(kept) - 1, max(-1, len(kept) - 1 - SIGNATURE_LINES), -1):
+        if _SIGNATURE.match(kept[i].strip()):
+            kept = kept[:i]
+            break
+    result = "\n".join(kept).strip()
+    return result or text.strip()  # all quote (e.g. a bare forward): keep the original
+
+
+_cache: "OrderedDict[tuple[str, str], str]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def new_content(message) -> str:
+    """strip_quotes(message.body_plain), cached per (thread id, message id)."""
+    key = (message.thread_id, message.id)
+    with _lock:
+        text = _cache.get(key)
+        if text is not None:
+            _cache.move_to_end(key)
+            return text
+    text = strip_quotes(message.body_plain or "")
+    with _lock:
+        _cache[key] = text
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return text
@@ -0,0 +1,156 @@
+"""
+RFC 822 messages and mbox files: header decoding, message parsing, mbox
+message spans and header-based threading. Shared by the local archive
+providers and the rules backtest.
+"""
+import email
+import mmap
+import os
+from datetime import datetime, timezone
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+from src.html_text import html_to_text
+from src.models import EmailMessage
+
+_header_parser = BytesHeaderParser()
+
+
+def aware_datetime(dt: Optional[datetime]) -> Optional[datetime]:
+    """`dt` with UTC assumed when it has no timezone."""
+    if dt is None:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def parse_date(header: Optional[str]) -> Optional[datetime]:
+    """A Date header as an aware datetime, or None if missing or unparseable."""
+    if not header:
+        return None
+    try:
+        return aware_datetime(parsedate_to_datetime(header))
+    except Exception:
+        return None
+
+
+def header_str(value) -> str:
+    """Decode RFC 2047 encoded-words ("=?utf-8?b?...?=") in a header value."""
+    if not value:
+        return ""
+    value = str(value)
+    if "=?" not in value:
+        return value
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return value
+
+
+def _part_text(part) -> str:
+    payload = part.get_payload(decode=True) or b""
+    return payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+
+
+def parse_rfc822(raw: bytes, thread_id: str, fallback_id: str = "") -> EmailMessage:
+    """Parse one raw RFC 822 message into an EmailMessage (compat32 parser: much faster than policy.default)."""
+    msg = email.message_from_bytes(raw)
+    plain_part, html_part, has_attachments = None, None, False
+    for part in msg.walk():
+        if part.is_multipart():
+            continue
+        if part.get_filename() or part.get("Content-Disposition", "").lower().startswith("attachment"):
+            has_attachments = True
+            continue
+        ctype = part.get_content_type()
+        if ctype == "text/plain" and plain_part is None:
+            plain_part = part
+        elif ctype == "text/html" and html_part is None:
+            html_part = part
+    # Bodies stay encoded bytes until read; one charset per message, so a differing HTML part is decoded now
+    first = plain_part if plain_part is not None else html_part
+    charset = (first.get_content_charset() if first is not None else None) or "utf-8"
+    plain = (plain_part.get_payload(decode=True) or b"") if plain_part is not None else b""
+    html = None
+    if html_part is not None:
+        same = (html_part.get_content_charset() or "utf-8") == charset
+        html = (html_part.get_payload(decode=True) or b"") if same else _part_text(html_part)
+    links = []
+    if plain_part is None and html_part is not None:
+        plain, links = html_to_text(_part_text(html_part))
+    labels = [l.strip() for l in str(msg.get("X-Gmail-Labels", "")).split(",") if l.strip()]
+    return EmailMessage(
+        id=str(msg.get("Message-ID", "")).strip() or fallback_id,
+        thread_id=thread_id,
+        sender=header_str(msg.get("From")),
+        to=[a.strip() for a in header_str(msg.get("To")).split(",") if a.strip()],
+        subject=header_str(msg.get("Subject")),
+        body_plain=plain,
+        body_html=html,
+        date=parse_date(msg.get("Date")),
+        labels=labels,
+        is_read="Unread" not in labels,
+        has_attachments=has_attachments,
+        charset=charset,
+        links=links,
+    )
+
+
+def iter_mbox_spans(mm, start: int = 0) -> Iterator[tuple[int, int]]:
+    """Yield (start, end) byte spans of each message body in a mapped mbox, from byte `start` on."""
+    if mm[start:start + 5] == b"From ":
+        pos = start
+    else:
+        pos = mm.find(b"\nFrom ", start)
+        if pos >= 0:
+            pos += 1
+    while pos >= 0:
+        eol = mm.find(b"\n", pos)
+        if eol < 0:
+            return  # a "From " line still being appended: no message yet
+        body_start = eol + 1
+        nxt = mm.find(b"\nFrom ", body_start)
+        end = nxt + 1 if nxt >= 0 else len(mm)
+        yield body_start, end
+        pos = nxt + 1 if nxt >= 0 else -1
+
+
+def scan_mbox(path: Path) -> Iterator[tuple[int, int]]:
+    """Yield (start, end) byte spans of each message body in an mbox file (after the "From " line)."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from iter_mbox_spans(mm)
+
+
+def parse_headers(raw: bytes):
+    """Headers only (the body, if any, is not parsed) as an email.message.Message."""
+    return _header_parser.parsebytes(raw)
+
+
+def header_block(mm, start: int, end: int) -> bytes:
+    """The header bytes of the message spanning mm[start:end]."""
+    stop = mm.find(b"\n\n", start, end)
+    return mm[start:(stop if stop >= 0 else end)]
+
+
+def thread_key(headers, thread_of: dict[str, str], fallback: str) -> tuple[str, str]:
+    """
+    (Message-ID, thread key) for a message's headers: X-GM-THRID if present, else
+    the thread of a known parent (References, In-Reply-To), else the root reference.
+    Records the message in `thread_of` so later replies join its thread.
+    """
+    msg_id = (headers.get("Message-ID") or "").strip()
+    key = (headers.get("X-GM-THRID") or "").strip()
+    if not key:
+        refs = (headers.get("References") or "").split()
+        reply_to = (headers.get("In-Reply-To") or "").strip()
+        parents = refs + ([reply_to] if reply_to else [])
+        key = next((thread_of[p] for p in parents if p in thread_of), "")
+        key = key or (refs[0] if refs else reply_to) or msg_id or fallback
+    if msg_id:
+        thread_of[msg_id] = key
+    return msg_id, key
@@ -0,0 +1,220 @@
+"""
+Rule backtesting: run RulesEngine over a locally stored corpus (mbox file or
+cache directory) without touching the provider. Work is sharded across
+processes; each shard reports per-rule match counts, sample thread ids and
+evaluation time, and results are streamed as shards complete. Per-rule stats
+are kept by position in the rule list, so rules sharing a name stay separate.
+"""
+import json
+import logging
+import mmap
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from src.engines.rules_engine import Rule, RulesEngine
+from src.models import EmailThread
+from src.rfc822 import aware_datetime, parse_rfc822
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD_THREADS = 2000  # threads per mbox shard
+DEFAULT_SHARD_BYTES = 32 * 1024 * 1024  # bytes per .jsonl shard
+DEFAULT_SAMPLES = 5
+
+
+def index_mbox_threads(
+    path: Path, since: Optional[datetime] = None
+) -> tuple[dict[str, list[tuple[int, int]]], int]:
+    """
+    Group mbox messages into threads using headers only (X-GM-THRID, References,
+    In-Reply-To). Returns (thread key -> message spans, threads dropped because
+    their newest message is older than `since`). Uses the mbox provider's
+    persistent index, so re-running a backtest on the same archive skips the scan.
+    """
+    from src.providers.mbox_provider import MboxProvider
+    threads: dict[str, list[tuple[int, int]]] = {}
+    if Path(path).stat().st_size == 0:
+        return threads, 0
+    provider = MboxProvider({"path": str(path)})
+    cutoff = since.timestamp() if since else None
+    dropped = 0
+    for key, newest, spans in provider.thread_spans():
+        if cutoff is not None and newest is not None and newest < cutoff:
+            dropped += 1
+            continue
+        threads[key] = spans
+    return threads, dropped
+
+
+def _iter_mbox_shard(path: str, items: list) -> Iterator[EmailThread]:
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for thread_id, spans in items:
+            msgs = [parse_rfc822(mm[s:e], thread_id, f"{thread_id}:{s}") for s, e in spans]
+            msgs.sort(key=lambda m: m.date or datetime.min.replace(tzinfo=timezone.utc))
+            yield EmailThread(id=thread_id, messages=msgs, subject=msgs[0].subject if msgs else "", provider="mbox")
+
+
+def _iter_cache_shard(items: list) -> Iterator[EmailThread]:
+    """Items are (path, start, end); .jsonl files are split on line boundaries, .json files read whole."""
+    for path, start, end in items:
+        if not path.endswith(".jsonl"):
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+            for d in data if isinstance(data, list) else [data]:
+                yield EmailThread.from_dict(d)
+            continue
+        with open(path, "rb") as f:
+            if start:
+                f.seek(start - 1)
+                f.readline()  # a line that started before `start` belongs to the previous shard
+            while f.tell() <= end:
+                line = f.readline()
+                if not line:
+                    break
+                if line.strip():
+                    yield EmailThread.from_dict(json.loads(line))
+
+
+def _cache_items(cache_dir: Path, shard_bytes: int) -> list[tuple[str, int, int]]:
+    items = []
+    for p in sorted(cache_dir.rglob("*")):
+        if p.suffix == ".json":
+            items.append((str(p), 0, 0))
+        elif p.suffix == ".jsonl":
+            size = p.stat().st_size
+            for start in range(0, max(size, 1), shard_bytes):
+                items.append((str(p), start, min(start + shard_bytes, size) - 1))
+    return items
+
+
+def _empty_stats() -> dict:
+    return {"matches": 0, "samples": [], "seconds": 0.0}
+
+
+def _backtest_shard(
+    rule_dicts: list[dict],
+    source: str,
+    path: Optional[str],
+    items: list,
+    since_iso: Optional[str],
+    samples: int,
+) -> dict:
+    """Worker entrypoint: evaluate every rule against every thread in the shard."""
+    engine = RulesEngine([Rule.from_dict(d) for d in rule_dicts])
+    since = datetime.fromisoformat(since_iso) if since_iso else None
+    stats = [_empty_stats() for _ in engine.rules]
+    threads = skipped = 0
+    it = _iter_mbox_shard(path, items) if source == "mbox" else _iter_cache_shard(items)
+    clock = time.perf_counter
+    for thread in it:
+        if since is not None and source == "cache":
+            last = aware_datetime(thread.messages[-1].date) if thread.messages else None
+            if last is not None and last < since:
+                skipped += 1
+                continue
+        threads += 1
+        for rule, st in zip(engine.rules, stats):
+            t0 = clock()
+            matched = engine.match(rule, thread) is not None
+            st["seconds"] += clock() - t0
+            if matched:
+                st["matches"] += 1
+                if len(st["samples"]) < samples:
+                    st["samples"].append(thread.id)
+    return {"threads": threads, "skipped": skipped, "rules": stats}
+
+
+def _merge(total: dict, part: dict, samples: int) -> None:
+    total["threads"] += part["threads"]
+    total["skipped"] += part["skipped"]
+    for acc, st in zip(total["rules"], part["rules"]):
+        acc["matches"] += st["matches"]
+        acc["seconds"] += st["seconds"]
+        acc["samples"].extend(st["samples"][: samples - len(acc["samples"])])
+
+
+def _rule_report(rules: list[Rule], total: dict) -> list[dict]:
+    n = max(total["threads"], 1)
+    return [
+        {
+            "rule_index": i,
+            "rule": rule.name,
+            "matches": st["matches"],
+            "match_rate": round(st["matches"] / n, 4),
+            "sample_thread_ids": st["samples"],
+            "eval_ms": round(st["seconds"] * 1000, 2),
+            "eval_us_per_thread": round(st["seconds"] * 1e6 / n, 2),
+        }
+        for i, (rule, st) in enumerate(zip(rules, total["rules"]))
+    ]
+
+
+def run_backtest(
+    rules: list[Rule],
+    mbox: Optional[Path] = None,
+    cache_dir: Optional[Path] = None,
+    workers: Optional[int] = None,
+    since_days: Optional[int] = None,
+    samples: int = DEFAULT_SAMPLES,
+    shard_threads: int = DEFAULT_SHARD_THREADS,
+    shard_bytes: int = DEFAULT_SHARD_BYTES,
+) -> Iterator[dict]:
+    """
+    Backtest rules over an mbox file or cache directory (*.json / *.jsonl threads).
+    Yields {"event": "progress", ...} as shards finish, then {"event": "summary", ...}.
+    Disabled rules are evaluated too, since backtesting is how they get vetted.
+    """
+    if (mbox is None) == (cache_dir is None):
+        raise ValueError("Pass exactly one of mbox or cache_dir")
+    started = time.perf_counter()
+    since = datetime.now(timezone.utc) - timedelta(days=since_days) if since_days else None
+    skipped = 0
+    if mbox is not None:
+        threads, skipped = index_mbox_threads(Path(mbox), since=since)
+        ordered = list(threads.items())
+        # Several shards per worker keeps every process busy when shard costs vary
+        size = max(1, min(shard_threads, -(-len(ordered) // ((workers or os.cpu_count() or 1) * 4))))
+        shards = [ordered[i:i + size] for i in range(0, len(ordered), size)]
+        source, path = "mbox", str(mbox)
+        yield {"event": "indexed", "threads": len(ordered), "shards": len(shards),
+               "elapsed_s": round(time.perf_counter() - started, 2)}
+    else:
+        shards = [[item] for item in _cache_items(Path(cache_dir), shard_bytes)]
+        source, path = "cache", None
+    rule_dicts = [r.to_dict() for r in rules]
+    since_iso = since.isoformat() if since else None
+    total = {"threads": 0, "skipped": skipped, "rules": [_empty_stats() for _ in rules]}
+
+    def progress(done: int) -> dict:
+        return {
+            "event": "progress",
+            "shards_done": done,
+            "shards": len(shards),
+            "threads": total["threads"],
+            "elapsed_s": round(time.perf_counter() - started, 2),
+            "matches": [st["matches"] for st in total["rules"]],  # in rule order, as in the summary
+        }
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(shards) <= 1:
+        for i, shard in enumerate(shards, 1):
+            _merge(total, _backtest_shard(rule_dicts, source, path, shard, since_iso, samples), samples)
+            yield progress(i)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_backtest_shard, rule_dicts, source, path, shard, since_iso, samples) for shard in shards]
+            for i, fut in enumerate(as_completed(futures), 1):
+                _merge(total, fut.result(), samples)
+                yield progress(i)
+    elapsed = time.perf_counter() - started
+    yield {
+        "event": "summary",
+        "threads": total["threads"],
+        "skipped_by_date": total["skipped"],
+        "elapsed_s": round(elapsed, 2),
+        "threads_per_s": round(total["threads"] / elapsed, 1) if elapsed else None,
+        "rules": _rule_report(rules, total),
+    }
@@ -1,10 +1,20 @@
 """Custom rules engine: match conditions and run actions on threads/messages."""
+import json
 import re
+import time
 from dataclasses import dataclass, field
 from enum import Enum
+from pathlib import Path
 from typing import Callable, Optional
 
 from src.models import EmailMessage, EmailThread
+from src.telemetry import counter, histogram
+
+RULES_SECONDS = histogram(
+    "rules_evaluate_seconds", "RulesEngine.evaluate_thread duration per thread.",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+RULE_MATCHES = counter("rules_matches_total", "Rule matches by rule name.", ("rule",))
 
 
 class RuleCondition(str, Enum):
@@ -34,6 +44,34 @@ class Rule:
     action_param: Optional[str] = None  # e.g. label_id for APPLY_LABEL
     enabled: bool = True
 
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "conditions": [[c.value, p] for c, p in self.conditions],
+            "action": self.action.value,
+            "action_param": self.action_param,
+            "enabled": self.enabled,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Rule":
+        """Build a rule from JSON, e.g. {"name": ..., "conditions": [["from", "boss@"]], "action": "apply_label"}."""
+        return cls(
+            name=data["name"],
+            conditions=[(RuleCondition(c), str(p)) for c, p in data.get("conditions", [])],
+            action=RuleAction(data.get("action", RuleAction.APPLY_LABEL.value)),
+            action_param=data.get("action_param"),
+            enabled=data.get("enabled", True),
+        )
+
+
+def load_rules(path: Path) -> list[Rule]:
+    """Load rules from a JSON file (a list of rule dicts, or {"rules": [...]})."""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if isinstance(data, dict):
+        data = data.get("rules", [])
+    return [Rule.from_dict(d) for d in data]
+
 
 class RulesEngine:
     """Evaluate custom rules against threads/messages."""
@@ -46,6 +84,7 @@ class RulesEngine:
 
     def evaluate_thread(self, thread: EmailThread) -> list[tuple[Rule, dict]]:
         """Return list of (rule, action_params) that match. First match wins per rule."""
+        started = time.perf_counter()
         results = []
         for rule in self.rules:
             if not rule.enabled:
@@ -53,8 +92,14 @@ class RulesEngine:
             params = self._match_rule(rule, thread)
             if params is not None:
                 results.append((rule, params))
+                RULE_MATCHES.labels(rule.name).inc()
+        RULES_SECONDS.observe(time.perf_counter() - started)
         return results
 
+    def match(self, rule: Rule, thread: EmailThread) -> Optional[dict]:
+        """Evaluate a single rule (ignores `enabled`); action params if it matches, else None."""
+        return self._match_rule(rule, thread)
+
     def _match_rule(self, rule: Rule, thread: EmailThread) -> Optional[dict]:
         if not thread.messages:
             return None
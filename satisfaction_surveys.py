@@ -1,38 +1,106 @@
 """User satisfaction surveys: collect and store feedback."""
 import json
 import logging
+import os
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Optional
 
 import config
+from src.storage import append_jsonl, atomic_write_json, file_lock, read_json, read_jsonl_from
 
 logger = logging.getLogger(__name__)
 
+CHECKPOINT_EVERY = 50  # submits between aggregate snapshots
+_TAIL_BLOCK = 8192
+
+
+def _empty_bucket() -> dict:
+    return {"count": 0, "sum": 0, "histogram": {str(r): 0 for r in range(1, 6)}}
+
+
+def _add_to(bucket: dict, rating: int) -> None:
+    bucket["count"] += 1
+    bucket["sum"] += rating
+    bucket["histogram"][str(rating)] = bucket["histogram"].get(str(rating), 0) + 1
+
+
+def _summary(bucket: dict) -> dict:
+    return {
+        "count": bucket["count"],
+        "average": bucket["sum"] / bucket["count"] if bucket["count"] else None,
+        "histogram": dict(bucket["histogram"]),
+    }
+
 
 class SatisfactionSurveys:
-    """Store and aggregate satisfaction survey responses."""
+    """
+    Store and aggregate satisfaction survey responses.
+
+    Responses are appended to a JSONL log; count/sum/histogram aggregates
+    (overall, per feature_used, per day) are kept in memory and snapshotted to
+    `path` every CHECKPOINT_EVERY submits together with the log offset they
+    cover. Loading reads the snapshot and replays only the log tail after it.
+    Appends and checkpoints take file locks, and reads first fold in lines
+    other processes appended, so several writers can share the files.
+    """
 
-    def __init__(self, path: Optional[Path] = None):
+    def __init__(self, path: Optional[Path] = None, log_path: Optional[Path] = None):
         self._path = path or config.SURVEYS_FILE
+        self._log_path = log_path or self._path.with_suffix(".jsonl")
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        self._responses: list[dict] = []
+        self._agg: dict[str, Any] = {"overall": _empty_bucket(), "by_feature": {}, "by_day": {}}
+        self._log_offset = 0
+        self._unsaved = 0
         self._load()
 
     def _load(self) -> None:
-        if self._path.exists():
-            try:
-                data = json.loads(self._path.read_text(encoding="utf-8"))
-                self._responses = data.get("responses", [])
-            except Exception as e:
-                logger.warning("surveys load: %s", e)
+        data = read_json(self._path, {})
+        if "responses" in data:
+            self._migrate(data["responses"])
+            return
+        if "aggregates" in data:
+            self._agg = data["aggregates"]
+            self._log_offset = data.get("log_offset", 0)
+        self._replay_log()
+
+    def _migrate(self, responses: list[dict]) -> None:
+        """Move responses from the old single-file format into the log."""
+        with file_lock(self._log_path):
+            if not self._log_path.exists():
+                append_jsonl(self._log_path, responses)
+        self._replay_log()
+        self._save()
+
+    def _replay_log(self) -> None:
+        """Fold log lines appended since the last replay (by any process) into the aggregates."""
+        records, self._log_offset = read_jsonl_from(self._log_path, self._log_offset)
+        for entry in records:
+            self._aggregate(entry)
+        self._unsaved += len(records)
+
+    def _aggregate(self, entry: dict) -> None:
+        rating = entry["rating"]
+        _add_to(self._agg["overall"], rating)
+        feature = entry.get("feature_used") or "unspecified"
+        _add_to(self._agg["by_feature"].setdefault(feature, _empty_bucket()), rating)
+        _add_to(self._agg["by_day"].setdefault(entry.get("at", "")[:10], _empty_bucket()), rating)
 
     def _save(self) -> None:
+        """Checkpoint aggregates; if another process already saved a later checkpoint, adopt it instead."""
         try:
-            self._path.write_text(
-                json.dumps({"updated": datetime.now(timezone.utc).isoformat(), "responses": self._responses}, indent=2),
-                encoding="utf-8",
-            )
+            with file_lock(self._path):
+                current = read_json(self._path, {})
+                if current.get("log_offset", -1) > self._log_offset and "aggregates" in current:
+                    self._agg = current["aggregates"]
+                    self._log_offset = current["log_offset"]
+                    self._replay_log()
+                atomic_write_json(self._path, {
+                    "updated": datetime.now(timezone.utc).isoformat(),
+                    "log_offset": self._log_offset,
+                    "aggregates": self._agg,
+                })
+            self._unsaved = 0
         except Exception as e:
             logger.exception("surveys save: %s", e)
 
@@ -49,13 +117,54 @@ class SatisfactionSurveys:
             "feature_used": feature_used,
             "at": datetime.now(timezone.utc).isoformat(),
         }
-        self._responses.append(entry)
-        self._save()
+        try:
+            with file_lock(self._log_path):
+                append_jsonl(self._log_path, [entry])
+        except Exception as e:
+            logger.exception("surveys save: %s", e)
+            return
+        self._replay_log()  # picks up this entry (and any appended by other writers)
+        if self._unsaved >= CHECKPOINT_EVERY:
+            self._save()
 
-    def average_rating(self) -> Optional[float]:
-        if not self._responses:
+    def average_rating(self, feature_used: Optional[str] = None) -> Optional[float]:
+        self._replay_log()
+        bucket = self._agg["by_feature"].get(feature_used) if feature_used else self._agg["overall"]
+        if not bucket or not bucket["count"]:
             return None
-        return sum(r["rating"] for r in self._responses) / len(self._responses)
+        return bucket["sum"] / bucket["count"]
+
+    def stats(self) -> dict:
+        """Count, average and rating histogram: overall, per feature and per day."""
+        self._replay_log()
+        return {
+            "overall": _summary(self._agg["overall"]),
+            "by_feature": {k: _summary(v) for k, v in self._agg["by_feature"].items()},
+            "by_day": {k: _summary(v) for k, v in sorted(self._agg["by_day"].items())},
+        }
 
     def list_recent(self, limit: int = 20) -> list[dict]:
-        return list(reversed(self._responses[-limit:]))
+        """Newest first; reads the log backwards from the end until `limit` lines are found."""
+        if limit <= 0 or not self._log_path.exists():
+            return []
+        with open(self._log_path, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            buf = b""
+            pos = end
+            while pos > 0 and buf.count(b"\n") <= limit:
+                step = min(_TAIL_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                buf = f.read(step) + buf
+        lines = buf.splitlines()
+        if pos > 0:
+            lines = lines[1:]  # first line may be partial
+        out = []
+        for line in reversed(lines):
+            if len(out) >= limit:
+                break
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                continue
+        return out
@@ -4,14 +4,21 @@ https://docs.scaledown.ai/quickstart
 """
 import json
 import logging
+import time
 from typing import Optional
 
 import requests
 
 import config
+from src.telemetry import counter, histogram
+from src.tracing import span
 
 logger = logging.getLogger(__name__)
 
+SCALEDOWN_SECONDS = histogram("scaledown_request_seconds", "ScaleDown compress request duration (time spent waiting on the API).")
+SCALEDOWN_REQUESTS = counter("scaledown_requests_total", "ScaleDown compress requests by outcome.", ("status",))
+SCALEDOWN_TOKENS = counter("scaledown_tokens_total", "Prompt tokens before and after ScaleDown compression.", ("stage",))
+
 
 def compress_thread(context: str, prompt: str = "Summarize and preserve key facts, decisions, and action items.") -> Optional[str]:
     """
@@ -31,26 +38,37 @@ def compress_thread(context: str, prompt: str = "Summarize and preserve key fact
         "x-api-key": config.SCALEDOWN_API_KEY,
         "Content-Type": "application/json",
     }
+    started = time.perf_counter()
+    status = "error"
     try:
-        r = requests.post(
-            config.SCALEDOWN_API_URL,
-            headers=headers,
-            data=json.dumps(payload),
-            timeout=30,
-        )
+        with span("scaledown.compress"):
+            r = requests.post(
+                config.SCALEDOWN_API_URL,
+                headers=headers,
+                data=json.dumps(payload),
+                timeout=30,
+            )
+        status = str(r.status_code)
         r.raise_for_status()
         data = r.json()
         if data.get("successful") and data.get("compressed_prompt"):
+            status = "ok"
             logger.info(
                 "ScaleDown: %s -> %s tokens",
                 data.get("original_prompt_tokens"),
                 data.get("compressed_prompt_tokens"),
             )
+            SCALEDOWN_TOKENS.labels("original").inc(data.get("original_prompt_tokens") or 0)
+            SCALEDOWN_TOKENS.labels("compressed").inc(data.get("compressed_prompt_tokens") or 0)
             return data["compressed_prompt"]
+        status = "unsuccessful"
         return None
     except Exception as e:
         logger.exception("ScaleDown request failed: %s", e)
         return None
+    finally:
+        SCALEDOWN_SECONDS.observe(time.perf_counter() - started)
+        SCALEDOWN_REQUESTS.labels(status).inc()
 
 
 def compress_thread_if_long(thread_context: str, message_count: int) -> tuple[str, Optional[str]]:
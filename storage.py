@@ -0,0 +1,154 @@
+"""
+State-file helpers shared by the trackers and deliverables: cross-process
+file locks, atomic JSON writes, locked read-modify-write, and append-only
+JSONL journals. Several CLI runs and dashboard workers can share one DATA_DIR.
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """
+    Exclusive lock on `<path>.lock` (fcntl.flock on POSIX, msvcrt on Windows).
+    Serializes writers across processes and threads; not reentrant.
+    """
+    lock_path = Path(str(path) + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10s; keep waiting
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def read_json(path: Path, default: Any) -> Any:
+    """
+    Load JSON, or return `default` if the file does not exist. An unreadable
+    file is moved aside to `<name>.corrupt-<ts>` (and logged) instead of being
+    silently replaced by empty state on the next write.
+    """
+    path = Path(path)
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return default
+    except ValueError as e:
+        aside = path.with_name(f"{path.name}.corrupt-{int(time.time())}")
+        logger.error("%s is unreadable (%s); moved to %s", path, e, aside.name)
+        try:
+            os.replace(path, aside)
+        except OSError:
+            pass
+        return default
+
+
+def update_json(path: Path, mutate: Callable[[Any], None], default: Callable[[], Any]) -> Any:
+    """
+    Locked read-modify-write: re-read the latest file under the lock, apply
+    `mutate` in place, write atomically and return the merged data.
+    """
+    with file_lock(path):
+        data = read_json(path, None)
+        if data is None:
+            data = default()
+        mutate(data)
+        atomic_write_json(path, data)
+    return data
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Write to a temp file in the same directory, fsync, then rename over `path`."""
+    atomic_write_bytes(path, [text.encode("utf-8")])
+
+
+def atomic_write_bytes(path: Path, chunks: Iterable[bytes]) -> None:
+    """Like atomic_write_text, for binary content written chunk by chunk (bytes or buffers)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path: Path, data: Any) -> None:
+    atomic_write_text(path, json.dumps(data, separators=(",", ":")))
+
+
+def append_jsonl(path: Path, records: Iterable[dict]) -> None:
+    """
+    Append records as JSON lines (one write call, so lines are not interleaved).
+    A torn last line left by a crashed writer is terminated first, so it is
+    skipped on replay instead of swallowing the first new record.
+    """
+    payload = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode("utf-8")
+    if not payload:
+        return
+    with open(path, "a+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end:
+            f.seek(end - 1)
+            if f.read(1) != b"\n":
+                payload = b"\n" + payload
+        f.write(payload)
+        f.flush()
+
+
+def read_jsonl_from(path: Path, offset: int = 0) -> tuple[list[dict], int]:
+    """
+    Records appended after byte `offset`, and the offset just past the last
+    complete line (an incomplete final line is left for the next read).
+    """
+    path = Path(path)
+    if not path.exists():
+        return [], offset
+    out = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                logger.warning("%s: skipping unreadable line at byte %d", path.name, offset - len(line))
+    return out, offset
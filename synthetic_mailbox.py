@@ -0,0 +1,191 @@
+"""
+Deterministic synthetic mailbox for benchmarks and offline runs.
+
+Thread shapes follow the dashboard's DEMO_INBOX (urgent ops mail, follow-up
+replies, meeting invites, newsletters, promotions, personal mail), with
+realistic size tails: most threads have 1-3 messages, a few percent run to
+10-40 and ~1% to 50-120; newsletters carry large HTML bodies and some
+messages contain pasted logs. Thread i depends only on (seed, i), so any
+slice of a 100k-thread mailbox can be regenerated without the rest.
+"""
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from src.engines.rules_engine import Rule, RuleAction, RuleCondition
+from src.models import EmailMessage, EmailThread
+
+# (category, weight, subjects, senders, bodies); {n}, {day}, {time} are filled per thread
+SHAPES = [
+    ("urgent", 8, [
+        "URGENT: Server down – need fix by {time}",
+        "Action required: Approve contract by EOD",
+        "Deadline reminder: Report due {day}",
+    ], ["ops@company.com", "legal@company.com", "manager@company.com"], [
+        "The production server is not responding. Please look into this as soon as possible. We have a deadline today.",
+        "The vendor contract is pending your approval. Please sign before {time} today to avoid delays.",
+        "Friendly reminder: the quarterly report is due {day} 9 AM. Please submit via the portal.",
+    ]),
+    ("follow_up", 22, [
+        "Re: Q{n} budget review", "Re: Project timeline", "Re: Hiring plan for team {n}",
+    ], ["sarah@company.com", "mike@agency.com", "li@partner.org", "omar@company.com"], [
+        "Thanks for sending the numbers. Could you confirm the marketing line item by tomorrow? I have a few questions.",
+        "Following up – did you get a chance to review the timeline? Let me know if we need to move the launch date.",
+        "Can you share the latest draft? I'd like to review it before the call.",
+    ]),
+    ("meeting", 14, [
+        "Meeting: Product sync – {day} {time}", "Invitation: All-hands – {day} {time}", "Invitation: 1:1 ({n})",
+    ], ["calendar@company.com", "events@company.com"], [
+        "You have been invited to Product sync. When: {day} {time}. Join Zoom: https://zoom.us/j/{n}",
+        "When: {day} {time}. Where: Main conference room & Zoom. Accept | Decline",
+        "Meeting request. When: 3/{n2}/2026 {time}. Location: Room {n2}. https://meet.google.com/abc-{n}",
+    ]),
+    ("newsletter", 24, [
+        "Weekly digest: Product updates #{n}", "Your daily tech news", "The {day} briefing",
+    ], ["newsletter@product.com", "news@techdaily.com", "digest@mailchimp.com"], [
+        "View in browser | Unsubscribe | Manage preferences. This week we shipped new filters and improved search.",
+        "Unsubscribe | Privacy. Top stories: AI trends, cloud updates, and security tips.",
+    ]),
+    ("promotion", 16, [
+        "{n2}% off this weekend only", "Free shipping on orders over ${n2}", "Limited time: members save more",
+    ], ["deals@store.com", "promo@shop.com"], [
+        "Limited time: {n2}% off everything. Use code SAVE{n2} at checkout. Shop now!",
+        "Free shipping when you spend ${n2} or more. No code needed. Offer ends Sunday.",
+    ]),
+    ("other", 16, [
+        "Lunch tomorrow?", "Photos from the offsite", "Quick note",
+    ], ["jane@company.com", "alex@friends.net", "sam@company.com"], [
+        "Want to grab lunch tomorrow around 12:30? Let me know!",
+        "Here are the photos from last week. Great seeing everyone.",
+        "No rush on this, just wanted to share the link.",
+    ]),
+]
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+TIMES = ["9:00 AM", "10:30 AM", "12:30 PM", "3:00 PM", "5:00 PM"]
+FILLER = (
+    "Let me know if anything else is needed. I've attached the notes from the last review and "
+    "copied the team so everyone has context. Happy to jump on a call if that is easier."
+)
+LOG_LINE = "2026-03-{d:02d}T{h:02d}:{m:02d}:{s:02d}Z {level} [{svc}] request_id={rid} latency_ms={lat} status={status}"
+DEFAULT_NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+class SyntheticMailbox:
+    """Generate EmailThread objects deterministically from a seed."""
+
+    def __init__(self, seed: int = 0, now: Optional[datetime] = None, span_days: int = 90):
+        self.seed = seed
+        self.now = now or DEFAULT_NOW
+        self.span_days = span_days
+        self._weights = [w for _, w, *_ in SHAPES]
+
+    def _message_count(self, rng: random.Random) -> int:
+        r = rng.random()
+        if r < 0.01:
+            return rng.randint(50, 120)
+        if r < 0.05:
+            return rng.randint(10, 40)
+        return min(9, 1 + int(rng.expovariate(0.9)))
+
+    def _fill(self, text: str, rng: random.Random) -> str:
+        return text.format(n=rng.randint(1, 999999), n2=rng.randint(5, 90), day=rng.choice(DAYS), time=rng.choice(TIMES))
+
+    def _newsletter_html(self, rng: random.Random, text: str) -> str:
+        rows = "".join(
+            f'<tr><td style="padding:8px;font-family:Arial"><h2>Story {i}</h2><p>{FILLER}</p>'
+            f'<a href="https://example.com/s/{rng.randint(1, 10**9)}">Read more</a></td></tr>'
+            for i in range(rng.randint(40, 400))  # ~12-120 KB
+        )
+        return (
+            f"<html><head><style>td{{color:#333}}</style></head><body><p>{text}</p>"
+            f"<table>{rows}</table><p><a href=\"https://example.com/unsubscribe\">Unsubscribe</a></p></body></html>"
+        )
+
+    def _pasted_log(self, rng: random.Random) -> str:
+        return "\n".join(
+            LOG_LINE.format(
+                d=rng.randint(1, 28), h=rng.randint(0, 23), m=rng.randint(0, 59), s=rng.randint(0, 59),
+                level=rng.choice(["INFO", "INFO", "WARN", "ERROR"]), svc=rng.choice(["api", "db", "queue"]),
+                rid=rng.getrandbits(48), lat=rng.randint(1, 5000), status=rng.choice([200, 200, 500, 503]),
+            )
+            for _ in range(rng.randint(200, 2000))
+        )
+
+    def thread(self, i: int) -> EmailThread:
+        rng = random.Random(self.seed * 1_000_003 + i)
+        category, _, subjects, senders, bodies = rng.choices(SHAPES, weights=self._weights)[0]
+        subject = self._fill(rng.choice(subjects), rng)
+        count = self._message_count(rng)
+        start = self.now - timedelta(seconds=rng.randint(0, self.span_days * 86400))
+        tid = f"syn{self.seed}-{i}"
+        people = senders + ["me@company.com"]
+        messages = []
+        at = start
+        for k in range(count):
+            text = self._fill(rng.choice(bodies), rng)
+            if k:
+                text = f"{text}\n\n{FILLER * rng.randint(1, 4)}\n\nOn an earlier date someone wrote:\n> {FILLER}"
+            html = None
+            if category == "newsletter":
+                html = self._newsletter_html(rng, text)
+            elif rng.random() < 0.03:
+                text += "\n\nLogs:\n" + self._pasted_log(rng)
+            messages.append(EmailMessage(
+                id=f"{tid}-m{k}",
+                thread_id=tid,
+                sender=people[k % len(people)] if k else senders[0],
+                to=["me@company.com"] if k % 2 == 0 else [senders[0]],
+                subject=subject if k == 0 else f"Re: {subject}",
+                body_plain="" if html and rng.random() < 0.5 else text,
+                body_html=html,
+                date=at,
+                labels=["INBOX"] + (["UNREAD"] if k == count - 1 and rng.random() < 0.4 else []),
+                is_read=k < count - 1,
+                has_attachments=rng.random() < 0.1,
+                snippet=text[:120],
+            ))
+            at = min(self.now, at + timedelta(minutes=rng.randint(5, 3 * 1440)))
+        return EmailThread(id=tid, messages=messages, subject=subject, provider="synthetic")
+
+    def threads(self, count: int, start: int = 0) -> Iterator[EmailThread]:
+        for i in range(start, start + count):
+            yield self.thread(i)
+
+    def write_cache_dir(self, directory: Path, count: int, per_file: int = 10_000) -> list[Path]:
+        """Write threads as *.jsonl cache files (the rules backtest --cache-dir format)."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for start in range(0, count, per_file):
+            path = directory / f"synthetic-{self.seed}-{start // per_file:05d}.jsonl"
+            with open(path, "w", encoding="utf-8") as f:
+                for t in self.threads(min(per_file, count - start), start):
+                    f.write(json.dumps(t.to_dict(), separators=(",", ":")) + "\n")
+            paths.append(path)
+        return paths
+
+
+def synthetic_rules(count: int, seed: int = 0) -> list[Rule]:
+    """A rule set of `count` rules mixing every condition type (about 1 in 10 can match synthetic mail)."""
+    rng = random.Random(seed)
+    senders = [s for *_, ss, _ in SHAPES for s in ss]
+    rules = []
+    for i in range(count):
+        kind = rng.randrange(6)
+        if kind == 0:
+            pattern = rng.choice(senders) if rng.random() < 0.1 else f"sender{i}@nowhere\\.example"
+            conditions = [(RuleCondition.FROM, pattern)]
+        elif kind == 1:
+            conditions = [(RuleCondition.SUBJECT, rng.choice(["urgent", "invitation", "digest"]) if rng.random() < 0.1 else f"project-{i}\\b")]
+        elif kind == 2:
+            conditions = [(RuleCondition.BODY_CONTAINS, "unsubscribe" if rng.random() < 0.1 else f"ticket #{i}")]
+        elif kind == 3:
+            conditions = [(RuleCondition.TO, f"team{i}@company\\.com"), (RuleCondition.HAS_ATTACHMENT, "true")]
+        elif kind == 4:
+            conditions = [(RuleCondition.LABEL, "UNREAD" if rng.random() < 0.1 else f"Label_{i}")]
+        else:
+            conditions = [(RuleCondition.THREAD_COUNT, str(rng.choice([5, 20, 60])))]
+        rules.append(Rule(name=f"rule-{i}", conditions=conditions, action=RuleAction.APPLY_LABEL, action_param=f"Label_{i}"))
+    return rules
@@ -0,0 +1,123 @@
+"""Follow-up due-time index and persisted reminders."""
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import config
+from src.agents.follow_up_scheduler import FollowUpScheduler
+from src.agents.follow_up_tracker import FollowUpTracker
+from src.models import Category, EmailMessage, EmailThread, TriageResult
+
+NOW = datetime(2026, 6, 1, 12, tzinfo=timezone.utc)
+
+
+def _fixed_rule(entry):
+    return datetime.fromisoformat(entry["due"])
+
+
+def _entry(tid: str, hours: float) -> dict:
+    return {"thread_id": tid, "due": (NOW + timedelta(hours=hours)).isoformat()}
+
+
+def test_rescheduling_at_the_same_time_is_reported_once():
+    s = FollowUpScheduler(_fixed_rule)
+    e = _entry("t1", -1)
+    s.schedule(e)
+    s.schedule(e)
+    assert len(s) == 1
+    assert [d["thread_id"] for d in s.due(NOW)] == ["t1"]
+
+
+def test_cancel_then_reschedule_at_the_same_time_is_reported_once():
+    s = FollowUpScheduler(_fixed_rule)
+    e = _entry("t1", -1)
+    s.schedule(e)
+    s.cancel("t1")
+    s.schedule(e)
+    assert [d["thread_id"] for d in s.due(NOW)] == ["t1"]
+    assert [d["thread_id"] for d in s.pop_due(NOW)] == ["t1"]
+    assert s.due(NOW) == []
+
+
+def test_next_due_after_skips_overdue_entries():
+    s = FollowUpScheduler(_fixed_rule)
+    for tid, hours in (("a", -2), ("b", -1), ("c", 3), ("d", 5)):
+        s.schedule(_entry(tid, hours))
+    assert s.next_due()[1]["thread_id"] == "a"
+    assert s.next_due(after=NOW)[1]["thread_id"] == "c"
+    assert s.next_due(after=NOW + timedelta(hours=6)) is None
+
+
+def _thread(tid: str, last: datetime) -> EmailThread:
+    msg = EmailMessage(id=f"{tid}-m0", thread_id=tid, sender="a@b.c", to=["me@b.c"], subject="Hi", body_plain="?", date=last)
+    return EmailThread(id=tid, messages=[msg], subject="Hi", provider="gmail")
+
+
+def test_sent_reminders_survive_a_restart(tmp_path):
+    store = tmp_path / "follow_ups.json"
+    tracker = FollowUpTracker(store_path=store)
+    tracker.add(_thread("t1", datetime.now(timezone.utc) - timedelta(days=10)))
+    tracker.add(_thread("t2", datetime.now(timezone.utc) - timedelta(days=10)))
+    (first, *_) = tracker.due()
+    assert tracker.mark_reminded(first)
+
+    reopened = FollowUpTracker(store_path=store)
+    assert [e["thread_id"] for e in reopened.due()] == [e["thread_id"] for e in tracker.due()]
+    assert first["thread_id"] not in {e["thread_id"] for e in reopened.due()}
+
+    reopened.compact()
+    assert first["thread_id"] not in {e["thread_id"] for e in FollowUpTracker(store_path=store).due()}
+
+
+def test_watch_reminds_each_entry_once_including_other_writers(tmp_path):
+    store = tmp_path / "follow_ups.json"
+    watcher = FollowUpTracker(store_path=store)
+    FollowUpTracker(store_path=store).add(_thread("t1", datetime.now(timezone.utc) - timedelta(days=10)))
+    seen = []
+
+    def on_due(entry):
+        seen.append(entry["thread_id"])
+        if len(seen) == 1:
+            FollowUpTracker(store_path=store).add(_thread("t2", datetime.now(timezone.utc) - timedelta(days=10)))
+        else:
+            watcher.stop()
+        return True
+
+    watcher.watch(on_due, poll_sec=0.01)
+    assert seen == ["t1", "t2"]
+    assert FollowUpTracker(store_path=store).due() == []
+
+
+def test_watch_marks_only_accepted_entries(tmp_path):
+    store = tmp_path / "follow_ups.json"
+    watcher = FollowUpTracker(store_path=store)
+    old = datetime.now(timezone.utc) - timedelta(days=10)
+    for tid, priority in (("low", 10), ("high", 90), ("flaky", 90)):
+        watcher.add(_thread(tid, old), TriageResult(Category.OTHER, priority, False, "Inbox"))
+    calls = []
+
+    def on_due(entry):
+        calls.append(entry["thread_id"])
+        if len(calls) >= 6:
+            watcher.stop()
+        if entry["thread_id"] == "flaky":
+            raise RuntimeError("notifier down")
+        return entry["priority"] >= 60
+
+    watcher.watch(on_due, poll_sec=0.01)
+
+    assert calls.count("high") == 1
+    assert calls.count("low") > 1 and calls.count("flaky") > 1  # declined and failed entries are offered again
+    assert sorted(e["thread_id"] for e in FollowUpTracker(store_path=store).due()) == ["flaky", "low"]
+
+
+def test_due_hours_tiers_are_sorted_highest_first():
+    assert config.parse_due_hours("0:72, 80:4,60:24") == [(80, 4.0), (60, 24.0), (0, 72.0)]
+
+
+@pytest.mark.parametrize("raw", ["", "80", "80:4,high:24", "80:-1"])
+def test_malformed_due_hours_fall_back_to_the_default(raw, caplog):
+    with caplog.at_level(logging.WARNING, logger="config"):
+        assert config.parse_due_hours(raw) == config.parse_due_hours(config.DEFAULT_FOLLOW_UP_DUE_HOURS)
+    assert "FOLLOW_UP_DUE_HOURS" in caplog.text
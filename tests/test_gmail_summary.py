@@ -0,0 +1,62 @@
+"""Thread summaries from threads.get(format=metadata) responses, as the urgent prescreen sees them."""
+from src.features.urgent_detection import UrgentDetector
+from src.providers.gmail_provider import parse_thread_summary
+
+HEADERS = [
+    {"name": "From", "value": "Jane Doe <jane@company.com>"},
+    {"name": "Date", "value": "Tue, 2 Jun 2026 09:14:03 -0700"},
+    {"name": "Subject", "value": "Lunch?"},
+]
+
+
+def _response(payload: dict, snippet: str, size_estimate: int) -> dict:
+    """Shaped like a recorded users.threads.get(format=metadata, metadataHeaders=[Subject, From, Date]) response."""
+    return {
+        "id": "18f9c2d4a1b3e5f7",
+        "historyId": "4187223",
+        "messages": [{
+            "id": "18f9c2d4a1b3e5f7",
+            "threadId": "18f9c2d4a1b3e5f7",
+            "labelIds": ["UNREAD", "IMPORTANT", "CATEGORY_PERSONAL", "INBOX"],
+            "snippet": snippet,
+            "payload": {"partId": "", "mimeType": payload.pop("mimeType"), "filename": "", "headers": HEADERS, **payload},
+            "sizeEstimate": size_estimate,
+            "historyId": "4187223",
+            "internalDate": "1780416843000",
+        }],
+    }
+
+
+def _prescreen(response: dict) -> str:
+    return UrgentDetector(sender_domains=[], max_age_days=0, skip_bulk=False).prescreen(
+        parse_thread_summary("18f9c2d4a1b3e5f7", response)
+    )[0]
+
+
+def test_short_snippet_of_a_real_message_is_not_trusted():
+    # Received/DKIM/ARC headers make up most of sizeEstimate; the body may still be long
+    response = _response({"mimeType": "text/plain"}, "Lunch? I can do 12:30 at the usual place.", 5312)
+    summary = parse_thread_summary("18f9c2d4a1b3e5f7", response)
+    assert summary["snippet_complete"] is False
+    assert summary["sender"] == "Jane Doe <jane@company.com>"
+    assert summary["labels"] == ["CATEGORY_PERSONAL", "IMPORTANT", "INBOX", "UNREAD"]
+    assert _prescreen(response) == "maybe"
+
+
+def test_html_and_multipart_messages_are_never_complete():
+    for mime in ("multipart/alternative", "text/html"):
+        assert _prescreen(_response({"mimeType": mime}, "Lunch?", 180)) == "maybe"
+
+
+def test_small_plain_text_body_is_complete():
+    response = _response({"mimeType": "text/plain", "body": {"size": 44}}, "Lunch? I can do 12:30 at the usual place.", 5312)
+    assert parse_thread_summary("18f9c2d4a1b3e5f7", response)["snippet_complete"] is True
+    assert _prescreen(response) == "no"
+
+    headers_only = sum(len(f"{h['name']}: {h['value']}\r\n") for h in HEADERS) + 2
+    assert _prescreen(_response({"mimeType": "text/plain"}, "Lunch?", headers_only + 8)) == "no"
+
+
+def test_large_plain_text_body_is_not_complete():
+    response = _response({"mimeType": "text/plain", "body": {"size": 2400}}, "Lunch? " * 28, 7100)
+    assert _prescreen(response) == "maybe"
@@ -0,0 +1,123 @@
+"""RFC 822 / mbox parsing and the local archive providers' indexes."""
+import threading
+
+import pytest
+
+import config
+from src.providers.mbox_provider import MaildirProvider, MboxProvider
+from src.rfc822 import iter_mbox_spans, parse_headers, parse_rfc822, thread_key
+
+
+def _message(msg_id: str, subject: str, body: str, refs: str = "", extra: str = "") -> bytes:
+    headers = f"From: a@example.com\nTo: me@example.com\nSubject: {subject}\nDate: Mon, 1 Jun 2026 10:00:00 +0000\n"
+    if msg_id:
+        headers += f"Message-ID: <{msg_id}>\n"
+    if refs:
+        headers += f"References: <{refs}>\nIn-Reply-To: <{refs}>\n"
+    return (headers + extra + "\n" + body + "\n").encode()
+
+
+def _mbox(*messages: bytes) -> bytes:
+    return b"".join(b"From a@example.com Mon Jun  1 10:00:00 2026\n" + m + b"\n" for m in messages)
+
+
+def _spans(data: bytes, start: int = 0) -> list[tuple[int, int]]:
+    result = []
+    worker = threading.Thread(target=lambda: result.extend(iter_mbox_spans(data, start)), daemon=True)
+    worker.start()
+    worker.join(5)
+    assert not worker.is_alive(), "iter_mbox_spans did not terminate"
+    return result
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MAIL_INDEX_DIR", tmp_path / "index")
+
+
+def test_spans_stop_at_a_from_line_without_newline():
+    data = b"From a@b Mon\nSubject: x\n\nhello\nFrom b@c Tue"
+    assert [data[s:e] for s, e in _spans(data)] == [b"Subject: x\n\nhello\n"]
+
+
+def test_spans_from_an_offset():
+    data = _mbox(_message("1@x", "one", "first"), _message("2@x", "two", "second"))
+    first, second = _spans(data)
+    assert _spans(data, first[1]) == [second]
+    assert _spans(data, first[0] + 3) == [second]
+
+
+def test_parse_rfc822_decodes_headers_and_html_only_bodies():
+    raw = _message(
+        "", "=?utf-8?b?w7xiZXI=?=", "<p>Hello <a href=\"https://example.com/x\">there</a></p>",
+        extra="Content-Type: text/html; charset=utf-8\n",
+    )
+    msg = parse_rfc822(raw, "t1", "t1:0")
+    assert msg.id == "t1:0"
+    assert msg.subject == "über"
+    assert msg.body_plain == "Hello there"
+    assert msg.links == ("https://example.com/x",)
+
+
+def test_thread_key_follows_references():
+    thread_of = {}
+    root = parse_headers(_message("1@x", "hi", "a"))
+    reply = parse_headers(_message("2@x", "Re: hi", "b", refs="1@x"))
+    assert thread_key(root, thread_of, "f0") == ("<1@x>", "<1@x>")
+    assert thread_key(reply, thread_of, "f1") == ("<2@x>", "<1@x>")
+
+
+def test_mbox_index_reopen_and_append(tmp_path):
+    path = tmp_path / "a.mbox"
+    path.write_bytes(_mbox(_message("1@x", "hi", "a"), _message("2@x", "Re: hi", "b", refs="1@x")))
+    provider = MboxProvider({"path": str(path)})
+    (listed,) = provider.list_threads()
+    thread = provider.get_thread(listed["id"])
+    assert [m.subject for m in thread.messages] == ["hi", "Re: hi"]
+    assert provider.get_message("<2@x>").body_plain.strip() == "b"
+    provider.close()
+
+    # A message mid-append: its "From " line has no newline yet
+    with open(path, "ab") as f:
+        f.write(b"From a@example.com Mon Jun  1 11:00:00 2026")
+    provider = MboxProvider({"path": str(path)})
+    assert len(provider.rows) == 2
+    provider.close()
+
+    with open(path, "ab") as f:
+        f.write(b"\n" + _message("3@x", "other", "c") + b"\n")
+    provider = MboxProvider({"path": str(path)})
+    assert sorted(r[1] for r in provider.rows) == ["<1@x>", "<2@x>", "<3@x>"]
+    assert len(provider.list_threads()) == 2
+    provider.close()
+
+
+def test_maildir_index_and_flags(tmp_path):
+    root = tmp_path / "md"
+    for sub in ("cur", "new", "tmp"):
+        (root / sub).mkdir(parents=True)
+    (root / "cur" / "100.a:2,S").write_bytes(_message("1@x", "hi", "a"))
+    (root / "new" / "200.b").write_bytes(_message("2@x", "Re: hi", "b", refs="1@x"))
+    provider = MaildirProvider({"path": str(root)})
+    (listed,) = provider.list_threads()
+    thread = provider.get_thread(listed["id"])
+    assert [(m.subject, m.is_read) for m in thread.messages] == [("hi", True), ("Re: hi", False)]
+    assert provider.inbox_stats() == {"inbox_count": 1, "unread_count": 1}
+
+    (root / "new" / "200.b").rename(root / "cur" / "200.b:2,S")
+    assert MaildirProvider({"path": str(root)}).inbox_stats() == {"inbox_count": 1, "unread_count": 0}
+
+
+def test_messages_without_message_id_are_found_by_their_fallback_id(tmp_path):
+    path = tmp_path / "a.mbox"
+    path.write_bytes(_mbox(_message("", "one", "a"), _message("", "two", "b")))
+    root = tmp_path / "md"
+    for sub in ("cur", "new", "tmp"):
+        (root / sub).mkdir(parents=True)
+    (root / "cur" / "100.a:2,S").write_bytes(_message("", "one", "a"))
+
+    for provider in (MboxProvider({"path": str(path)}), MaildirProvider({"path": str(root)})):
+        for listed in provider.list_threads():
+            (msg,) = provider.get_thread(listed["id"]).messages
+            assert msg.id
+            assert provider.get_message(msg.id).subject == msg.subject
@@ -0,0 +1,102 @@
+"""Rule backtests over an mbox archive and a thread cache, and the CLI command."""
+import json
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+import config
+import plugin_cli
+from src.engines.rules_backtest import run_backtest
+from src.engines.rules_engine import Rule
+from src.models import EmailMessage, EmailThread
+
+RULES = [
+    {"name": "vendor", "conditions": [["from", "@vendor\\.com"]], "action": "apply_label", "action_param": "Vendors"},
+    {"name": "vendor", "conditions": [["subject", "invoice"]], "action": "apply_label", "action_param": "Vendors"},
+    {"name": "never", "conditions": [["from", "@nowhere\\.example"]], "action": "skip"},
+]
+
+
+def _message(i: int, sender: str, subject: str) -> bytes:
+    return (
+        f"From {sender} Mon Jun  1 10:00:00 2026\n"
+        f"From: {sender}\nTo: me@example.com\nSubject: {subject}\n"
+        f"Date: Mon, 1 Jun 2026 10:{i:02d}:00 +0000\nMessage-ID: <{i}@x>\n\nbody {i}\n\n"
+    ).encode()
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MAIL_INDEX_DIR", tmp_path / "index")
+
+
+@pytest.fixture
+def mbox(tmp_path):
+    path = tmp_path / "a.mbox"
+    path.write_bytes(
+        _message(1, "sales@vendor.com", "Q3 invoice")
+        + _message(2, "sales@vendor.com", "Hello")
+        + _message(3, "boss@company.com", "Invoice approval")
+        + _message(4, "friend@home.net", "Lunch")
+    )
+    return path
+
+
+def _summary(events) -> dict:
+    events = list(events)
+    assert events[-1]["event"] == "summary"
+    return events[-1]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_rules_with_the_same_name_are_reported_separately(mbox, workers):
+    rules = [Rule.from_dict(d) for d in RULES]
+    summary = _summary(run_backtest(rules, mbox=mbox, workers=workers, samples=5))
+
+    assert summary["threads"] == 4
+    report = [(r["rule_index"], r["rule"], r["matches"], sorted(r["sample_thread_ids"])) for r in summary["rules"]]
+    assert report == [
+        (0, "vendor", 2, ["<1@x>", "<2@x>"]),
+        (1, "vendor", 2, ["<1@x>", "<3@x>"]),
+        (2, "never", 0, []),
+    ]
+    assert summary["rules"][0]["match_rate"] == 0.5
+
+
+def test_cache_dir_backtest_skips_old_threads(tmp_path):
+    def thread(tid: str, sender: str, year: int) -> dict:
+        msg = EmailMessage(id=f"{tid}-m0", thread_id=tid, sender=sender, to=["me@example.com"], subject="Invoice",
+                           body_plain="", date=datetime(year, 1, 1, tzinfo=timezone.utc))
+        return EmailThread(id=tid, messages=[msg], subject="Invoice", provider="gmail").to_dict()
+
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    lines = [thread("new", "a@vendor.com", datetime.now(timezone.utc).year), thread("old", "b@vendor.com", 2001)]
+    (cache / "threads.jsonl").write_text("".join(json.dumps(t) + "\n" for t in lines), encoding="utf-8")
+
+    summary = _summary(run_backtest([Rule.from_dict(RULES[0])], cache_dir=cache, workers=1, since_days=400))
+
+    assert (summary["threads"], summary["skipped_by_date"]) == (1, 1)
+    assert summary["rules"][0]["sample_thread_ids"] == ["new"]
+
+
+def test_cli_streams_progress_then_summary(mbox, tmp_path, monkeypatch, capsys):
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({"rules": RULES}), encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", ["plugin_cli.py", "rules", "backtest", "--rules", str(rules), "--mbox", str(mbox), "--workers", "1"])
+
+    assert plugin_cli.main() == 0
+
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [e["event"] for e in events[:2]] == ["indexed", "progress"]
+    assert events[-2]["matches"] == [2, 2, 0]
+    assert [r["matches"] for r in events[-1]["rules"]] == [2, 2, 0]
+
+
+def test_cli_rejects_an_empty_rule_file(mbox, tmp_path, monkeypatch):
+    rules = tmp_path / "rules.json"
+    rules.write_text("[]", encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", ["plugin_cli.py", "rules", "backtest", "--rules", str(rules), "--mbox", str(mbox)])
+
+    assert plugin_cli.main() == 1
@@ -0,0 +1,68 @@
+"""Shared state files: journal replay after a torn append, and locked read-modify-write across processes."""
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.agents.follow_up_tracker import FollowUpTracker
+from src.models import EmailMessage, EmailThread
+from src.storage import append_jsonl, read_json, read_jsonl_from, update_json
+
+
+def _thread(tid: str) -> EmailThread:
+    msg = EmailMessage(id=f"{tid}-m0", thread_id=tid, sender="a@b.c", to=["me@b.c"], subject="Hi", body_plain="?",
+                       date=datetime.now(timezone.utc) - timedelta(days=1))
+    return EmailThread(id=tid, messages=[msg], subject="Hi", provider="gmail")
+
+
+def test_records_after_a_truncated_line_are_kept(tmp_path):
+    journal = tmp_path / "log.jsonl"
+    append_jsonl(journal, [{"n": 1}])
+    with open(journal, "ab") as f:
+        f.write(b'{"n": 2, "tru')  # crash mid-append
+
+    records, offset = read_jsonl_from(journal)
+    assert (records, offset) == ([{"n": 1}], len(b'{"n":1}\n'))
+
+    append_jsonl(journal, [{"n": 3}])
+    assert read_jsonl_from(journal)[0] == [{"n": 1}, {"n": 3}]
+    assert read_jsonl_from(journal, offset)[0] == [{"n": 3}]
+
+
+def test_follow_up_journal_replays_past_a_truncated_last_line(tmp_path):
+    store = tmp_path / "follow_ups.json"
+    tracker = FollowUpTracker(store_path=store)
+    tracker.add(_thread("t1"))
+    tracker.add(_thread("t2"))
+    journal = tracker._journal_path
+    data = journal.read_bytes()
+    journal.write_bytes(data[: len(data) - 10])  # the t2 record was cut short
+
+    reopened = FollowUpTracker(store_path=store)
+    assert [e["thread_id"] for e in reopened.list_pending()] == ["t1"]
+
+    reopened.add(_thread("t3"))
+    assert sorted(e["thread_id"] for e in FollowUpTracker(store_path=store).list_pending()) == ["t1", "t3"]
+
+
+def _increment(path: str, n: int) -> None:
+    def bump(data: dict) -> None:
+        data["count"] += 1
+
+    for _ in range(n):
+        update_json(path, bump, lambda: {"count": 0})
+
+
+def test_update_json_from_two_processes_loses_no_counts(tmp_path):
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("needs fork: the test package is registered by conftest, not installed")
+    ctx = multiprocessing.get_context("fork")
+    path = tmp_path / "counts.json"
+    procs = [ctx.Process(target=_increment, args=(str(path), 200)) for _ in range(2)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+    assert [p.exitcode for p in procs] == [0, 0]
+    assert read_json(path, None) == {"count": 400}
+    assert not list(tmp_path.glob("*.corrupt-*"))
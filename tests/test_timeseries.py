@@ -0,0 +1,54 @@
+"""Resolution choice for MetricsTimeSeries queries, and when buffered metrics land."""
+import time
+from datetime import datetime, timezone
+
+from src.deliverables.productivity_metrics import ProductivityMetrics
+from src.deliverables.timeseries import MetricsTimeSeries
+
+
+def test_step_below_a_minute_uses_minute_buckets(tmp_path):
+    ts = MetricsTimeSeries(tmp_path / "ts.db")
+    now = time.time()
+    assert ts._table_for(now - 3600, 30) == ("ts_minute", 60)
+    assert ts._table_for(now - 3600, 90) == ("ts_minute", 120)
+    assert ts._table_for(now - 3600, 7200) == ("ts_hour", 7200)
+    ts.close()
+
+
+def test_range_older_than_minute_retention_uses_hour_buckets(tmp_path):
+    ts = MetricsTimeSeries(tmp_path / "ts.db")
+    now = time.time()
+    start = now - 30 * 86400
+    assert ts._table_for(start, 600) == ("ts_hour", 3600)
+    assert ts._table_for(start, 30) == ("ts_hour", 3600)
+    assert ts._table_for(now - 400 * 86400, 600) == ("ts_day", 86400)
+
+    at = int(start // 86400) * 86400 + 3600 + 5
+    ts.record("m", 1, at=at)
+    ts.record("m", 3, at=at + 3600)
+    points = ts.query("m", start=at - 3600, end=at + 7200, step=600)
+    assert [p["count"] for p in points] == [1, 1]
+    ts.close()
+
+
+def test_buffered_metrics_are_stamped_when_recorded_not_when_flushed(tmp_path, monkeypatch):
+    series = MetricsTimeSeries(tmp_path / "ts.db")
+    metrics = ProductivityMetrics(tmp_path / "metrics.json", flush_every=1000, flush_interval=1e9, series=series)
+    hour = int(time.time() // 3600) * 3600 - 3 * 3600
+    clock = [hour + 10]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+
+    metrics.record_threads_processed(2)
+    metrics.record_triage_latency(120.0)
+    clock[0] = hour + 3600 + 10
+    metrics.record_threads_processed(3)
+    clock[0] = hour + 2 * 3600 + 10
+    metrics.flush()
+
+    points = series.query("threads_processed", start=hour, end=hour + 3 * 3600, step=3600)
+    assert [(p["t"], p["sum"]) for p in points] == [
+        (datetime.fromtimestamp(hour, timezone.utc).isoformat(), 2),
+        (datetime.fromtimestamp(hour + 3600, timezone.utc).isoformat(), 3),
+    ]
+    assert [p["count"] for p in series.query("triage_latency_ms", start=hour, end=hour + 3600, step=60)] == [1]
+    series.close()
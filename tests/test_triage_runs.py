@@ -0,0 +1,36 @@
+"""Triage run registry: joining, refusing and finishing runs."""
+import threading
+
+from src.triage_runs import TriageRuns
+
+
+def _source(gate: threading.Event):
+    def source():
+        gate.wait(5)
+        yield "progress", {"done": 1, "total": 1}
+    return source
+
+
+def test_same_parameters_join_the_unfinished_run():
+    runs, gate = TriageRuns(workers=1, max_queued=4), threading.Event()
+    first, created = runs.start("gmail", _source(gate), {"max": 50})
+    again, joined_created = runs.start("gmail", _source(gate), {"max": 50})
+    assert created and not joined_created
+    assert again is first
+    assert runs.stats()["deduplicated"] == 1
+    gate.set()
+    assert [e for _, e, _ in filter(None, first.events(timeout=5))] == ["progress", "done"]
+
+
+def test_other_parameters_are_not_joined():
+    runs, gate = TriageRuns(workers=1, max_queued=4), threading.Event()
+    first, _ = runs.start("gmail", _source(gate), {"max": 50})
+    other, created = runs.start("gmail", _source(gate), {"max": 500})
+    assert other is first and not created
+    assert other.params != {"max": 500}
+    assert runs.stats()["deduplicated"] == 0
+    assert runs.active("gmail") is first and runs.active("outlook") is None
+    gate.set()
+    list(first.events(timeout=5))
+    assert runs.active("gmail") is None
+    assert runs.start("gmail", _source(gate), {"max": 500})[1]
@@ -0,0 +1,29 @@
+"""SnapshotReader tolerates unreadable snapshot files."""
+from src.triage_snapshot import SnapshotReader, write_snapshot
+
+ROW = {
+    "thread_id": "t1", "subject": "Hi", "category": "other", "priority": 50,
+    "urgent": False, "folder": "Other", "last_message_at": "2026-06-01T00:00:00+00:00",
+}
+
+
+def test_unreadable_file_without_previous_snapshot_reads_as_none(tmp_path):
+    path = tmp_path / "snap.bin"
+    path.write_bytes(b"not a snapshot")
+    reader = SnapshotReader(path, check_interval=0)
+    assert reader.get() is None
+    assert reader.get() is None
+
+
+def test_truncated_file_keeps_the_previous_snapshot(tmp_path):
+    path = tmp_path / "snap.bin"
+    header = write_snapshot([ROW], path)
+    reader = SnapshotReader(path, check_interval=0)
+    assert reader.get().generation == header["generation"]
+
+    path.write_bytes(path.read_bytes()[:20])
+    snap = reader.get()
+    assert snap is not None and snap.generation == header["generation"]
+
+    header = write_snapshot([ROW, {**ROW, "thread_id": "t2"}], path)
+    assert reader.get().generation == header["generation"]
@@ -0,0 +1,59 @@
+"""/api/triage/stream follows runs started by POST /api/jobs/triage; it never starts one."""
+import threading
+
+import pytest
+
+import app as dashboard
+import config
+from src.triage_runs import TriageRuns
+
+
+@pytest.fixture
+def client(monkeypatch):
+    gate = threading.Event()
+
+    def fake_source(provider, max_threads):
+        def source():
+            gate.wait(5)
+            yield "thread", {"thread_id": "t1"}
+        return source
+
+    monkeypatch.setattr(config, "DASHBOARD_PROVIDER", "gmail")
+    monkeypatch.setattr(dashboard, "_triage_runs", TriageRuns(workers=1, max_queued=4))
+    monkeypatch.setattr(dashboard, "_triage_source", fake_source)
+    monkeypatch.setattr(dashboard, "_stream_slots", threading.BoundedSemaphore(1))
+    client = dashboard.app.test_client()
+    client.gate = gate
+    return client
+
+
+def test_stream_without_a_run_starts_nothing(client):
+    assert client.get("/api/triage/stream").status_code == 404
+    assert dashboard._triage_runs.stats()["queue_depth"] == 0
+    assert dashboard._triage_runs.active("gmail") is None
+
+
+def test_other_providers_are_refused(client):
+    assert client.get("/api/triage/stream?provider=replay").status_code == 400
+    assert client.post("/api/jobs/triage", json={"provider": "replay"}).status_code == 400
+
+
+def test_stream_follows_the_posted_job(client):
+    job = client.post("/api/jobs/triage", json={"max": 5}).get_json()["job_id"]
+    resp = client.get("/api/triage/stream")  # the provider's unfinished run
+    client.gate.set()
+    body = resp.get_data(as_text=True)
+    resp.close()
+    assert f": run {job}" in body
+    assert "event: thread" in body and "event: done" in body
+    assert "event: thread" in client.get(f"/api/triage/stream?job={job}").get_data(as_text=True)
+
+
+def test_open_streams_are_capped(client):
+    job = client.post("/api/jobs/triage").get_json()["job_id"]
+    first = client.get("/api/triage/stream")
+    assert client.get(f"/api/triage/stream?job={job}").status_code == 503
+    client.gate.set()
+    first.get_data()
+    first.close()
+    assert client.get(f"/api/triage/stream?job={job}").status_code == 200
@@ -0,0 +1,104 @@
+"""The urgent view's prescreen must not change which threads get_urgent reports."""
+from datetime import datetime, timedelta, timezone
+
+from src.assistant import EmailAssistant
+from src.models import EmailMessage, EmailThread
+
+NOW = datetime.now(timezone.utc)
+
+# (sender, labels, snippet, body, age in days, messages); urgent keywords appear only in bodies
+SHAPES = [
+    ("alerts@bank.com", ["INBOX", "CATEGORY_UPDATES"], "Your statement is ready", "Action required: confirm the transfer today.", 1, 1),
+    ("notifications@github.com", ["INBOX", "CATEGORY_FORUMS"], "New comment on your PR", "This blocks the release, the deadline is Friday.", 2, 2),
+    ("no-reply@accounts.example", ["INBOX", "FOCUSED_OTHER"], "Security notice", "Immediate attention needed: new sign-in from an unknown device.", 3, 1),
+    ("news@digest.com", ["INBOX"], "Unsubscribe | View in browser", "Weekly digest. Also: the outage is critical, please read.", 4, 1),
+    ("sarah@company.com", ["INBOX"], "Re: budget", "Can we finish this asap? The board meets tomorrow.", 90, 3),
+    ("jane@company.com", ["INBOX"], "Lunch?", "Lunch?", 1, 1),
+    ("deals@store.com", ["INBOX", "CATEGORY_PROMOTIONS"], "50% off", "50% off everything this weekend. Unsubscribe", 5, 1),
+    ("mike@agency.com", ["INBOX"], "Re: timeline", "Let me know when the draft is ready.", 120, 2),
+]
+
+
+def _thread(i: int, shape) -> tuple[EmailThread, dict]:
+    sender, labels, snippet, body, age, count = shape
+    tid = f"t{i}"
+    at = NOW - timedelta(days=age)
+    messages = [
+        EmailMessage(
+            id=f"{tid}-m{k}", thread_id=tid, sender=sender, to=["me@company.com"], subject="Notice",
+            body_plain=body, date=at - timedelta(hours=count - k), labels=labels, snippet=snippet,
+        )
+        for k in range(count)
+    ]
+    summary = {
+        "id": tid, "provider": "fake", "subject": "Notice", "sender": sender, "snippet": snippet,
+        "labels": labels, "message_count": count, "last_message_at": at.isoformat(),
+        "snippet_complete": len(body) <= len(snippet),
+    }
+    return EmailThread(id=tid, messages=messages, subject="Notice", provider="fake"), summary
+
+
+class FakeProvider:
+    name = "fake"
+
+    def __init__(self):
+        pairs = [_thread(i, shape) for i, shape in enumerate(SHAPES)]
+        self.threads = {t.id: t for t, _ in pairs}
+        self.summaries = [s for _, s in pairs]
+        self.fetched = []
+
+    def list_threads(self, max_results=50, query=None):
+        return [{"id": s["id"], "provider": "fake"} for s in self.summaries[:max_results]]
+
+    def list_thread_summaries(self, max_results=50, query=None):
+        return self.summaries[:max_results]
+
+    def get_thread(self, thread_id):
+        self.fetched.append(thread_id)
+        return self.threads.get(thread_id)
+
+
+def _assistant(provider) -> EmailAssistant:
+    assistant = EmailAssistant(provider_name="replay", credentials={"synthetic": 1}, use_scaledown=False)
+    assistant.provider = provider
+    return assistant
+
+
+def test_prescreen_matches_full_analysis_when_keywords_are_only_in_bodies():
+    provider = FakeProvider()
+    assistant = _assistant(provider)
+    expected = {
+        t["id"] for t in provider.list_threads()
+        if assistant.urgent_detector.is_urgent(provider.get_thread(t["id"]))
+    }
+    provider.fetched.clear()
+
+    got = {item["thread_id"] for item in assistant.get_urgent(max_threads=50)}
+
+    assert expected == {"t0", "t1", "t2", "t3", "t4"}
+    assert got == expected
+    assert "t5" not in provider.fetched  # single message fully shown by its snippet
+    assert assistant.last_urgent_cascade["fetched"] == len(provider.fetched)
+
+
+def test_opt_in_rules_skip_bulk_and_idle_threads():
+    provider = FakeProvider()
+    assistant = _assistant(provider)
+    assistant.urgent_detector.skip_bulk = True
+    assistant.urgent_detector.max_age_days = 30
+
+    assistant.get_urgent(max_threads=50)
+
+    assert set(provider.fetched) == set()
+    assert assistant.last_urgent_cascade["no"] == len(SHAPES)
+
+
+def test_spam_is_never_fetched():
+    provider = FakeProvider()
+    provider.summaries[0]["labels"] = ["SPAM"]
+    assistant = _assistant(provider)
+
+    items = assistant.get_urgent(max_threads=50)
+
+    assert "t0" not in provider.fetched
+    assert "t0" not in {item["thread_id"] for item in items}
@@ -0,0 +1,143 @@
+"""
+Embedded time-series store for metrics (SQLite in WAL mode).
+
+Each sample is folded into minute, hour and day buckets at write time
+(count/sum/min/max per metric and bucket), so queries never scan raw
+history. Minute and hour buckets expire after their retention window;
+day buckets are kept.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# (table, bucket seconds, retention days or None = forever)
+RESOLUTIONS = (
+    ("ts_minute", 60, config.TIMESERIES_MINUTE_RETENTION_DAYS),
+    ("ts_hour", 3600, config.TIMESERIES_HOUR_RETENTION_DAYS),
+    ("ts_day", 86400, None),
+)
+EXPIRE_EVERY_SEC = 3600
+
+TimeArg = Union[datetime, float, int, str, None]
+
+
+def _epoch(value: TimeArg, default: float) -> float:
+    if value is None or value == "":
+        return default
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return _epoch(datetime.fromisoformat(value.replace("Z", "+00:00")), default)
+    return float(value)
+
+
+class MetricsTimeSeries:
+    """Per-minute counters/observations with automatic hourly and daily rollups."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self._path = path or config.TIMESERIES_DB
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self._path), timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for table, _, _ in RESOLUTIONS:
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    "metric TEXT NOT NULL, bucket INTEGER NOT NULL, count INTEGER NOT NULL, "
+                    "sum REAL NOT NULL, vmin REAL NOT NULL, vmax REAL NOT NULL, "
+                    "PRIMARY KEY (metric, bucket)) WITHOUT ROWID"
+                )
+        self._last_expire = 0.0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def record(self, metric: str, value: float = 1.0, at: TimeArg = None) -> None:
+        self.record_many([(metric, value)], at=at)
+
+    def record_many(self, samples: Iterable[tuple[str, float]], at: TimeArg = None) -> None:
+        """Write samples (metric, value) taken at `at` (default now) in one transaction."""
+        ts = _epoch(at, time.time())
+        rows = [(metric, float(value)) for metric, value in samples]
+        if not rows:
+            return
+        with self._lock:
+            try:
+                with self._conn:
+                    for table, secs, _ in RESOLUTIONS:
+                        bucket = int(ts // secs) * secs
+                        self._conn.executemany(
+                            f"INSERT INTO {table} VALUES (?, ?, 1, ?, ?, ?) "
+                            "ON CONFLICT(metric, bucket) DO UPDATE SET count = count + 1, "
+                            "sum = sum + excluded.sum, vmin = min(vmin, excluded.vmin), vmax = max(vmax, excluded.vmax)",
+                            [(metric, bucket, v, v, v) for metric, v in rows],
+                        )
+                if ts - self._last_expire >= EXPIRE_EVERY_SEC:
+                    self._expire(ts)
+            except sqlite3.Error as e:
+                logger.exception("timeseries write: %s", e)
+
+    def _expire(self, now: float) -> None:
+        with self._conn:
+            for table, _, days in RESOLUTIONS:
+                if days is not None:
+                    self._conn.execute(f"DELETE FROM {table} WHERE bucket < ?", (int(now - days * 86400),))
+        self._last_expire = now
+
+    def _table_for(self, start: float, step: int) -> tuple[str, int]:
+        """
+        Coarsest resolution no coarser than `step` among those still retaining
+        data back to `start` (else the finest retained one), and `step` rounded
+        up to a whole number of its buckets.
+        """
+        now = time.time()
+        retained = [res for res in RESOLUTIONS if res[2] is None or start >= now - res[2] * 86400]
+        fitting = [res for res in retained if res[1] <= step]
+        table, secs, _ = fitting[-1] if fitting else retained[0]
+        return table, max(1, -(-step // secs)) * secs
+
+    def query(self, metric: str, start: TimeArg = None, end: TimeArg = None, step: Optional[int] = None) -> list[dict]:
+        """
+        Buckets of `step` seconds between start and end (defaults: last 24h, step
+        sized for ~100 points). Each point: t, count, sum, avg, min, max.
+        """
+        end_ts = _epoch(end, time.time())
+        start_ts = _epoch(start, end_ts - 86400)
+        if step is None or step <= 0:
+            step = max(60, int((end_ts - start_ts) / 100))
+        table, step = self._table_for(start_ts, int(step))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT (bucket / ?) * ? AS b, SUM(count), SUM(sum), MIN(vmin), MAX(vmax) FROM {table} "
+                "WHERE metric = ? AND bucket >= ? AND bucket < ? GROUP BY b ORDER BY b",
+                (step, step, metric, int(start_ts // step) * step, end_ts),
+            ).fetchall()
+        return [
+            {
+                "t": datetime.fromtimestamp(b, timezone.utc).isoformat(),
+                "count": count,
+                "sum": total,
+                "avg": total / count if count else None,
+                "min": vmin,
+                "max": vmax,
+            }
+            for b, count, total, vmin, vmax in rows
+        ]
+
+    def metrics(self) -> list[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT metric FROM ts_day ORDER BY metric")]
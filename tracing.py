@@ -0,0 +1,222 @@
+"""
+Lightweight span tracing for the triage pipeline.
+
+    with span("triage.categorize"):
+        ...
+
+Disabled (the default), span() returns a shared no-op object: one global
+read and a call, no allocation. enable() installs a Tracer that records
+every span (name, thread, start, duration, self time, parent path, attrs)
+and, with memory=True, the tracemalloc peak allocated inside each span.
+The CLI's --profile / --memprofile flags print Tracer.format_report() and
+can export Chrome trace-event JSON (chrome://tracing, Perfetto) or
+collapsed stacks (flamegraph.pl, speedscope).
+"""
+import json
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Optional
+
+# Root span per triaged thread; its attrs identify the slowest threads in reports
+THREAD_SPAN = "triage.thread"
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+_tracer: Optional["Tracer"] = None
+
+
+def span(name: str, **attrs):
+    """Context manager timing a pipeline stage (no-op unless tracing is enabled)."""
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP
+    return _Span(tracer, name, attrs)
+
+
+def enable(memory: bool = False) -> "Tracer":
+    """Start recording spans (and per-span allocation peaks if memory=True)."""
+    global _tracer
+    _tracer = Tracer(memory=memory)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return _tracer
+
+
+def disable() -> Optional["Tracer"]:
+    """Stop recording; returns the tracer with what it collected."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None and tracer.memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return tracer
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "start", "child_ns", "mem_start", "mem_max", "parent")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        self.parent = stack[-1] if stack else None
+        self.child_ns = 0
+        if self.tracer.memory:
+            # tracemalloc has one global peak: fold it into the parent before resetting it for this span
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                self.parent.mem_max = max(self.parent.mem_max, peak)
+            tracemalloc.reset_peak()
+            self.mem_start = self.mem_max = current
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        stack = self.tracer._stack()
+        stack.pop()
+        dur = end - self.start
+        mem_peak = None
+        if self.tracer.memory:
+            _, peak = tracemalloc.get_traced_memory()
+            self.mem_max = max(self.mem_max, peak)
+            mem_peak = self.mem_max - self.mem_start
+            if self.parent is not None:
+                self.parent.mem_max = max(self.parent.mem_max, self.mem_max)
+            tracemalloc.reset_peak()
+        if self.parent is not None:
+            self.parent.child_ns += dur
+        path = tuple(s.name for s in stack) + (self.name,)
+        self.tracer._record(path, threading.get_ident(), self.start, dur, dur - self.child_ns, self.attrs, mem_peak)
+        return False
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+class Tracer:
+    """Collects finished spans; summarizes and exports them."""
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.spans: list[dict[str, Any]] = []
+        self._local = threading.local()
+        self._origin = time.perf_counter_ns()
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, path, tid, start, dur, self_ns, attrs, mem_peak) -> None:
+        self.spans.append({  # list.append is atomic; no lock needed
+            "name": path[-1],
+            "path": path,
+            "tid": tid,
+            "start_ns": start - self._origin,
+            "dur_ns": dur,
+            "self_ns": self_ns,
+            "attrs": attrs,
+            "mem_peak": mem_peak,
+        })
+
+    def report(self, slowest: int = 10) -> dict:
+        """Per-stage count/total/p50/p95/p99/max (ms), allocation peaks, and the slowest threads."""
+        by_name: dict[str, list[dict]] = {}
+        for s in self.spans:
+            by_name.setdefault(s["name"], []).append(s)
+        stages = {}
+        for name, spans in by_name.items():
+            ms = sorted(s["dur_ns"] / 1e6 for s in spans)
+            stage = {
+                "count": len(ms),
+                "total_ms": round(sum(ms), 3),
+                "self_ms": round(sum(s["self_ns"] for s in spans) / 1e6, 3),
+                "p50_ms": round(_percentile(ms, 0.50), 3),
+                "p95_ms": round(_percentile(ms, 0.95), 3),
+                "p99_ms": round(_percentile(ms, 0.99), 3),
+                "max_ms": round(ms[-1], 3),
+            }
+            if self.memory:
+                peaks = [s["mem_peak"] or 0 for s in spans]
+                stage["mem_peak_max_kb"] = round(max(peaks) / 1024, 1)
+                stage["mem_peak_avg_kb"] = round(sum(peaks) / len(peaks) / 1024, 1)
+            stages[name] = stage
+        threads = sorted((s for s in self.spans if s["name"] == THREAD_SPAN), key=lambda s: s["dur_ns"], reverse=True)
+        return {
+            "stages": dict(sorted(stages.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)),
+            "slowest_threads": [{**s["attrs"], "ms": round(s["dur_ns"] / 1e6, 3)} for s in threads[:slowest]],
+        }
+
+    def format_report(self, slowest: int = 10) -> str:
+        rep = self.report(slowest)
+        cols = ["count", "total_ms", "self_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+        if self.memory:
+            cols += ["mem_peak_max_kb", "mem_peak_avg_kb"]
+        width = max([len(n) for n in rep["stages"]] + [5])
+        lines = ["stage".ljust(width) + "".join(c.rjust(16) for c in cols)]
+        for name, stage in rep["stages"].items():
+            lines.append(name.ljust(width) + "".join(str(stage[c]).rjust(16) for c in cols))
+        if rep["slowest_threads"]:
+            lines.append("")
+            lines.append("slowest threads:")
+            for t in rep["slowest_threads"]:
+                lines.append(f"  {t['ms']:>10.3f} ms  " + " ".join(f"{k}={v}" for k, v in t.items() if k != "ms"))
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Chrome trace-event JSON ("X" complete events, microseconds)."""
+        events = [
+            {
+                "name": s["name"],
+                "ph": "X",
+                "ts": s["start_ns"] / 1000,
+                "dur": s["dur_ns"] / 1000,
+                "pid": 1,
+                "tid": s["tid"],
+                "args": {k: str(v) for k, v in s["attrs"].items()},
+            }
+            for s in self.spans
+        ]
+        Path(path).write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
+
+    def write_collapsed(self, path: Path) -> None:
+        """Collapsed stacks ("a;b;c <self microseconds>" per line) for flamegraph tools."""
+        totals: dict[tuple, int] = {}
+        for s in self.spans:
+            totals[s["path"]] = totals.get(s["path"], 0) + s["self_ns"]
+        lines = [f"{';'.join(p)} {ns // 1000}" for p, ns in sorted(totals.items()) if ns >= 1000]
+        Path(path).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    def write(self, path: Path) -> None:
+        """Chrome trace for *.json, collapsed stacks otherwise."""
+        if str(path).lower().endswith(".json"):
+            self.write_chrome_trace(path)
+        else:
+            self.write_collapsed(path)
@@ -1,14 +1,21 @@
 """Triage agent: categorize threads with optional ScaleDown for long threads."""
 import logging
 import re
+import time
 from typing import Optional
 
 import config
 from src.models import Category, EmailThread, TriageResult
+from src.reply_text import new_content
 from src.scaledown_client import compress_thread_if_long
+from src.telemetry import counter, histogram
+from src.tracing import span
 
 logger = logging.getLogger(__name__)
 
+TRIAGE_SECONDS = histogram("triage_seconds", "TriageAgent.triage duration per thread.")
+TRIAGED = counter("triage_threads_total", "Threads triaged, by category and urgency.", ("category", "urgent"))
+
 # Patterns for categorization
 NEWSLETTER_PATTERNS = [
     r"unsubscribe",
@@ -44,19 +51,28 @@ class TriageAgent:
 
     def triage(self, thread: EmailThread, priority_score: Optional[int] = None) -> TriageResult:
         """Run triage: optionally compress long thread, then categorize and suggest folder."""
-        context = thread.to_context_string()
+        started = time.perf_counter()
+        with span("triage.context") as s:
+            ctx = thread.to_budgeted_context(config.TRIAGE_CONTEXT_MAX_CHARS, config.TRIAGE_CONTEXT_MESSAGE_MAX_CHARS)
+            s.set(messages=len(ctx.message_ids), omitted=ctx.omitted)
+            context = ctx.text
         compressed_context = None
         if self.use_scaledown and thread.message_count >= config.THREAD_SCALEDOWN_THRESHOLD:
             context_to_use, compressed_context = compress_thread_if_long(context, thread.message_count)
             if compressed_context:
                 context = context_to_use
-        category = self._categorize(context, thread)
-        is_urgent = self._is_urgent(context, thread)
+        with span("triage.categorize"):
+            category = self._categorize(context, thread)
+        with span("triage.urgent"):
+            is_urgent = self._is_urgent(context, thread)
         if priority_score is None:
             from .priority_scorer import PriorityScorer
-            priority_score = PriorityScorer().score(thread, category=category, is_urgent=is_urgent)
+            with span("triage.priority"):
+                priority_score = PriorityScorer().score(thread, category=category, is_urgent=is_urgent)
         folder = self._folder_for(category, is_urgent)
         summary = compressed_context[:500] if compressed_context else None
+        TRIAGE_SECONDS.observe(time.perf_counter() - started)
+        TRIAGED.labels(category.value, "true" if is_urgent else "false").inc()
         return TriageResult(
             category=category,
             priority_score=priority_score,
@@ -81,7 +97,7 @@ class TriageAgent:
         if thread.message_count >= 2 and thread.messages:
             last = thread.messages[-1]
             # Heuristic: if last message has question-like content
-            if "?" in (last.body_plain or "") or "?" in (last.snippet or ""):
+            if "?" in new_content(last) or "?" in (last.snippet or ""):
                 return Category.FOLLOW_UP
         return Category.OTHER
 
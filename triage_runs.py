@@ -0,0 +1,232 @@
+"""
+Live triage runs for the dashboard: a run triages on a bounded worker pool and
+appends numbered events to a buffer that any number of readers (SSE streams,
+job polls) follow, each from its own position, so a reconnecting client resumes
+where it left off instead of restarting the run.
+"""
+import logging
+import statistics
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Finished runs stay readable (for resume) this long, and at most this many
+FINISHED_RUN_TTL_SEC = 600
+MAX_FINISHED_RUNS = 32
+RUN_TIME_SAMPLES = 100  # recent runs kept for wait/run time stats
+
+EventSource = Callable[[], Iterable[tuple[str, dict]]]
+
+
+class TriageRun:
+    """One triage pass: an append-only, numbered event log plus a condition readers wait on."""
+
+    def __init__(self, key: str, source: EventSource, params: Optional[dict] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.params = params or {}
+        self._source = source
+        self._events: list[tuple[int, str, dict]] = []
+        self._cond = threading.Condition()
+        self.done = False
+        self.error: Optional[str] = None
+        self.queued_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def status(self) -> str:
+        if self.done:
+            return "failed" if self.error else "done"
+        return "running" if self.started_at else "queued"
+
+    def _emit(self, event: str, data: dict) -> None:
+        with self._cond:
+            self._events.append((len(self._events) + 1, event, data))
+            self._cond.notify_all()
+
+    def run(self) -> None:
+        """Consume the source until exhausted (blocking); always ends with a "done" event."""
+        self.started_at = time.time()
+        try:
+            for event, data in self._source():
+                self._emit(event, data)
+        except Exception as e:
+            logger.exception("triage run %s: %s", self.id, e)
+            self.error = str(e)
+            self._emit("error", {"error": self.error})
+        with self._cond:
+            self.done = True
+            self.finished_at = time.time()
+            self._events.append((len(self._events) + 1, "done", {"run_id": self.id, "error": self.error}))
+            self._cond.notify_all()
+
+    def events(self, after: int = 0, timeout: Optional[float] = None) -> Iterator[Optional[tuple[int, str, dict]]]:
+        """
+        Yield (seq, event, data) for events numbered above `after`, waiting for new
+        ones until the run is done. Yields None after `timeout` seconds without an
+        event so callers can send keep-alives.
+        """
+        pos = after
+        while True:
+            with self._cond:
+                if pos >= len(self._events) and not self.done:
+                    self._cond.wait(timeout)
+                batch = self._events[pos:]
+                finished = self.done
+            if not batch:
+                if finished:
+                    return
+                yield None
+                continue
+            for item in batch:
+                yield item
+            pos += len(batch)
+
+    def snapshot(self, include_results: bool = False) -> dict:
+        """Status, latest progress and (optionally) the thread results emitted so far."""
+        with self._cond:
+            events = list(self._events)
+        progress = next((data for _, event, data in reversed(events) if event == "progress"), None)
+        out = {
+            "run_id": self.id,
+            "key": self.key,
+            "params": self.params,
+            "status": self.status,
+            "error": self.error,
+            "progress": progress,
+            "events": len(events),
+            "queued_at": self.queued_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_results:
+            out["results"] = [data for _, event, data in events if event == "thread"]
+        return out
+
+
+class TriageRuns:
+    """
+    Registry of runs executed on a dedicated pool of `workers` threads (default
+    config.TRIAGE_JOB_WORKERS), so long runs never tie up web request threads.
+    There is at most one unfinished run per key (e.g. the account); starting
+    another with the same parameters joins it. At most `max_queued` runs wait
+    for a worker. Finished runs are kept briefly for resume and result polling.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_queued: Optional[int] = None):
+        self.workers = workers or config.TRIAGE_JOB_WORKERS
+        self.max_queued = max_queued if max_queued is not None else config.TRIAGE_JOB_QUEUE_MAX
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="triage-run")
+        self._runs: dict[str, TriageRun] = {}
+        self._active: dict[str, TriageRun] = {}
+        self._lock = threading.Lock()
+        self._wait_times: deque[float] = deque(maxlen=RUN_TIME_SAMPLES)
+        self._run_times: deque[float] = deque(maxlen=RUN_TIME_SAMPLES)
+        self._completed = 0
+        self._failed = 0
+        self._deduplicated = 0
+
+    def get(self, run_id: str) -> Optional[TriageRun]:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def active(self, key: str) -> Optional[TriageRun]:
+        """The unfinished run for `key`, if any."""
+        with self._lock:
+            run = self._active.get(key)
+            return run if run is not None and not run.done else None
+
+    def start(self, key: str, source: EventSource, params: Optional[dict] = None) -> tuple[Optional[TriageRun], bool]:
+        """
+        Join the unfinished run for `key`, or queue a new one.
+        Returns (run, created); run is None if the queue is full. An unfinished
+        run started with other `params` is returned unjoined (created False,
+        run.params != params) so the caller can refuse the request.
+        """
+        params = params or {}
+        with self._lock:
+            self._expire()
+            run = self._active.get(key)
+            if run is not None and not run.done:
+                if run.params == params:
+                    self._deduplicated += 1
+                return run, False
+            if self._queued() >= self.max_queued:
+                return None, False
+            run = TriageRun(key, source, params)
+            self._runs[run.id] = run
+            self._active[key] = run
+        self._executor.submit(self._execute, run)
+        return run, True
+
+    def _execute(self, run: TriageRun) -> None:
+        run.run()
+        with self._lock:
+            self._wait_times.append(run.started_at - run.queued_at)
+            self._run_times.append(run.finished_at - run.started_at)
+            if run.error:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+    def _queued(self) -> int:
+        return sum(1 for r in self._runs.values() if r.started_at is None)
+
+    def stats(self) -> dict:
+        """Queue depth, busy workers, outcome counts and recent wait/run times (seconds)."""
+
+        def summary(samples: deque) -> Optional[dict]:
+            if not samples:
+                return None
+            ordered = sorted(samples)
+            return {
+                "avg": round(statistics.fmean(ordered), 3),
+                "p50": round(ordered[len(ordered) // 2], 3),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                "max": round(ordered[-1], 3),
+            }
+
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self._queued(),
+                "queue_max": self.max_queued,
+                "running": sum(1 for r in self._runs.values() if r.status == "running"),
+                "completed": self._completed,
+                "failed": self._failed,
+                "deduplicated": self._deduplicated,
+                "wait_time_sec": summary(self._wait_times),
+                "run_time_sec": summary(self._run_times),
+            }
+
+    def _expire(self) -> None:
+        now = time.time()
+        finished = sorted(
+            (r for r in self._runs.values() if r.done),
+            key=lambda r: r.finished_at or 0,
+            reverse=True,
+        )
+        for i, run in enumerate(finished):
+            if i >= MAX_FINISHED_RUNS or now - (run.finished_at or now) > FINISHED_RUN_TTL_SEC:
+                del self._runs[run.id]
+                if self._active.get(run.key) is run:
+                    del self._active[run.key]
+
+
+def parse_event_id(value: Optional[str]) -> tuple[Optional[str], int]:
+    """SSE ids are "<run_id>:<seq>"; returns (run_id, seq) or (None, 0) if absent/malformed."""
+    if not value or ":" not in value:
+        return None, 0
+    run_id, _, seq = value.rpartition(":")
+    try:
+        return run_id, int(seq)
+    except ValueError:
+        return None, 0
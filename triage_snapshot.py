@@ -0,0 +1,246 @@
+"""
+Columnar triage snapshot: the latest triage output in one memory-mappable file.
+
+Layout (native byte order, recorded in the header):
+  magic, header length, JSON header, then 8-byte aligned sections:
+  - fixed-width columns: priority (u8), category code (u8), folder code (u8),
+    urgent (u8), last message time (i64 epoch seconds, 0 = unknown)
+  - ids and subjects as u64 offset arrays (rows + 1) into one UTF-8 string heap
+  - presorted row permutations (u32) per sort key, for all rows and per folder
+
+Readers mmap the file and page through a permutation, decoding only the rows
+on the page, so filtering/sorting/paging a million threads never builds a
+Python object per row. Rebuilds write a new file and rename it over the old
+one; open readers keep the mapping they have.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+import uuid
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+import config
+from src.models import Category
+from src.storage import atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TRSNAP1\0"
+_LEN = struct.Struct("<I")
+ALIGN = 8
+CATEGORIES = [c.value for c in Category]
+SORT_KEYS = ("priority", "date")
+ALL = "*"  # permutation key for "no folder filter"
+
+
+def _epoch(value) -> int:
+    if not value:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return 0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def write_snapshot(rows: Iterable[dict], path: Optional[Path] = None) -> dict:
+    """
+    Build a snapshot from triage rows (thread_id, subject, category, priority,
+    urgent, folder, last_message_at) and atomically replace `path`
+    (default config.TRIAGE_SNAPSHOT_FILE). Returns the header.
+    """
+    path = path or config.TRIAGE_SNAPSHOT_FILE
+    priority, category, folder, urgent = array("B"), array("B"), array("B"), array("B")
+    dates = array("q")
+    id_offsets, subject_offsets = array("Q", [0]), array("Q", [0])
+    id_heap, subject_heap = bytearray(), bytearray()
+    folders: dict[str, int] = {}
+    for r in rows:
+        priority.append(max(0, min(255, int(r.get("priority") or 0))))
+        cat = r.get("category") or Category.OTHER.value
+        category.append(CATEGORIES.index(cat) if cat in CATEGORIES else CATEGORIES.index(Category.OTHER.value))
+        folder.append(folders.setdefault(r.get("folder") or config.FOLDER_OTHER, len(folders)))
+        urgent.append(1 if r.get("urgent") else 0)
+        dates.append(_epoch(r.get("last_message_at")))
+        id_heap += str(r["thread_id"]).encode("utf-8")
+        id_offsets.append(len(id_heap))
+        subject_heap += (r.get("subject") or "").encode("utf-8")
+        subject_offsets.append(len(subject_heap))
+    if len(folders) > 255:
+        raise ValueError("snapshot supports at most 255 folders")
+    n = len(priority)
+
+    # One sort per key on a packed integer (descending); per-folder orders are stable filters of it
+    orders: dict[str, array] = {}
+    sort_ints = {
+        "priority": lambda i: (priority[i] << 40) | max(0, dates[i]),
+        "date": lambda i: (max(0, dates[i]) << 8) | priority[i],
+    }
+    for key in SORT_KEYS:
+        order = array("I", sorted(range(n), key=sort_ints[key], reverse=True))
+        orders[f"{ALL}:{key}"] = order
+        per_folder = {code: array("I") for code in folders.values()}
+        for i in order:
+            per_folder[folder[i]].append(i)
+        for name, code in folders.items():
+            orders[f"{name}:{key}"] = per_folder[code]
+
+    sections: list[tuple[str, array | bytearray]] = [
+        ("priority", priority), ("category", category), ("folder", folder), ("urgent", urgent),
+        ("date", dates), ("id_offsets", id_offsets), ("subject_offsets", subject_offsets),
+        ("id_heap", id_heap), ("subject_heap", subject_heap),
+    ] + [(f"order:{k}", v) for k, v in orders.items()]
+
+    layout: dict[str, list] = {}
+    pos = 0  # section offsets are relative to the aligned end of the header
+    for name, data in sections:
+        layout[name] = [pos, len(data), data.typecode if isinstance(data, array) else "B"]
+        pos = _align(pos + len(data) * (data.itemsize if isinstance(data, array) else 1))
+    header = {
+        "version": 1,
+        "generation": uuid.uuid4().hex[:12],
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "byteorder": sys.byteorder,
+        "rows": n,
+        "categories": CATEGORIES,
+        "folders": sorted(folders, key=folders.get),
+        "sections": layout,
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    data_start = _align(len(MAGIC) + _LEN.size + len(header_bytes))
+
+    def chunks():
+        yield MAGIC
+        yield _LEN.pack(len(header_bytes))
+        yield header_bytes
+        written = len(MAGIC) + _LEN.size + len(header_bytes)
+        for name, data in sections:
+            start = data_start + layout[name][0]
+            yield b"\0" * (start - written)
+            payload = memoryview(data).cast("B") if len(data) else b""
+            yield payload
+            written = start + len(payload)
+
+    atomic_write_bytes(path, chunks())
+    return header
+
+
+def _align(pos: int) -> int:
+    return -(-pos // ALIGN) * ALIGN
+
+
+class TriageSnapshot:
+    """Read-only, memory-mapped view of a snapshot file."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or config.TRIAGE_SNAPSHOT_FILE)
+        with open(self.path, "rb") as f:
+            st = self.signature = _signature(self.path, f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st[2] else None
+        if self._mm is None or self._mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a triage snapshot")
+        (hlen,) = _LEN.unpack_from(self._mm, len(MAGIC))
+        start = len(MAGIC) + _LEN.size
+        self.header = json.loads(bytes(self._mm[start : start + hlen]))
+        data_start = _align(start + hlen)
+        if self.header.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{self.path} was written on a {self.header.get('byteorder')}-endian machine")
+        self.generation: str = self.header["generation"]
+        self.rows: int = self.header["rows"]
+        self.folders: list[str] = self.header["folders"]
+        self._view = memoryview(self._mm)
+        self._cols: dict[str, memoryview] = {}
+        for name, (offset, length, typecode) in self.header["sections"].items():
+            offset += data_start
+            self._cols[name] = self._view[offset : offset + length * array(typecode).itemsize].cast(typecode)
+
+    def order(self, folder: Optional[str] = None, sort: str = "priority") -> memoryview:
+        """Row indices for `folder` (None = all) in `sort` order; empty if the folder is unknown."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+        col = self._cols.get(f"order:{folder or ALL}:{sort}")
+        return col if col is not None else memoryview(b"").cast("I")
+
+    def row(self, i: int) -> dict:
+        c = self._cols
+        date = c["date"][i]
+        return {
+            "thread_id": bytes(c["id_heap"][c["id_offsets"][i] : c["id_offsets"][i + 1]]).decode("utf-8"),
+            "subject": bytes(c["subject_heap"][c["subject_offsets"][i] : c["subject_offsets"][i + 1]]).decode("utf-8"),
+            "category": CATEGORIES[c["category"][i]],
+            "priority": c["priority"][i],
+            "urgent": bool(c["urgent"][i]),
+            "folder": self.folders[c["folder"][i]],
+            "last_message_at": datetime.fromtimestamp(date, timezone.utc).isoformat() if date else None,
+        }
+
+    def page(self, folder: Optional[str] = None, sort: str = "priority", cursor: int = 0, limit: int = 50) -> tuple[list[dict], Optional[int]]:
+        """Rows [cursor, cursor + limit) of the folder's ordering, and the next cursor (None at the end)."""
+        order = self.order(folder, sort)
+        cursor = max(0, cursor)
+        end = min(len(order), cursor + max(0, limit))
+        return [self.row(i) for i in order[cursor:end]], end if end < len(order) else None
+
+    def folder_counts(self) -> dict[str, int]:
+        return {name: len(self.order(name)) for name in self.folders}
+
+    def close(self) -> None:
+        for col in self._cols.values():
+            col.release()
+        self._cols = {}
+        self._view.release()
+        self._mm.close()
+
+
+def _signature(path: Path, fd: Optional[int] = None) -> tuple:
+    st = os.fstat(fd) if fd is not None else os.stat(path)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class SnapshotReader:
+    """
+    Keeps the current snapshot mapped and reopens it when the file is swapped
+    (checked at most every `check_interval` seconds). Returns None if there is no snapshot yet.
+    A file that cannot be read (truncated, foreign) is logged once and the previous
+    snapshot, if any, is kept.
+    """
+
+    def __init__(self, path: Optional[Path] = None, check_interval: float = 1.0):
+        self.path = Path(path or config.TRIAGE_SNAPSHOT_FILE)
+        self.check_interval = check_interval
+        self._current: Optional[TriageSnapshot] = None
+        self._checked = 0.0
+        self._bad_signature: Optional[tuple] = None
+
+    def get(self) -> Optional[TriageSnapshot]:
+        now = time.monotonic()
+        if self._current is not None and now - self._checked < self.check_interval:
+            return self._current
+        self._checked = now
+        try:
+            sig = _signature(self.path)
+        except OSError:
+            self._current = None
+            return None
+        if sig == self._bad_signature:
+            return self._current
+        if self._current is None or self._current.signature != sig:
+            try:
+                # The old mapping is left to the garbage collector: requests may still be reading it
+                self._current = TriageSnapshot(self.path)
+            except Exception as e:
+                logger.exception("triage snapshot %s: %s", self.path, e)
+                self._bad_signature = sig
+        return self._current
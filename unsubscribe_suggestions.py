@@ -30,7 +30,9 @@ class UnsubscribeSuggestions:
         """Return suggestion if thread looks like bulk/marketing."""
         text = (thread.subject or "") + "\n"
         for m in thread.messages:
-            text += (m.body_plain or "") + "\n" + (m.body_html or "") + "\n"
+            # Converted HTML bodies keep their hrefs in m.links; only scan raw HTML when there are none
+            extra = "\n".join(m.links) if m.links else (m.body_html or "")
+            text += (m.body_plain or "") + "\n" + extra + "\n"
         confidence = 0.0
         link_candidates = []
         for pat in UNSUB_PATTERNS:
@@ -1,9 +1,21 @@
 """Urgent detection: keywords, senders, deadlines."""
 import re
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import config
 from src.models import EmailMessage, EmailThread
+from src.reply_text import new_content
+
+# Labels of mail that never belongs in the urgent view, whatever its content
+NEVER_URGENT_LABELS = frozenset({"SPAM", "TRASH"})
+# Bulk mail signals, used by the prescreen only when skip_bulk is opted into
+BULK_LABELS = frozenset({"CATEGORY_PROMOTIONS", "CATEGORY_SOCIAL", "CATEGORY_UPDATES", "CATEGORY_FORUMS", "FOCUSED_OTHER"})
+BULK_SENDER = re.compile(
+    r"(?:^|[<\s\"'])(?:no-?reply|do-?not-?reply|newsletters?|news|digest|deals|promos?|marketing|notifications?|mailer-daemon)@",
+    re.I,
+)
+BULK_SNIPPET = ("unsubscribe", "view in browser", "manage preferences")
 
 
 class UrgentDetector:
@@ -13,14 +25,61 @@ class UrgentDetector:
         self,
         keywords: Optional[list[str]] = None,
         sender_domains: Optional[list[str]] = None,
+        max_age_days: Optional[int] = None,
+        skip_bulk: Optional[bool] = None,
     ):
         self.keywords = keywords or config.URGENT_KEYWORDS
         self.sender_domains = sender_domains or config.URGENT_SENDER_DOMAINS
+        self.max_age_days = config.URGENT_PRESCREEN_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        self.skip_bulk = config.URGENT_PRESCREEN_SKIP_BULK if skip_bulk is None else skip_bulk
+
+    def prescreen(self, summary: dict, now: Optional[datetime] = None) -> tuple[str, Optional[str]]:
+        """
+        Decide from list-level metadata (a provider's list_thread_summaries entry)
+        whether a thread needs its bodies fetched: ("yes", reason), ("no", None)
+        or ("maybe", None). "yes" is a keyword in the subject or snippet or an
+        urgent sender, which is_urgent would also find. By default "no" is only
+        what is_urgent could not flag either (a single message whose snippet is
+        its whole body) or what is never urgent (spam, trash). The bulk and age
+        rules are opt-in (skip_bulk, max_age_days) since a body may still hold a
+        keyword. A bare {"id": ...} is always "maybe".
+        """
+        text = f"{summary.get('subject') or ''} {summary.get('snippet') or ''}".lower()
+        sender = (summary.get("sender") or "").lower()
+        labels = summary.get("labels") or ()
+        if NEVER_URGENT_LABELS.intersection(labels):
+            return "no", None
+        for kw in self.keywords:
+            if kw in text:
+                return "yes", f"Keyword: {kw}"
+        for domain in self.sender_domains:
+            if domain in sender:
+                return "yes", f"Sender: {domain}"
+        if summary.get("snippet_complete") and summary.get("message_count") == 1:
+            return "no", None
+        # The summary only names the newest sender; an earlier one may be an urgent sender
+        if self.sender_domains and summary.get("message_count") != 1:
+            return "maybe", None
+        if self.skip_bulk and (
+            BULK_LABELS.intersection(labels) or BULK_SENDER.search(sender) or any(m in text for m in BULK_SNIPPET)
+        ):
+            return "no", None
+        last = summary.get("last_message_at")
+        if self.max_age_days and last:
+            try:
+                at = datetime.fromisoformat(last)
+            except ValueError:
+                return "maybe", None
+            if at.tzinfo is None:
+                at = at.replace(tzinfo=timezone.utc)
+            if at < (now or datetime.now(timezone.utc)) - timedelta(days=self.max_age_days):
+                return "no", None
+        return "maybe", None
 
     def is_urgent(self, thread: EmailThread) -> bool:
         text = (thread.subject or "") + " "
         for m in thread.messages:
-            text += (m.body_plain or "") + " " + (m.snippet or "")
+            text += new_content(m) + " " + (m.snippet or "")
         text = text.lower()
         for kw in self.keywords:
             if kw in text:
@@ -35,7 +94,7 @@ class UrgentDetector:
         """Return short reason if urgent, else None."""
         text = (thread.subject or "").lower()
         for m in thread.messages:
-            text += " " + (m.body_plain or "").lower() + " " + (m.snippet or "").lower()
+            text += " " + new_content(m).lower() + " " + (m.snippet or "").lower()
         for kw in self.keywords:
             if kw in text:
                 return f"Keyword: {kw}"